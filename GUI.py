@@ -1,15 +1,32 @@
 import tkinter
+import os
 from mapPkg import Tile, Map, RiverSegment, RiverVertex
 from mapPkg import numpy
+from prefetchPkg import ChunkPrefetcher
+from inputPkg import PanController
+from profilePkg import profiler, PerformanceOverlay
+from rasterPkg import RasterRenderer
+from zoomPkg import ZoomRenderer
+import geometryPkg
+from viewportPkg import Viewport, rowTiles, rowDifference
 
 class WindowHandler:
 	'''
 	Graphics interface class.
 	'''
 
-	def __init__(self):
+	#class of the renderer used for the "raster" plotting
+	raster_class = RasterRenderer
+
+	#the coarsest zoom level; zoomed out further, panning is slowed down by generating the revealed terrain rather than by plotting it
+	max_zoom = 4
+
+	def __init__(self, seed :int = None, renderer :str = "polygon", map_path :str = None):
 		'''
 		Constructor of WindowHandler class.
+		@seed (int) ... Seed of the generated map (random if None).
+		@renderer (str) ... How the map is plotted: "polygon" (one canvas item per hexagon and river) or "raster" (pre-rendered images, see rasterPkg).
+		@map_path (str) ... Map file from which the map is loaded if it exists, and into which the map is saved when the window is closed (see Map.save).
 		'''
 
 		#initiate tkinter window and save screen size
@@ -18,72 +35,131 @@ class WindowHandler:
 		self.screen_width = self.root.winfo_screenwidth()
 		self.screen_height = self.root.winfo_screenheight()
 		
-		#set the number of pixels in which the map moves on one keypress
-		self.move_speed = 10
+		#number of pixels per second by which the map moves while a WASD key is held, and the target number of frames per second
+		self.pan_speed = 400
+		self.frame_rate = 60
 
 		#how many layers are added simultaneously
 		self.chunk_size = 10
 
+		#how many map chunks are kept in memory, the others are moved to a file on disk
+		self.chunk_budget = 64
+
+		#how the map is plotted
+		self.renderer = renderer
+
 		#create tkinter canvas inside the window
 		self.canv_width = self.screen_width // 1.5
 		self.canv_height = self.screen_height // 1.5
 		self.canvas = tkinter.Canvas(self.root, height=self.canv_height, width=self.canv_width)
 		self.canvas.pack()
-		
-		#create new map (only the structure - create and connect those tiles that will be visible into graph) 
-		mapObj = Map(self.canv_width//2, self.canv_height//2)
-		mapObj.generateGraph(self)
 
-		#plot all the newly created tiles
-		for tile in mapObj.tileIterator():
-			tile.gui_active = True
-			self.setColourOfTile(tile)
-			self.plotTile(tile)
+		#create new map and plot it
+		self.prefetcher = None
+		self.overlay = None
+		mapObj = self.createMap(seed, map_path)
 
-			for river in tile.rivers:
-				self.plotRiver(river)
+		#show the frame times if the instrumentation is enabled (F3 hides and shows it)
+		if profiler.enabled:
+			self.overlay = PerformanceOverlay(self.canvas, profiler)
+			self.overlay.update()
+			self.root.bind("<F3>", lambda event: self.overlay.toggle())
 
-		#create triggers that will move the map when WASD keyboard keys are pressed
-		self.root.bind("<KeyPress-w>", lambda event, gui=self: gui.moveMap(mapObj, 0, self.move_speed))
-		self.root.bind("<KeyPress-a>", lambda event, gui=self: gui.moveMap(mapObj, self.move_speed, 0))
-		self.root.bind("<KeyPress-s>", lambda event, gui=self: gui.moveMap(mapObj, 0, -self.move_speed))
-		self.root.bind("<KeyPress-d>", lambda event, gui=self: gui.moveMap(mapObj, -self.move_speed, 0))
+		#generate chunks in background ahead of the panning camera
+		self.prefetcher = ChunkPrefetcher(mapObj, self.root, self.viewport)
+
+		#move the map while WASD keyboard keys are held, once per frame regardless of the key repeat rate
+		self.pan = PanController(self.root, lambda dx, dy: self.moveMap(mapObj, dx, dy), self.pan_speed, self.frame_rate)
+
+		#zoom out and in by +/- keys or by mouse wheel
+		for sequence in ["<KeyPress-minus>", "<KeyPress-KP_Subtract>", "<Button-5>"]:
+			self.root.bind(sequence, lambda event: self.setZoom(self.zoom.level + 1))
+		for sequence in ["<KeyPress-plus>", "<KeyPress-KP_Add>", "<Button-4>"]:
+			self.root.bind(sequence, lambda event: self.setZoom(self.zoom.level - 1))
+		self.root.bind("<MouseWheel>", lambda event: self.setZoom(self.zoom.level + (1 if event.delta < 0 else -1)))
 
 		#complete the tkinter window creation
 		tkinter.mainloop()
+		self.prefetcher.close()
+		if map_path != None:
+			mapObj.save(map_path)
+		mapObj.store.close()
+
+
+	def createMap(self, seed :int, map_path :str = None) -> Map:
+		'''
+		Creates new map (or loads the saved one) that covers the whole canvas, plots it and returns it.
+		@seed (int) ... Seed of the generated map (random if None).
+		@map_path (str) ... Map file which is loaded instead of generating new map, if it exists.
+		'''
+
+		#the visible part of the map
+		self.viewport = Viewport(self.canv_width, self.canv_height, margin=Tile.side_length)
+		
+		#create new map (only the structure - create and connect those tiles that will be visible into graph); saved map is only extended if the canvas is larger than it
+		if map_path != None and os.path.exists(map_path):
+			mapObj = Map.load(map_path, self.canv_width//2, self.canv_height//2, self.chunk_budget)
+		else:
+			mapObj = Map(self.canv_width//2, self.canv_height//2, seed, self.chunk_budget)
+		mapObj.generateGraph(self.viewport)
+		self.map = mapObj
+
+		#the raster renderer plots whole blocks of the map instead of the single tiles
+		self.raster = self.raster_class(self.canvas, mapObj, self.viewport) if self.renderer == "raster" else None
+
+		#the zoomed out map is plotted by cells of its terrain pyramid instead of the tiles
+		self.zoom = ZoomRenderer(self.canvas, mapObj, self.viewport)
 
+		#plot all the visible tiles
+		self.plotted_rows = mapObj.visibleTiles(self.viewport)
+		self.plotTiles( [Tile(mapObj.store, q, r) for q, r in rowTiles(self.plotted_rows)] )
+		if self.raster != None:
+			self.raster.update()
 
-	def plotTile(self, tile :Tile):
+		return mapObj
+
+
+	def plotTile(self, tile :Tile, points :list = None):
 		'''
 		Plot hexagon tile on the canvas.
 		@tile (Tile) ... Tile which is being plotted.
+		@points (list) ... Canvas coordinates of the hexagon's vertices, if they were already computed for a batch of tiles (see geometryPkg.hexagonVertices).
 		'''
-		points = [	tile.x, tile.y - Tile.side_length,
-					tile.x + 0.866*Tile.side_length, tile.y - 0.5*Tile.side_length,
-					tile.x + 0.866*Tile.side_length, tile.y + 0.5*Tile.side_length,
-					tile.x, tile.y + Tile.side_length,
-					tile.x - 0.866*Tile.side_length, tile.y + 0.5*Tile.side_length,
-					tile.x - 0.866*Tile.side_length, tile.y - 0.5*Tile.side_length]		
-		tile.gui_id = self.canvas.create_polygon(points, outline='black', fill=tile.colour, width=2)
+
+		if points == None:
+			x, y = self.map.tilePosition(tile.q, tile.r)
+			points = geometryPkg.hexagonVertices([x], [y], Tile.side_length)[0].tolist()
+		tile.gui_id = self.canvas.create_polygon(points, outline='black', fill=tile.colour, width=2, tags="map")
 		tile.was_plotted = True
 
 
-	def plotRiver(self, river):
+	def plotRivers(self, rivers :list, xs :numpy.ndarray, ys :numpy.ndarray):
 		'''
-		Plot @river (RiverVertex || RiverSegment) from it's coordinates.
+		Plot @rivers (list of RiverVertex || RiverSegment) in the tiles with centres on @xs and @ys (numpy.ndarray) canvas coordinates.
 		'''
 
-		#RiverVertex is plotted differently than RiverSegment
-		if isinstance(river, RiverVertex):
-			x, y = river.start_point
-			river.gui_ids = [self.canvas.create_line(river.start_point, river.end_point, width=3, fill="#0022BB")]
+		if len(rivers) == 0:
+			return
 
-			#small circle indicating river source
-			if river.is_start:
-				river.gui_ids.append( self.canvas.create_oval(x-2, y-2, x+2, y+2, fill="#0022BB") )
-		else:
-			river.gui_ids = [self.canvas.create_line(river.start_point, river.mid_point, width=3, fill="#0022BB"), 
-							self.canvas.create_line(river.mid_point, river.end_point, width=3, fill="#0022BB")]
+		#index of the side where each river part starts and ends, -1 for the tile's centre (the river vertices start there)
+		def sideIndex(side):	return Tile.sides.index(side) if side != None else -1
+		start_sides = numpy.array( [sideIndex(river.start_side) if isinstance(river, RiverSegment) else -1 for river in rivers] )
+		end_sides = numpy.array( [sideIndex(river.end_side) for river in rivers] )
+		start_xs, start_ys = geometryPkg.sideMiddles(xs, ys, start_sides, Tile.side_length)
+		end_xs, end_ys = geometryPkg.sideMiddles(xs, ys, end_sides, Tile.side_length)
+
+		for river, x, y, start_x, start_y, end_x, end_y in zip(rivers, xs.tolist(), ys.tolist(), start_xs.tolist(), start_ys.tolist(), end_xs.tolist(), end_ys.tolist()):
+
+			#RiverVertex is plotted differently than RiverSegment
+			if isinstance(river, RiverVertex):
+				river.gui_ids = (self.canvas.create_line(x, y, end_x, end_y, width=river.width, fill="#0022BB", tags="map"),)
+
+				#small circle indicating river source
+				if river.is_start:
+					river.gui_ids += (self.canvas.create_oval(x-2, y-2, x+2, y+2, fill="#0022BB", tags="map"),)
+			else:
+				river.gui_ids = (self.canvas.create_line(start_x, start_y, x, y, width=river.width, fill="#0022BB", tags="map"), 
+								self.canvas.create_line(x, y, end_x, end_y, width=river.width, fill="#0022BB", tags="map"))
 
 
 	def hideRiver(self, river):
@@ -108,8 +184,13 @@ class WindowHandler:
 		Remove tiles and their rivers specified in @tiles (list[Tile]) from the canvas.
 		'''
 
+		self.map.deactivate( numpy.array([tile.q for tile in tiles], numpy.int64), numpy.array([tile.r for tile in tiles], numpy.int64) )
+
+		#the raster images are removed by the renderer
+		if self.raster != None:
+			return
+
 		for tile in tiles:
-			tile.gui_active = False
 			self.hideTile(tile)
 			for river in tile.rivers:
 				self.hideRiver(river)
@@ -117,20 +198,33 @@ class WindowHandler:
 
 	def plotTiles(self, tiles :list[Tile]):
 		'''
-		Plot tiles and their rivers specified in @tiles (list[Tile]) on the canvas. 
+		Plot tiles and their rivers specified in @tiles (list[Tile]) on the canvas. The coordinates of the hexagons and rivers are computed for all the tiles at once.
 		'''
 
-		for tile in tiles:
-				tile.gui_active = True
+		qs = numpy.array([tile.q for tile in tiles], numpy.int64)
+		rs = numpy.array([tile.r for tile in tiles], numpy.int64)
+		self.map.activate(qs, rs)
 
-				#set fill colour of tiles that were created in previous _moveMap_
-				if not tile.was_plotted:
-					self.setColourOfTile(tile)
+		#the raster images are plotted by the renderer
+		if self.raster != None:
+			self.map.store.scatter( "was_plotted", qs, rs, numpy.ones(len(qs), bool) )
+			return
 
-				self.plotTile(tile)
-				for river in tile.rivers:
-					river.setCoords(tile)
-					self.plotRiver(river)
+		if len(tiles) == 0:
+			return
+
+		xs, ys = self.map.tilePosition(qs, rs)
+		vertices = geometryPkg.hexagonVertices(xs, ys, Tile.side_length).tolist()
+
+		#the rivers are plotted over all the hexagons, together with the index of their tile
+		rivers, river_tiles = [], []
+		for index, (tile, points) in enumerate( zip(tiles, vertices) ):
+			self.plotTile(tile, points)
+			for river in tile.rivers:
+				rivers.append(river)
+				river_tiles.append(index)
+
+		self.plotRivers(rivers, xs[river_tiles], ys[river_tiles])
 
 
 	def isTileOnScreen(self, tile :Tile):
@@ -138,8 +232,7 @@ class WindowHandler:
 		Returns True if the @tile's (Tile) coordinates are inside the visible canvas area.
 		'''
 
-		offset_delta = Tile.side_length
-		return (-offset_delta < tile.x < self.canv_width+offset_delta and -offset_delta < tile.y < self.canv_height+offset_delta)
+		return self.viewport.isOnScreen( *self.map.tilePosition(tile.q, tile.r) )
 
 
 	def moveMap(self, mapObject :Map, dx :float, dy :float):
@@ -150,84 +243,107 @@ class WindowHandler:
 		@dy (float) ... The y coordinate of the moving direction vector.
 		'''
 
-		to_activate = set()
-		to_deactivate = set()
-		need_new_layer = {"up": False, "down": False, "left": False, "right": False}
+		#the zoomed out map moves by the same number of pixels, which is more tiles
+		factor = self.zoom.factor()
 
-		#go through every tile which is currently visible on-screen
-		for tile in mapObject.tileIterator(active_only=True):
+		with profiler.span("moveMap"):
+			if self.prefetcher != None:
+				self.prefetcher.recordMove(factor*dx, factor*dy)
 
-			#move the tile's coordinates
-			tile.x += dx
-			tile.y += dy
-			self.canvas.move(tile.gui_id, dx, dy)
-			
-			#move the tile's rivers
-			for river in tile.rivers:
-				for id in river.gui_ids:
-					self.canvas.move(id, dx, dy)
-
-			#if the tile moved off the screen, deactivate it
-			if not self.isTileOnScreen(tile):
-				to_deactivate.add(tile)
-			
-			#the tile is on the screen
-			else:
+			#the tiles keep their world coordinates, only the origin moves; all the plotted tiles and rivers are moved on canvas by one call
+			with profiler.span("moveMap/canvasMove"):
+				mapObject.moveOrigin(factor*dx, factor*dy)
+				self.canvas.move("map", dx, dy)
 
-				#look at all neighbours, update coordinates of those that are not rendered
-				for key in tile.neighbours:
-					neighbour = tile.neighbours[key]
-					if neighbour != None and not neighbour.gui_active:
-						neighbour.setRelativeCoordinates(tile, key)
+			if self.zoom.level == 0:
+				self.updateTiles(mapObject)
+			else:
+				#generate new necessary layers for the whole zoomed out viewport, the cells are aggregated from them
+				with profiler.span("moveMap/generateNewLayers"):
+					mapObject.generateNewLayers(mapObject.missingSides(mapObject.visibleTiles(self.viewport.zoomed(factor))), factor*self.chunk_size)
+				with profiler.span("moveMap/zoom"):
+					self.zoom.update()
 
-						#if the neighbours' new coordinates are on the screen, render that tile
-						if self.isTileOnScreen(neighbour):
-							to_activate.add(neighbour)
-							neighbour.iterator_state = tile.iterator_state
+			#possibly update mapObject.centre_tile after movement
+			mapObject.updateCentreTile(self.canv_width / 2, self.canv_height / 2)
 
-			#check, whether a visible tile is also on the map boundary
-			if tile.neighbours["w"] == None:
-				need_new_layer["left"] = True
+			#start generating the chunks that will be needed soon
+			if self.prefetcher != None:
+				with profiler.span("moveMap/prefetch"):
+					self.prefetcher.schedule()
 
-			if tile.neighbours["nw"] == None:
-				need_new_layer["up"] = True
+		if self.overlay != None:
+			self.overlay.update()
 
-			if tile.neighbours["e"] == None:
-				need_new_layer["right"] = True
 
-			if tile.neighbours["sw"] == None:
-				need_new_layer["down"] = True
+	def updateTiles(self, mapObject :Map):
+		'''
+		Hides the tiles which are not visible after the map moved, generates the missing layers and plots the tiles which became visible.
+		@mapObject (Map) ... Map object which contains the tiles.
+		'''
 
-		#unrender tiles that are newly off the screen
-		self.hideTiles(to_deactivate)
+		#unrender tiles that are newly off the screen (only the ends of the visible rows can change)
+		with profiler.span("moveMap/visibleTiles"):
+			visible_rows = mapObject.visibleTiles(self.viewport)
+			hidden = [Tile(mapObject.store, q, r) for q, r in rowDifference(self.plotted_rows, visible_rows)]
+		with profiler.span("moveMap/hideTiles"):
+			self.hideTiles(hidden)
 		
-		#generate new necessary layers
-		mapObject.generateNewLayers(need_new_layer, self.chunk_size)
-
-		#render tiles that are newly visible
-		self.plotTiles(to_activate)
-
-		#possibly update mapObject.centre_tile after movement
-		mapObject.updateCentreTile(self.canv_width / 2, self.canv_height / 2)
-
-
-	def setColourOfTile(self, tile :Tile):
+		#generate new necessary layers, if a visible tile is on the map boundary
+		with profiler.span("moveMap/generateNewLayers"):
+			mapObject.generateNewLayers(mapObject.missingSides(visible_rows), self.chunk_size)
+
+		#render tiles that are newly visible, including those in the new layers
+		with profiler.span("moveMap/visibleTiles"):
+			visible_rows = mapObject.visibleTiles(self.viewport)
+			shown = [Tile(mapObject.store, q, r) for q, r in rowDifference(visible_rows, self.plotted_rows)]
+		with profiler.span("moveMap/plotTiles"):
+			self.plotTiles(shown)
+		self.plotted_rows = visible_rows
+		profiler.count("tiles hidden", len(hidden))
+		profiler.count("tiles plotted", len(shown))
+
+		if self.raster != None:
+			with profiler.span("moveMap/raster"):
+				self.raster.update()
+
+
+	def setZoom(self, level :int):
 		'''
-		Sets the @tile's (Tile) fill colour based on the @tile attributes.
+		Zooms the map to @level (int) around the canvas' centre: at level k the map is 2^k times smaller (level 0 plots the single tiles, see ZoomRenderer).
+		The map is extended to cover the whole zoomed out canvas. Levels above _max_zoom_ or out of the range of the map's terrain pyramid are ignored.
 		'''
 
-		mapping = ['7','5','3','1']
-		brightness = int( numpy.floor(10*tile.altitude) )
+		if not 0 <= level <= min(self.max_zoom, self.map.pyramid.levels) or level == self.zoom.level:
+			return
+
+		with profiler.span("setZoom"):
+
+			#remove the tiles, the cells of the new level are plotted instead of them
+			if self.zoom.level == 0:
+				self.hideTiles( [Tile(self.map.store, q, r) for q, r in rowTiles(self.plotted_rows)] )
+				self.plotted_rows = {}
+				if self.raster != None:
+					self.raster.clear()
+
+			self.zoom.setLevel(level)
+			viewport = self.viewport.zoomed( self.zoom.factor() )
+			missing = self.map.missingSides( self.map.visibleTiles(viewport) )
+			while any( missing.values() ):
+				self.map.generateNewLayers(missing, self.zoom.factor() * self.chunk_size)
+				missing = self.map.missingSides( self.map.visibleTiles(viewport) )
+
+			if level == 0:
+				self.plotted_rows = self.map.visibleTiles(self.viewport)
+				self.plotTiles( [Tile(self.map.store, q, r) for q, r in rowTiles(self.plotted_rows)] )
+				if self.raster != None:
+					self.raster.update()
+			else:
+				self.zoom.update()
 
-		#ocean
-		if tile.altitude < 0:
-			tile.colour = "#0022BB"
-		elif tile.is_lake:
-			tile.colour = "#0022BB"
-		#mountains
-		elif tile.altitude > 0.45:
-			tile.colour = "#AAAAAA"
-		elif tile.altitude > 0.3:
-			tile.colour = "#444444"
-		else:
-			tile.colour = "#00" + mapping[brightness] + "000"
+			#prefetch the chunks ahead of the whole zoomed out canvas
+			if self.prefetcher != None:
+				self.prefetcher.viewport = viewport
+
+		if self.overlay != None:
+			self.overlay.update()
@@ -0,0 +1,503 @@
+from mapPkg import Map, Tile
+from viewportPkg import Viewport
+from rasterPkg import RasterRenderer
+from terrainPkg import Terrain
+from parallelPkg import generateChunks, countWorkers
+from profilePkg import profiler
+import GUI
+import numpy
+import argparse
+import concurrent.futures
+import multiprocessing
+import subprocess
+import resource
+import tracemalloc
+import platform
+import tempfile
+import json
+import time
+import sys
+import os
+
+
+class RecordingCanvas:
+	'''
+	Stand-in for tkinter.Canvas, which only records the calls, so that the GUI can be benchmarked without display.
+	'''
+
+	def __init__(self):
+		'''
+		Constructor of RecordingCanvas class.
+		'''
+
+		#number of calls of each canvas method
+		self.calls = {}
+
+		#ids of the items which are currently on the canvas
+		self.items = set()
+		self.last_id = 0
+
+
+	def record(self, method :str):
+		'''
+		Counts one call of canvas @method (str).
+		'''
+
+		self.calls[method] = self.calls.get(method, 0) + 1
+
+
+	def create(self, method :str) -> int:
+		'''
+		Records creation of new canvas item by @method (str) and returns its id.
+		'''
+
+		self.record(method)
+		self.last_id += 1
+		self.items.add(self.last_id)
+		return self.last_id
+
+
+	def create_polygon(self, *args, **kwargs):	return self.create("create_polygon")
+	def create_line(self, *args, **kwargs):	return self.create("create_line")
+	def create_oval(self, *args, **kwargs):	return self.create("create_oval")
+	def create_image(self, *args, **kwargs):	return self.create("create_image")
+	def create_rectangle(self, *args, **kwargs):	return self.create("create_rectangle")
+	def create_text(self, *args, **kwargs):	return self.create("create_text")
+	def move(self, *args):	self.record("move")
+	def coords(self, *args):	self.record("coords")
+	def itemconfigure(self, *args, **kwargs):	self.record("itemconfigure")
+	def tag_raise(self, *args):	self.record("tag_raise")
+	def tag_lower(self, *args):	self.record("tag_lower")
+
+
+	def delete(self, id):
+		'''
+		Records removal of the item @id from the canvas.
+		'''
+
+		self.record("delete")
+		self.items.discard(id)
+
+
+class EncodingRasterRenderer(RasterRenderer):
+	'''
+	RasterRenderer which only encodes the images, so that it can be benchmarked without tkinter window.
+	'''
+
+	def makeImage(self, rgb :numpy.ndarray) -> bytes:
+		'''
+		Returns the PPM data from which tkinter image of the @rgb (numpy.ndarray) pixels would be created.
+		'''
+
+		height, width, _ = rgb.shape
+		return f"P6 {width} {height} 255 ".encode() + rgb.tobytes()
+
+
+class HeadlessWindow(GUI.WindowHandler):
+	'''
+	WindowHandler drawing on RecordingCanvas instead of tkinter window.
+	'''
+
+	raster_class = EncodingRasterRenderer
+
+	def __init__(self, width :float, height :float, seed :int, renderer :str = "polygon", map_path :str = None):
+		'''
+		Constructor of HeadlessWindow class.
+		@width, @height (float) ... Size of the simulated canvas.
+		@seed (int) ... Seed of the map.
+		@renderer (str) ... "polygon" or "raster", as in WindowHandler.
+		@map_path (str) ... Saved map which is opened instead of generating new one, as in WindowHandler.
+		'''
+
+		self.move_speed = 10
+		self.chunk_size = 10
+		self.chunk_budget = None
+		self.renderer = renderer
+		self.canv_width = width
+		self.canv_height = height
+		self.canvas = RecordingCanvas()
+		self.prefetcher = None
+		self.overlay = None
+		self.createMap(seed, map_path)
+
+
+def viewportSize(tiles :int) -> tuple:
+	'''
+	Returns (width, height) of square-ish viewport which contains approximately @tiles (int) tiles.
+	'''
+
+	side = numpy.sqrt(tiles)
+	return side * 2*0.866*Tile.side_length, side * 1.5*Tile.side_length
+
+
+def buildMap(tiles :int, seed :int) -> Map:
+	'''
+	Returns map of seed @seed (int) with approximately @tiles (int) tiles.
+	'''
+
+	width, height = viewportSize(tiles)
+	mapObj = Map(width / 2, height / 2, seed)
+	mapObj.generateGraph( Viewport(width, height, margin=0) )
+	return mapObj
+
+
+def countTiles(mapObj :Map) -> int:
+	'''
+	Returns number of tiles of @mapObj (Map).
+	'''
+
+	return int( sum(chunk.arrays["exists"].sum() for chunk in mapObj.store.chunks.values()) )
+
+
+def benchGenerateGraph(tiles :int, seed :int) -> dict:
+	'''
+	Measures creation of map of approximately @tiles (int) tiles.
+	'''
+
+	start = time.perf_counter()
+	mapObj = buildMap(tiles, seed)
+	seconds = time.perf_counter() - start
+	return {"seconds": seconds, "tiles": countTiles(mapObj)}
+
+
+def benchTileMemory(tiles :int, seed :int) -> dict:
+	'''
+	Measures the memory of the Python objects of map of approximately @tiles (int) tiles: a Tile view of every tile together with its river parts (as when the whole map is plotted).
+	The chunk arrays, which do not depend on the number of objects, are reported separately.
+	'''
+
+	mapObj = buildMap(tiles, seed)
+	store = mapObj.store
+	positions = [(int(chunk.q0 + j), int(chunk.r0 + i)) for chunk in store.chunks.values() for i, j in zip(*numpy.nonzero(chunk.arrays["exists"]))]
+
+	tracemalloc.start()
+	start = time.perf_counter()
+	views = [Tile(store, q, r) for q, r in positions]
+	rivers = [tile.rivers for tile in views]
+	seconds = time.perf_counter() - start
+	object_bytes = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+
+	return {	"seconds": seconds,
+				"tiles": len(views),
+				"river_parts": sum(len(parts) for parts in rivers),
+				"bytes_per_tile": object_bytes / len(views),
+				"array_bytes_per_tile": sum(array.nbytes for chunk in store.chunks.values() for array in chunk.arrays.values()) / len(views)
+			}
+
+
+def benchGenerateNewLayers(tiles :int, seed :int, side :str, chunk_size :int) -> dict:
+	'''
+	Measures generation of @chunk_size (int) new layers on @side (str) of map of approximately @tiles (int) tiles.
+	'''
+
+	mapObj = buildMap(tiles, seed)
+	before = countTiles(mapObj)
+	which_sides = {key: key == side for key in ["left", "up", "right", "down"]}
+
+	start = time.perf_counter()
+	mapObj.generateNewLayers(which_sides, chunk_size)
+	seconds = time.perf_counter() - start
+	return {"seconds": seconds, "tiles": countTiles(mapObj) - before}
+
+
+def benchUpdateSandpiles(tiles :int, seed :int) -> dict:
+	'''
+	Measures smoothing of all chunks of map of approximately @tiles (int) tiles.
+	'''
+
+	mapObj = buildMap(tiles, seed)
+	keys = list(mapObj.store.chunks)
+
+	start = time.perf_counter()
+	for cq, cr in keys:
+		mapObj.terrain.updateSandpiles(cq, cr)
+	seconds = time.perf_counter() - start
+	return {"seconds": seconds, "tiles": len(keys) * mapObj.store.chunk_size**2}
+
+
+def benchGenerateChunks(tiles :int, seed :int, noise_cache :int, chunk_size :int = 32) -> dict:
+	'''
+	Measures generation of the terrain of square of chunks of approximately @tiles (int) tiles, row by row, with the random numbers of @noise_cache (int) chunks cached.
+	@chunk_size (int) ... Number of tiles on a chunk's side (the maps' chunks have 32).
+	'''
+
+	terrain = Terrain(seed, chunk_size, noise_cache)
+	side = max(1, round( numpy.sqrt(tiles) / terrain.chunk_size ))
+
+	start = time.perf_counter()
+	for cr in range(side):
+		for cq in range(side):
+			terrain.generateChunk(cq, cr)
+	seconds = time.perf_counter() - start
+	return {"seconds": seconds, "tiles": side*side * terrain.chunk_size**2}
+
+
+def benchParallelChunks(tiles :int, seed :int, workers :int) -> dict:
+	'''
+	Measures generation of the terrain of square of chunks of the map's size of approximately @tiles (int) tiles in @workers (int) processes, including starting the processes.
+	Batches too small for @workers processes run in fewer of them (see parallelPkg.countWorkers), the result reports the number actually used.
+	'''
+
+	terrain = Terrain(seed, 32)
+	side = max(1, round( numpy.sqrt(tiles) / terrain.chunk_size ))
+	keys = [(cq, cr) for cr in range(side) for cq in range(side)]
+
+	start = time.perf_counter()
+	generateChunks(terrain, keys, workers)
+	seconds = time.perf_counter() - start
+	return {"seconds": seconds, "tiles": len(keys) * terrain.chunk_size**2, "workers": countWorkers(len(keys), workers)}
+
+
+def benchMakeRivers(tiles :int, seed :int) -> dict:
+	'''
+	Measures river creation in all chunks of map of approximately @tiles (int) tiles.
+	'''
+
+	mapObj = buildMap(tiles, seed)
+	terrain = mapObj.terrain
+	reach = terrain.river_reach
+	size = (2*reach + 1) * terrain.chunk_size
+
+	#rivers are made on the windows of chunks around every chunk, from the same sources as in the chunk generation
+	work = []
+	for cq, cr in list(mapObj.store.chunks):
+		window = [(cq + dq, cr + dr) for dr in range(-reach, reach + 1) for dq in range(-reach, reach + 1)]
+		altitude = terrain.windowArray( [terrain.chunkAltitudes(*key) for key in window] )
+		sources = terrain.windowArray( [terrain.chunkNoise(*key)["river_trials"] for key in window] ) < terrain.river_source_rate * altitude
+		arrays = {	"altitude": altitude,
+					"is_lake": numpy.zeros( (size, size), bool ),
+					"river_in": numpy.zeros( (size, size), numpy.uint8 ),
+					"river_out": numpy.full( (size, size), -1, numpy.int8 ),
+					"river_source": numpy.zeros( (size, size), bool ),
+					"river_flow": numpy.zeros( (size, size), numpy.uint16 ),
+					"river_order": numpy.zeros( (size, size), numpy.uint8 )
+				}
+		work.append( (arrays, sources) )
+
+	start = time.perf_counter()
+	for arrays, sources in work:
+		terrain.makeRivers(arrays, sources)
+	seconds = time.perf_counter() - start
+	return {"seconds": seconds, "tiles": len(work) * terrain.chunk_size**2, "sources": int( sum(sources.sum() for _, sources in work) )}
+
+
+def benchTileIterator(tiles :int, seed :int, active_only :bool) -> dict:
+	'''
+	Measures iteration over the whole plotted map of approximately @tiles (int) tiles, or over its active part if @active_only (bool).
+	'''
+
+	window = HeadlessWindow(*viewportSize(tiles), seed)
+
+	#only the tiles in the middle half of the map are active
+	if active_only:
+		window.hideTiles( [tile for tile in window.map.tileIterator(active_only=True) if abs(window.map.tilePosition(tile.q, tile.r)[0] - window.canv_width/2) > window.canv_width/4] )
+
+	start = time.perf_counter()
+	count = sum(1 for _ in window.map.tileIterator(active_only))
+	seconds = time.perf_counter() - start
+	return {"seconds": seconds, "tiles": count}
+
+
+def benchQueryRegion(tiles :int, seed :int) -> dict:
+	'''
+	Measures reading the default query fields of all tiles of map of approximately @tiles (int) tiles by one Map.queryRegion call on the map's bounding rectangle.
+	'''
+
+	mapObj = buildMap(tiles, seed)
+
+	start = time.perf_counter()
+	region = mapObj.queryRegion( *mapObj.bounds() )
+	seconds = time.perf_counter() - start
+	return {"seconds": seconds, "tiles": int( region["exists"].sum() ), "region_tiles": region["exists"].size}
+
+
+def benchMoveMap(tiles :int, seed :int, renderer :str = "polygon", profile :bool = False, zoom :int = 0) -> dict:
+	'''
+	Measures panning of map of approximately @tiles (int) tiles plotted by @renderer (str) in all four directions.
+	The canvas only records the calls, so the frame rate does not include the time tkinter spends drawing the items.
+	If @profile (bool) is True, the panning is measured with the instrumentation enabled and the result includes the latencies of its stages.
+	The map is panned zoomed out to @zoom (int) level on a canvas 2^zoom times smaller, so that the canvas shows the same number of tiles, e.g. "moveMap/zoom2"
+	on 16000 tiles uses the canvas of "moveMap" on 1000 tiles.
+	'''
+
+	#the large maps are moved fewer times, so that the benchmark finishes in reasonable time
+	moves = max(2, min(25, 250000 // tiles))
+	window = HeadlessWindow(*viewportSize( max(1, tiles // 4**zoom) ), seed, renderer)
+	window.setZoom(zoom)
+	canvas = window.canvas
+	calls_before = sum(canvas.calls.values())
+	speed = window.move_speed
+
+	#pan right, down, left and up
+	sequence = [(-speed, 0)]*moves + [(0, -speed)]*moves + [(speed, 0)]*moves + [(0, speed)]*moves
+
+	if profile:
+		profiler.enable()
+
+	frame_times = []
+	start = time.perf_counter()
+	for dx, dy in sequence:
+		frame_start = time.perf_counter()
+		window.moveMap(window.map, dx, dy)
+		frame_times.append(time.perf_counter() - frame_start)
+	seconds = time.perf_counter() - start
+
+	stages = {}
+	if profile:
+		profiler.disable()
+		stages = {name: {"count": stage["count"], "p50_ms": stage["p50_ms"], "p99_ms": stage["p99_ms"]} for name, stage in profiler.summary()["stages"].items()}
+
+	return {	"seconds": seconds,
+				"tiles": (sum(1 for _ in window.map.tileIterator(active_only=True)) if zoom == 0 else len(window.zoom.items) * 4**zoom) * len(sequence),
+				"moves": len(sequence),
+				"fps": len(sequence) / seconds,
+				"frame_ms_p50": 1000 * float(numpy.percentile(frame_times, 50)),
+				"frame_ms_p99": 1000 * float(numpy.percentile(frame_times, 99)),
+				"canvas_calls_per_move": (sum(canvas.calls.values()) - calls_before) / len(sequence),
+				"live_canvas_items": len(canvas.items),
+				"stages": stages
+			}
+
+
+def benchLoadMap(tiles :int, seed :int) -> dict:
+	'''
+	Measures opening of saved map of approximately @tiles (int) tiles in a window of approximately 1000 tiles, until the visible tiles are plotted.
+	The time should not depend on the size of the saved map.
+	'''
+
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, "benchmark.hexmap")
+		buildMap(tiles, seed).save(path)
+
+		start = time.perf_counter()
+		window = HeadlessWindow(*viewportSize(1000), seed, map_path=path)
+		seconds = time.perf_counter() - start
+
+		file_mb = os.path.getsize(path) / 2**20
+		loaded_chunks = len(window.map.store.chunks)
+		window.map.store.close()
+
+	return {	"seconds": seconds,
+				"tiles": tiles,
+				"file_mb": file_mb,
+				"loaded_chunks": loaded_chunks
+			}
+
+
+#benchmark cases: name -> (function, keyword arguments)
+cases = {	"generateGraph": (benchGenerateGraph, {}),
+			"updateSandpiles": (benchUpdateSandpiles, {}),
+			"generateChunks": (benchGenerateChunks, {"noise_cache": 256}),
+			"generateChunks/uncached": (benchGenerateChunks, {"noise_cache": 0}),
+			"generateChunks/10": (benchGenerateChunks, {"noise_cache": 256, "chunk_size": 10}),
+			"generateChunks/10/uncached": (benchGenerateChunks, {"noise_cache": 0, "chunk_size": 10}),
+			"makeRivers": (benchMakeRivers, {}),
+			"tileIterator/full": (benchTileIterator, {"active_only": False}),
+			"tileIterator/active": (benchTileIterator, {"active_only": True}),
+			"queryRegion": (benchQueryRegion, {}),
+			"moveMap": (benchMoveMap, {}),
+			"moveMap/raster": (benchMoveMap, {"renderer": "raster"}),
+			"moveMap/profiled": (benchMoveMap, {"profile": True}),
+			"moveMap/zoom2": (benchMoveMap, {"zoom": 2}),
+			"moveMap/zoom4": (benchMoveMap, {"zoom": 4}),
+			"loadMap": (benchLoadMap, {}),
+			"memory/tiles": (benchTileMemory, {})
+		}
+for workers in sorted( {1, 2, 4, os.cpu_count() or 1} ):
+	cases[f"parallelChunks/{workers}"] = (benchParallelChunks, {"workers": workers})
+for side in ["left", "up", "right", "down"]:
+	for chunk_size in [1, 10]:
+		cases[f"generateNewLayers/{side}/{chunk_size}"] = (benchGenerateNewLayers, {"side": side, "chunk_size": chunk_size})
+
+
+def runCase(name :str, tiles :int, seed :int) -> dict:
+	'''
+	Runs benchmark case @name (str) on a map of approximately @tiles (int) tiles and returns its results, including peak resident memory of the process.
+	'''
+
+	function, kwargs = cases[name]
+	result = function(tiles, seed, **kwargs)
+	result["tiles_per_second"] = result["tiles"] / result["seconds"] if result["seconds"] > 0 else None
+
+	#ru_maxrss is in kilobytes on Linux, in bytes on macOS
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	result["peak_rss_mb"] = peak / (2**20 if sys.platform == "darwin" else 2**10)
+	return result
+
+
+def runBenchmarks(names :list[str], sizes :list[int], seed :int) -> list[dict]:
+	'''
+	Runs benchmark cases @names (list[str]) on maps of @sizes (list[int]) tiles. Every case runs in a fresh process, so that its peak memory is measured separately.
+	'''
+
+	results = []
+	context = multiprocessing.get_context("spawn")
+
+	for size in sizes:
+		for name in names:
+			#the process is not daemonic, so that the parallel cases can start their own workers
+			with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as executor:
+				result = executor.submit(runCase, name, size, seed).result()
+
+			result.update( {"name": name, "size": size} )
+			results.append(result)
+			workers = f"   {result['workers']} workers" if "workers" in result else ""
+			print(f"{name:28} {size:>8} tiles   {result['seconds']:9.4f} s   {result['tiles_per_second'] or 0:12.0f} tiles/s   {result['peak_rss_mb']:8.1f} MB{workers}", flush=True)
+
+	return results
+
+
+def compareResults(old_path :str, new_path :str):
+	'''
+	Prints the ratios of the running times of benchmarks saved in @new_path (str) to those saved in @old_path (str).
+	'''
+
+	with open(old_path) as file:
+		old = { (result["name"], result["size"]): result for result in json.load(file)["results"] }
+	with open(new_path) as file:
+		new = { (result["name"], result["size"]): result for result in json.load(file)["results"] }
+
+	for key in sorted(old.keys() & new.keys()):
+		ratio = new[key]["seconds"] / old[key]["seconds"] if old[key]["seconds"] > 0 else float("nan")
+		memory = new[key]["peak_rss_mb"] - old[key]["peak_rss_mb"]
+		print(f"{key[0]:28} {key[1]:>8} tiles   time x{ratio:6.2f}   peak memory {memory:+8.1f} MB")
+
+
+def main():
+	'''
+	Command line entry point.
+	'''
+
+	parser = argparse.ArgumentParser(description="Benchmark the map generation, iteration and panning.")
+	parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000], help="approximate numbers of map tiles")
+	parser.add_argument("--cases", nargs="+", default=list(cases), help="benchmark cases (prefixes are accepted)")
+	parser.add_argument("--seed", type=int, default=0, help="seed of the benchmarked maps")
+	parser.add_argument("--output", default="benchmark.json", help="JSON file for the results")
+	parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files instead of running benchmarks")
+	args = parser.parse_args()
+
+	if args.compare:
+		compareResults(*args.compare)
+		return
+
+	names = [name for name in cases if any(name.startswith(prefix) for prefix in args.cases)]
+	results = runBenchmarks(names, args.sizes, args.seed)
+
+	try:
+		commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+	except OSError:
+		commit = None
+
+	with open(args.output, "w") as file:
+		json.dump({	"commit": commit,
+					"python": platform.python_version(),
+					"numpy": numpy.__version__,
+					"machine": platform.machine(),
+					"seed": args.seed,
+					"results": results
+				}, file, indent="\t")
+
+
+if __name__ == "__main__":
+	main()
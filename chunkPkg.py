@@ -0,0 +1,365 @@
+from collections import OrderedDict
+import tempfile
+import numpy
+
+
+class Chunk:
+	'''
+	Class representing a square block of map tiles, whose attributes are stored in NumPy arrays indexed by [r - r0, q - q0].
+	'''
+
+	#per-tile arrays of every chunk and their data types
+	fields = {	"exists": bool,
+				"altitude": numpy.float64,
+				"is_lake": bool,
+				"biome": numpy.uint8,
+				"river_in": numpy.uint8,
+				"river_out": numpy.int8,
+				"river_source": bool,
+				"river_flow": numpy.uint16,
+				"river_order": numpy.uint8,
+				"gui_id": numpy.int32,
+				"gui_active": bool,
+				"was_plotted": bool
+			}
+
+
+	def __init__(self, cq :int, cr :int, size :int):
+		'''
+		Constructor of Chunk class.
+		@cq (int) ... Chunk's q coordinate (in chunk units).
+		@cr (int) ... Chunk's r coordinate (in chunk units).
+		@size (int) ... Number of tiles on the chunk's side.
+		'''
+
+		self.cq = cq
+		self.cr = cr
+		self.size = size
+
+		#axial coordinates of the chunk's first tile
+		self.q0 = cq * size
+		self.r0 = cr * size
+
+		self.arrays = {name: numpy.zeros((size, size), dtype) for name, dtype in Chunk.fields.items()}
+
+		#-1 means that no river flows out of the tile
+		self.arrays["river_out"][:] = -1
+
+		#river objects created from the river flags of tiles, cached for plotting (indexed by tile's local (i, j) indices)
+		self.rivers = {}
+
+		#False after the chunk was evicted from memory; views of its tiles then have to locate the reloaded chunk
+		self.resident = True
+
+
+class SpillFile:
+	'''
+	Class storing evicted chunks in a memory-mapped file. Each chunk occupies one slot, which holds all its arrays.
+	'''
+
+	def __init__(self, chunk_size :int, path :str = None):
+		'''
+		Constructor of SpillFile class.
+		@chunk_size (int) ... Number of tiles on a chunk's side.
+		@path (str) ... Path of the file; anonymous temporary file is used if None.
+		'''
+
+		#one slot contains every per-tile array of one chunk
+		self.dtype = numpy.dtype( [(name, dtype, (chunk_size, chunk_size)) for name, dtype in Chunk.fields.items()] )
+
+		self.file = open(path, "w+b") if path != None else tempfile.TemporaryFile()
+		self.memmap = None
+		self.capacity = 0
+
+		#slots of the stored chunks indexed by their (cq, cr) coordinates, and the slots which can be reused
+		self.slots = {}
+		self.free_slots = []
+
+
+	def __contains__(self, key :tuple) -> bool:
+		return key in self.slots
+
+
+	def grow(self):
+		'''
+		Doubles the number of slots of the file.
+		'''
+
+		if self.capacity > 0:
+			self.memmap.flush()
+
+		#the new slots are taken from the end of the free list, so the lowest ones are used first
+		capacity = max(16, 2*self.capacity)
+		self.free_slots += range(capacity - 1, self.capacity - 1, -1)
+		self.capacity = capacity
+		self.file.truncate(self.capacity * self.dtype.itemsize)
+		self.memmap = numpy.memmap(self.file, dtype=self.dtype, mode="r+", shape=(self.capacity,))
+
+
+	def write(self, chunk :Chunk):
+		'''
+		Stores all arrays of @chunk (Chunk) in a free slot.
+		'''
+
+		if self.free_slots == []:
+			self.grow()
+
+		slot = self.free_slots.pop()
+		for name, values in chunk.arrays.items():
+			self.memmap[slot][name] = values
+		self.slots[(chunk.cq, chunk.cr)] = slot
+
+
+	def read(self, key :tuple, remove :bool = True) -> dict:
+		'''
+		Returns copies of the arrays of the chunk on @key (tuple) chunk coordinates. If @remove (bool) is True, the chunk is removed from the file.
+		'''
+
+		slot = self.slots[key]
+		if remove:
+			del self.slots[key]
+			self.free_slots.append(slot)
+		return {name: numpy.array(self.memmap[slot][name]) for name in Chunk.fields}
+
+
+	def close(self):
+		'''
+		Releases the memory map and closes the file.
+		'''
+
+		self.memmap = None
+		self.file.close()
+
+
+class ChunkStore:
+	'''
+	Class storing map tiles in chunks keyed by axial (q, r) coordinates.
+	If it has a residency budget, the least recently used chunks over the budget are moved to a memory-mapped spill file by _evict_ and reloaded when accessed again.
+	Chunks of a saved map are loaded from its archive (mapFilePkg.MapFile) only when they are accessed for the first time.
+	'''
+
+	def __init__(self, chunk_size :int = 32, generate = None, budget :int = None, spill_path :str = None, archive = None):
+		'''
+		Constructor of ChunkStore class.
+		@chunk_size (int) ... Number of tiles on a chunk's side.
+		@generate (function) ... Function called with every newly created chunk, which fills in the chunk's terrain.
+		@budget (int) ... Maximal number of chunks kept in memory after _evict_ (unlimited if None).
+		@spill_path (str) ... Path of the file for the evicted chunks (anonymous temporary file if None).
+		@archive (MapFile) ... Saved map whose chunks are loaded on demand (None for a new map).
+		'''
+
+		self.chunk_size = chunk_size
+		self.generate = generate
+		self.budget = budget
+
+		#chunks in memory indexed by their (cq, cr) coordinates, from the least to the most recently used
+		self.chunks = OrderedDict()
+
+		#evicted chunks, the file is created with the first eviction
+		self.spill_path = spill_path
+		self.spill = None
+
+		#saved chunks; a chunk loaded from the archive is then kept in memory or in the spill file, which therefore take precedence
+		self.archive = archive
+
+
+	def fetch(self, key :tuple) -> Chunk:
+		'''
+		Returns the chunk on @key (tuple) chunk coordinates, reloading it from the spill file if it was evicted or loading it from the archive, or None if it does not exist.
+		'''
+
+		chunk = self.chunks.get(key)
+		if chunk != None:
+			self.chunks.move_to_end(key)
+			return chunk
+
+		if self.spill != None and key in self.spill:
+			chunk = Chunk(*key, self.chunk_size)
+			chunk.arrays = self.spill.read(key)
+		elif self.archive != None and key in self.archive:
+			#the archive contains only the terrain, the other fields keep their initial values
+			chunk = Chunk(*key, self.chunk_size)
+			chunk.arrays.update( self.archive.read(key) )
+		else:
+			return None
+
+		self.chunks[key] = chunk
+		return chunk
+
+
+	def hasChunk(self, cq :int, cr :int) -> bool:
+		'''
+		Returns True if the chunk on (@cq, @cr) chunk coordinates exists, either in memory, in the spill file or in the archive.
+		'''
+
+		key = (cq, cr)
+		return key in self.chunks or (self.spill != None and key in self.spill) or (self.archive != None and key in self.archive)
+
+
+	def keys(self) -> set:
+		'''
+		Returns set of (cq, cr) coordinates of all existing chunks.
+		'''
+
+		keys = set(self.chunks)
+		if self.spill != None:
+			keys.update(self.spill.slots)
+		if self.archive != None:
+			keys.update( self.archive.keys() )
+		return keys
+
+
+	def peek(self, key :tuple) -> dict:
+		'''
+		Returns arrays of the chunk on @key (tuple) chunk coordinates without loading it into memory. The arrays must not be modified.
+		Raises KeyError if the chunk does not exist.
+		'''
+
+		if key in self.chunks:
+			return self.chunks[key].arrays
+		if self.spill != None and key in self.spill:
+			return self.spill.read(key, remove=False)
+		if self.archive != None and key in self.archive:
+			return self.archive.read(key)
+		raise KeyError(key)
+
+
+	def evict(self, keep :set = ()):
+		'''
+		Moves the least recently used chunks to the spill file until at most _budget_ chunks remain in memory.
+		The chunks whose (cq, cr) coordinates are in @keep (set) are never evicted.
+		'''
+
+		if self.budget == None or len(self.chunks) <= self.budget:
+			return
+
+		if self.spill == None:
+			self.spill = SpillFile(self.chunk_size, self.spill_path)
+
+		excess = len(self.chunks) - self.budget
+		for key, chunk in list(self.chunks.items()):
+			if excess == 0:
+				break
+			if key in keep:
+				continue
+
+			self.spill.write(chunk)
+			del self.chunks[key]
+			chunk.resident = False
+			excess -= 1
+
+
+	def close(self):
+		'''
+		Closes the spill file and the archive.
+		'''
+
+		if self.spill != None:
+			self.spill.close()
+			self.spill = None
+		if self.archive != None:
+			self.archive.close()
+			self.archive = None
+
+
+	def getChunk(self, cq :int, cr :int, create :bool = False) -> Chunk:
+		'''
+		Returns the chunk on (@cq, @cr) chunk coordinates, or None if it does not exist. If @create (bool) is True, missing chunk is created.
+		'''
+
+		chunk = self.fetch( (cq, cr) )
+		if chunk == None and create:
+			chunk = Chunk(cq, cr, self.chunk_size)
+			self.chunks[(cq, cr)] = chunk
+			if self.generate != None:
+				self.generate(chunk)
+		return chunk
+
+
+	def locate(self, q :int, r :int) -> tuple:
+		'''
+		Returns (chunk, local row index, local column index) of the tile on (@q, @r) axial coordinates. The chunk is None if it does not exist.
+		'''
+
+		chunk = self.fetch( (q // self.chunk_size, r // self.chunk_size) )
+		if chunk == None:
+			return None, 0, 0
+		return chunk, r - chunk.r0, q - chunk.q0
+
+
+	def contains(self, q :int, r :int) -> bool:
+		'''
+		Returns True if the tile on (@q, @r) axial coordinates exists.
+		'''
+
+		chunk = self.fetch( (q // self.chunk_size, r // self.chunk_size) )
+		return chunk != None and chunk.arrays["exists"].item(r - chunk.r0, q - chunk.q0)
+
+
+	def get(self, field :str, q :int, r :int):
+		'''
+		Returns the value of @field (str) of the tile on (@q, @r) axial coordinates.
+		'''
+
+		chunk = self.fetch( (q // self.chunk_size, r // self.chunk_size) )
+		return chunk.arrays[field].item(r - chunk.r0, q - chunk.q0)
+
+
+	def set(self, field :str, q :int, r :int, value):
+		'''
+		Sets @field (str) of the tile on (@q, @r) axial coordinates to @value.
+		'''
+
+		chunk = self.fetch( (q // self.chunk_size, r // self.chunk_size) )
+		chunk.arrays[field][r - chunk.r0, q - chunk.q0] = value
+
+
+	def groups(self, qs :numpy.ndarray, rs :numpy.ndarray):
+		'''
+		Splits the tiles given by @qs and @rs (numpy.ndarray) axial coordinates by chunks. Yields ((cq, cr), selection of the tiles, their local row indices, their local column indices).
+		'''
+
+		cqs = numpy.floor_divide(qs, self.chunk_size)
+		crs = numpy.floor_divide(rs, self.chunk_size)
+		keys, inverse = numpy.unique(numpy.stack((cqs, crs), axis=1), axis=0, return_inverse=True)
+		inverse = inverse.ravel()
+
+		for index, (cq, cr) in enumerate(keys):
+			selection = inverse == index
+			yield (int(cq), int(cr)), selection, rs[selection] - cr*self.chunk_size, qs[selection] - cq*self.chunk_size
+
+
+	def allocate(self, qs :numpy.ndarray, rs :numpy.ndarray, **values):
+		'''
+		Marks the tiles on @qs and @rs (numpy.ndarray) axial coordinates as existing, creating their chunks if necessary.
+		@values ... Initial field values, either one array entry per tile or one value shared by all tiles.
+		'''
+
+		for (cq, cr), selection, rows, cols in self.groups(qs, rs):
+			chunk = self.getChunk(cq, cr, create=True)
+			chunk.arrays["exists"][rows, cols] = True
+
+			for name, value in values.items():
+				chunk.arrays[name][rows, cols] = value[selection] if numpy.ndim(value) else value
+
+
+	def gather(self, field :str, qs :numpy.ndarray, rs :numpy.ndarray) -> numpy.ndarray:
+		'''
+		Returns array of @field (str) values of the tiles on @qs and @rs (numpy.ndarray) axial coordinates. Tiles in missing chunks get zero.
+		'''
+
+		values = numpy.zeros(len(qs), Chunk.fields[field])
+		for key, selection, rows, cols in self.groups(qs, rs):
+			chunk = self.fetch(key)
+			if chunk != None:
+				values[selection] = chunk.arrays[field][rows, cols]
+		return values
+
+
+	def scatter(self, field :str, qs :numpy.ndarray, rs :numpy.ndarray, values :numpy.ndarray):
+		'''
+		Sets @field (str) of the tiles on @qs and @rs (numpy.ndarray) axial coordinates to @values (numpy.ndarray).
+		'''
+
+		for key, selection, rows, cols in self.groups(qs, rs):
+			self.fetch(key).arrays[field][rows, cols] = values[selection]
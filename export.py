@@ -0,0 +1,206 @@
+from mapPkg import Map, Tile
+from rasterPkg import rasterise
+import geometryPkg
+import argparse
+import struct
+import zlib
+import math
+import numpy
+
+
+class PPMWriter:
+	'''
+	Class writing binary PPM image of given size row band by row band.
+	'''
+
+	def __init__(self, path :str, width :int, height :int):
+		'''
+		Constructor of PPMWriter class.
+		@path (str) ... Path of the written image.
+		@width (int), @height (int) ... Size of the image in pixels.
+		'''
+
+		self.file = open(path, "wb")
+		self.file.write( f"P6 {width} {height} 255\n".encode() )
+
+
+	def writeBand(self, rgb :numpy.ndarray):
+		'''
+		Appends the rows of the (rows, width, 3) @rgb (numpy.ndarray) pixels to the image.
+		'''
+
+		self.file.write( rgb.tobytes() )
+
+
+	def close(self):
+		'''
+		Finishes the image.
+		'''
+
+		self.file.close()
+
+
+class PNGWriter:
+	'''
+	Class writing RGB PNG image of given size row band by row band. The pixels of every band are compressed into their own IDAT chunk, by one compressor shared by the whole image.
+	'''
+
+	signature = b"\x89PNG\r\n\x1a\n"
+
+
+	def __init__(self, path :str, width :int, height :int):
+		'''
+		Constructor of PNGWriter class.
+		@path (str) ... Path of the written image.
+		@width (int), @height (int) ... Size of the image in pixels.
+		'''
+
+		self.file = open(path, "wb")
+		self.file.write(PNGWriter.signature)
+
+		#8 bits per channel, colour type 2 (RGB), default compression and filtering, no interlacing
+		self.writeChunk( b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0) )
+		self.compressor = zlib.compressobj()
+
+
+	def writeChunk(self, kind :bytes, data :bytes):
+		'''
+		Writes PNG chunk of @kind (bytes) with @data (bytes).
+		'''
+
+		self.file.write( struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data)) )
+
+
+	def writeBand(self, rgb :numpy.ndarray):
+		'''
+		Appends the rows of the (rows, width, 3) @rgb (numpy.ndarray) pixels to the image.
+		'''
+
+		#every row starts with its filter type, 0 (none)
+		rows = numpy.zeros( (rgb.shape[0], 1 + 3*rgb.shape[1]), numpy.uint8 )
+		rows[:, 1:] = rgb.reshape( (rgb.shape[0], -1) )
+
+		data = self.compressor.compress( rows.tobytes() )
+		if data != b"":
+			self.writeChunk(b"IDAT", data)
+
+
+	def close(self):
+		'''
+		Finishes the image.
+		'''
+
+		self.writeChunk( b"IDAT", self.compressor.flush() )
+		self.writeChunk(b"IEND", b"")
+		self.file.close()
+
+
+def mapRectangle(mapObj :Map, side_length :float) -> tuple:
+	'''
+	Returns (left, top, width, height) (int) world coordinates and size in pixels of the smallest rectangle containing all tiles of @mapObj (Map) with sides of @side_length (float) pixels.
+	'''
+
+	column_width = geometryPkg.half_width * side_length
+	left = math.floor( (mapObj.column_min - 1) * column_width )
+	top = math.floor( mapObj.r_min * 1.5*side_length - side_length )
+	right = math.ceil( (mapObj.column_max + 1) * column_width )
+	bottom = math.ceil( mapObj.r_max * 1.5*side_length + side_length )
+	return left, top, right - left, bottom - top
+
+
+def coverRectangle(mapObj :Map, left :int, top :int, width :int, height :int, side_length :float):
+	'''
+	Extends @mapObj (Map) to the right, left and down, so that it contains all tiles with sides of @side_length (float) pixels, which are at least partly
+	in the rectangle of @width times @height (int) pixels with its top left corner on (@left, @top) (int) world coordinates. The top edge of the map is not moved.
+	'''
+
+	#the hexagons reach one half-width left and right of their column and one side length up and down from their row
+	column_width = geometryPkg.half_width * side_length
+	column_first = math.floor(left / column_width) - 1
+	column_last = math.ceil( (left + width) / column_width ) + 1
+	r_last = math.ceil( (top + height + side_length) / (1.5*side_length) )
+
+	#every layer on the left or right side adds two columns
+	if mapObj.column_min > column_first:
+		mapObj.extendSide( "left", (mapObj.column_min - column_first + 1) // 2 )
+	if mapObj.column_max < column_last:
+		mapObj.extendSide( "right", (column_last - mapObj.column_max + 1) // 2 )
+	if mapObj.r_max < r_last:
+		mapObj.extendSide("down", r_last - mapObj.r_max)
+
+
+def exportImage(mapObj :Map, path :str, left :int, top :int, width :int, height :int, side_length :float = Tile.side_length, band :int = 64, block :int = 1024, generate :bool = False):
+	'''
+	Writes image of the rectangle of @width times @height (int) pixels of @mapObj (Map) with its top left corner on (@left, @top) (int) world coordinates into @path (str),
+	PNG if it ends with ".png", PPM otherwise. The tiles have sides of @side_length (float) pixels and they are drawn as by the raster renderer (see rasterPkg.rasterise).
+	The image is rasterised and written by bands of @band (int) rows, each one in blocks of @block (int) columns, so only one band of the image is in memory at any time.
+	@generate (bool) ... Whether the map is extended down by every band (see _coverRectangle_) before it is rasterised; the places without tiles get the background colour otherwise.
+	'''
+
+	writer = (PNGWriter if path.lower().endswith(".png") else PPMWriter)(path, width, height)
+	try:
+		for band_top in range(0, height, band):
+			rows = min(band, height - band_top)
+			if generate:
+				coverRectangle(mapObj, left, top, width, band_top + rows, side_length)
+
+				#the chunks of the bands above are not needed anymore
+				mapObj.store.evict()
+
+			rgb = numpy.empty( (rows, width, 3), numpy.uint8 )
+			for block_left in range(0, width, block):
+				columns = min(block, width - block_left)
+				rgb[:, block_left : block_left + columns] = rasterise(mapObj, left + block_left, top + band_top, columns, rows, side_length)[0]
+			writer.writeBand(rgb)
+	finally:
+		writer.close()
+
+
+def main():
+	'''
+	Command line entry point: writes image of a saved map, or of a new map generated band by band.
+	'''
+
+	parser = argparse.ArgumentParser(description="Export hex map into PNG or PPM image of any size.")
+	parser.add_argument("output", help="output image (.png or .ppm)")
+	parser.add_argument("--map", default=None, help="saved map file to export (a new map is generated if omitted)")
+	parser.add_argument("--seed", type=int, default=None, help="seed of the generated map (random if omitted)")
+	parser.add_argument("--width", type=int, default=None, help="image width in pixels (the whole saved map, or 1920 for a generated map if omitted)")
+	parser.add_argument("--height", type=int, default=None, help="image height in pixels (the whole saved map, or 1080 for a generated map if omitted)")
+	parser.add_argument("--tile-size", type=float, default=Tile.side_length, help="side length of the tiles in pixels")
+	parser.add_argument("--centre", type=int, nargs=2, metavar=("Q", "R"), default=None, help="axial coordinates of the tile in the image centre (the centre of the saved map if omitted)")
+	parser.add_argument("--band", type=int, default=64, help="number of image rows rasterised at once")
+	args = parser.parse_args()
+
+	side_length = args.tile_size
+
+	if args.map != None:
+		#the saved chunks are only read, so they are not loaded into memory
+		mapObj = Map.load(args.map, 0, 0)
+		left, top, width, height = mapRectangle(mapObj, side_length)
+		if args.centre != None:
+			centre_x, centre_y = geometryPkg.tileCentres(*args.centre, side_length)
+		else:
+			centre_x, centre_y = left + width / 2, top + height / 2
+
+		width = args.width if args.width != None else width
+		height = args.height if args.height != None else height
+		left, top = round(centre_x - width / 2), round(centre_y - height / 2)
+		generate = False
+	else:
+		#the generated map grows down from the row of the tile (0, 0) and the chunks of the finished bands go to the spill file,
+		#so only about three rows of chunks are in memory; the image is centred horizontally on the tile (0, 0)
+		width = args.width if args.width != None else 1920
+		height = args.height if args.height != None else 1080
+		mapObj = Map(0, 0, args.seed)
+		mapObj.store.budget = 3 * ( math.ceil(width / (2*geometryPkg.half_width*side_length) / mapObj.store.chunk_size) + 2 )
+		left, top = -(width // 2), 0
+		generate = True
+
+	exportImage(mapObj, args.output, left, top, width, height, side_length, args.band, generate=generate)
+	mapObj.store.close()
+	print(f"{width} x {height} pixels written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
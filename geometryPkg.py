@@ -0,0 +1,62 @@
+import numpy
+
+
+#distance of the hexagon's centre from its vertical sides in side lengths (rounded as in all the plots)
+half_width = 0.866
+
+#offsets of the hexagon's vertices from its centre in side lengths, clockwise from the top one
+vertex_offsets = numpy.array( [(0, -1), (half_width, -0.5), (half_width, 0.5), (0, 1), (-half_width, 0.5), (-half_width, -0.5)] )
+
+#offsets of the middles of the hexagon's sides from its centre in side lengths, in the order of Tile.sides (w, nw, ne, e, se, sw); the rivers cross the sides there
+side_offsets = numpy.array( [(-half_width, 0), (-0.5*half_width, -0.75), (0.5*half_width, -0.75), (half_width, 0), (0.5*half_width, 0.75), (-0.5*half_width, 0.75)] )
+
+
+def tileCentres(qs, rs, side_length :float) -> tuple:
+	'''
+	Returns world coordinates (xs, ys) of the centres of the tiles on @qs and @rs (int or numpy.ndarray) axial coordinates. The tile (0, 0) is in the world origin.
+	'''
+
+	#every step in q moves the tile by two half-widths, every step in r by one half-width
+	return (2*qs + rs) * half_width * side_length, rs * 1.5 * side_length
+
+
+def nearestTiles(xs :numpy.ndarray, ys :numpy.ndarray, side_length :float) -> tuple:
+	'''
+	Returns axial coordinates (qs, rs) (numpy.ndarray of int64) of the tiles containing the points on @xs and @ys (numpy.ndarray) world coordinates.
+	'''
+
+	#fractional axial coordinates, inverse of tileCentres
+	rs = ys / (1.5*side_length)
+	qs = (xs / (half_width*side_length) - rs) / 2
+
+	#round the cube coordinates (q, -q-r, r) and fix the one which was rounded the most, so that they sum up to zero
+	round_qs, round_ss, round_rs = numpy.rint(qs), numpy.rint(-qs - rs), numpy.rint(rs)
+	diff_qs, diff_ss, diff_rs = numpy.abs(round_qs - qs), numpy.abs(round_ss + qs + rs), numpy.abs(round_rs - rs)
+
+	fix_qs = (diff_qs > diff_ss) & (diff_qs > diff_rs)
+	fix_rs = ~fix_qs & (diff_rs > diff_ss)
+	round_qs[fix_qs] = -round_ss[fix_qs] - round_rs[fix_qs]
+	round_rs[fix_rs] = -round_qs[fix_rs] - round_ss[fix_rs]
+	return round_qs.astype(numpy.int64), round_rs.astype(numpy.int64)
+
+
+def hexagonVertices(xs :numpy.ndarray, ys :numpy.ndarray, side_length :float) -> numpy.ndarray:
+	'''
+	Returns (n, 12) array of the vertices of the hexagons with centres on @xs and @ys (numpy.ndarray), as x0, y0, x1, y1, ... (the form of tkinter polygon coordinates).
+	'''
+
+	vertices = numpy.empty( (len(xs), 6, 2) )
+	vertices[:, :, 0] = numpy.asarray(xs)[:, None] + vertex_offsets[:, 0] * side_length
+	vertices[:, :, 1] = numpy.asarray(ys)[:, None] + vertex_offsets[:, 1] * side_length
+	return vertices.reshape( (len(xs), 12) )
+
+
+def sideMiddles(xs :numpy.ndarray, ys :numpy.ndarray, sides :numpy.ndarray, side_length :float) -> tuple:
+	'''
+	Returns coordinates (xs, ys) (numpy.ndarray) of the middles of the @sides (numpy.ndarray, indices into Tile.sides) of the hexagons with centres on @xs and @ys (numpy.ndarray).
+	Side -1 stands for the centre itself.
+	'''
+
+	sides = numpy.asarray(sides)
+	offsets = numpy.where( (sides >= 0)[:, None], side_offsets[sides], 0 )
+	return numpy.asarray(xs) + offsets[:, 0] * side_length, numpy.asarray(ys) + offsets[:, 1] * side_length
@@ -0,0 +1,51 @@
+from mapPkg import Map, Tile
+from viewportPkg import Viewport
+import argparse
+import numpy
+
+#per-tile arrays returned by _generateRegion_ (besides the axial coordinates "q", "r" and the canvas coordinates "x", "y" of the tiles' centres)
+region_fields = ["altitude", "is_lake", "biome", "river_in", "river_out", "river_source", "river_flow", "river_order"]
+
+
+def generateRegion(columns :int, rows :int, seed :int = None, workers :int = None) -> dict:
+	'''
+	Generates map region of approximately @columns (int) times @rows (int) tiles without any GUI, large regions in up to @workers (int) processes (number of CPUs if None).
+	Returns dictionary of per-tile arrays "q", "r" (axial coordinates), "x", "y" (canvas coordinates) and the _region_fields_, ordered by rows.
+	'''
+
+	#the region is generated as if it was plotted on canvas of the corresponding size
+	width = columns * 2*0.866*Tile.side_length
+	height = rows * 1.5*Tile.side_length
+	mapObj = Map(width / 2, height / 2, seed)
+	mapObj.generateGraph( Viewport(width, height, margin=0), workers )
+
+	q0, r0, q1, r1 = mapObj.bounds()
+	arrays = mapObj.queryRegion(q0, r0, q1, r1, region_fields)
+	tile_rows, tile_columns = numpy.nonzero(arrays["exists"])
+
+	region = {"q": tile_columns + q0, "r": tile_rows + r0}
+	region.update( {field: arrays[field][tile_rows, tile_columns] for field in region_fields} )
+	region["x"], region["y"] = mapObj.tilePosition(region["q"], region["r"])
+	return region
+
+
+def main():
+	'''
+	Command line entry point: generates a region and writes its arrays into a .npz file.
+	'''
+
+	parser = argparse.ArgumentParser(description="Generate hex map region without GUI.")
+	parser.add_argument("columns", type=int, help="approximate number of tiles in a row")
+	parser.add_argument("rows", type=int, help="approximate number of rows")
+	parser.add_argument("--seed", type=int, default=None, help="seed of the map (random if omitted)")
+	parser.add_argument("--output", default="region.npz", help="output .npz file")
+	parser.add_argument("--workers", type=int, default=None, help="maximal number of processes generating the terrain (number of CPUs if omitted, 1 for serial generation)")
+	args = parser.parse_args()
+
+	region = generateRegion(args.columns, args.rows, args.seed, args.workers)
+	numpy.savez_compressed(args.output, **region)
+	print(f"{len(region['q'])} tiles written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,122 @@
+from profilePkg import profiler
+import time
+import math
+
+
+class PanController:
+	'''
+	Class panning the map by held keys. The key presses and releases only change the set of held keys, and a frame loop driven by root.after moves the map
+	once per frame by the distance travelled since the previous frame, so slow frames do not pile up key events and the map stops as soon as the keys are released.
+	'''
+
+	#(dx, dy) direction in which the map moves while the key is held (the map moves against the camera)
+	directions = {	"w": (0, 1),
+					"a": (1, 0),
+					"s": (0, -1),
+					"d": (-1, 0)
+				}
+
+
+	def __init__(self, root, move, speed :float = 400, frame_rate :float = 60, max_frame_time :float = 0.1):
+		'''
+		Constructor of PanController class.
+		@root (tkinter.Tk) ... The GUI root window, whose key events are tracked.
+		@move (function) ... Function moving the map by (dx, dy) pixels (e.g. WindowHandler.moveMap).
+		@speed (float) ... Panning speed in pixels per second.
+		@frame_rate (float) ... Target number of frames per second.
+		@max_frame_time (float) ... Longest time in seconds which is converted to movement in one frame, so that the map does not jump after a stall.
+		'''
+
+		self.root = root
+		self.move = move
+		self.speed = speed
+		self.frame_interval = 1 / frame_rate
+		self.max_frame_time = max_frame_time
+
+		#keys which are currently held
+		self.held = set()
+
+		#distance which was not moved yet, because the map moves by whole pixels
+		self.pending_x = 0.0
+		self.pending_y = 0.0
+
+		#time of the previous frame, None if the frame loop is not running
+		self.last_frame = None
+
+		root.bind("<KeyPress>", self.keyPress)
+		root.bind("<KeyRelease>", self.keyRelease)
+
+		#keys released while the window is not focused would stay held
+		root.bind("<FocusOut>", lambda event: self.held.clear())
+
+
+	def keyPress(self, event):
+		'''
+		Notes the pressed key and starts the frame loop if it is not running. The repeated presses of a held key change nothing.
+		'''
+
+		key = event.keysym.lower()
+		if key not in PanController.directions:
+			return
+
+		self.held.add(key)
+		if self.last_frame == None:
+			self.last_frame = time.perf_counter()
+			self.root.after( self.frameDelay(0), self.frame )
+
+
+	def keyRelease(self, event):
+		'''
+		Notes the released key.
+		'''
+
+		self.held.discard( event.keysym.lower() )
+
+
+	def velocity(self) -> tuple:
+		'''
+		Returns (vx, vy) velocity of the map in pixels per second given by the held keys. Diagonal movement is as fast as the straight one.
+		'''
+
+		vx = sum(PanController.directions[key][0] for key in self.held)
+		vy = sum(PanController.directions[key][1] for key in self.held)
+		length = math.hypot(vx, vy)
+
+		if length == 0:	return 0.0, 0.0
+		return self.speed * vx / length, self.speed * vy / length
+
+
+	def frameDelay(self, work :float) -> int:
+		'''
+		Returns the number of milliseconds until the next frame, after a frame whose work took @work (float) seconds.
+		'''
+
+		return max( 1, round(1000 * (self.frame_interval - work)) )
+
+
+	def frame(self):
+		'''
+		Moves the map by the whole pixels travelled since the previous frame and schedules the next frame. The loop stops when no key is held.
+		'''
+
+		now = time.perf_counter()
+		elapsed = min(now - self.last_frame, self.max_frame_time)
+		self.last_frame = now
+
+		vx, vy = self.velocity()
+		if vx == 0 and vy == 0:
+			self.last_frame = None
+			self.pending_x = self.pending_y = 0.0
+			return
+
+		self.pending_x += vx * elapsed
+		self.pending_y += vy * elapsed
+		dx, dy = math.trunc(self.pending_x), math.trunc(self.pending_y)
+		self.pending_x -= dx
+		self.pending_y -= dy
+
+		if dx != 0 or dy != 0:
+			self.move(dx, dy)
+			profiler.count("frames moved")
+
+		self.root.after( self.frameDelay(time.perf_counter() - now), self.frame )
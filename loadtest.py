@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import json
+import time
+import numpy
+
+
+async def request(reader :asyncio.StreamReader, writer :asyncio.StreamWriter, path :str) -> tuple:
+	'''
+	Sends GET request of @path (str) over the open connection (@reader, @writer) and returns the response's (status code, body).
+	'''
+
+	writer.write( f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: keep-alive\r\n\r\n".encode() )
+	await writer.drain()
+
+	status = int( (await reader.readline()).split()[1] )
+	length = 0
+	while True:
+		header = await reader.readline()
+		if header in [b"\r\n", b""]:
+			break
+		name, _, value = header.decode("latin-1").partition(":")
+		if name.strip().lower() == "content-length":
+			length = int(value)
+	return status, await reader.readexactly(length)
+
+
+async def connect(host :str, port :int, unix_path :str) -> tuple:
+	'''
+	Opens connection to the server on @host (str) and @port (int), or on Unix socket @unix_path (str) if it is given.
+	'''
+
+	if unix_path != None:
+		return await asyncio.open_unix_connection(unix_path)
+	return await asyncio.open_connection(host, port)
+
+
+async def client(host :str, port :int, unix_path :str, keys :numpy.ndarray, latencies :list, errors :list):
+	'''
+	Requests the chunks on @keys (numpy.ndarray of (cq, cr) rows) one by one over one connection, and appends the latency of every request to @latencies (list)
+	and the failed requests to @errors (list).
+	'''
+
+	reader, writer = await connect(host, port, unix_path)
+	try:
+		for cq, cr in keys.tolist():
+			start = time.perf_counter()
+			status, body = await request(reader, writer, f"/chunk/{cq}/{cr}")
+			latencies.append( time.perf_counter() - start )
+			if status != 200:
+				errors.append( (cq, cr, status, body[:100]) )
+	finally:
+		writer.close()
+
+
+async def loadTest(host :str, port :int, unix_path :str, clients :int, requests :int, radius :int, seed :int) -> dict:
+	'''
+	Sends @requests (int) requests of random chunks with coordinates from -@radius to @radius (int) from @clients (int) concurrent connections.
+	Returns the numbers of requests and errors, requests per second, latency percentiles and the server's statistics.
+	'''
+
+	#the chunks near the centre are requested more often, as by tools looking at the same part of the world
+	rng = numpy.random.default_rng(seed)
+	keys = numpy.clip( numpy.rint(rng.normal(0, radius / 2, (requests, 2))), -radius, radius ).astype(numpy.int64)
+
+	latencies, errors = [], []
+	start = time.perf_counter()
+	await asyncio.gather( *[client(host, port, unix_path, part, latencies, errors) for part in numpy.array_split(keys, clients)] )
+	seconds = time.perf_counter() - start
+
+	reader, writer = await connect(host, port, unix_path)
+	stats = json.loads( (await request(reader, writer, "/stats"))[1] )
+	writer.close()
+
+	milliseconds = 1000 * numpy.array(latencies)
+	return {	"requests": len(latencies),
+				"errors": len(errors),
+				"seconds": seconds,
+				"requests_per_second": len(latencies) / seconds,
+				"p50_ms": float( numpy.percentile(milliseconds, 50) ),
+				"p99_ms": float( numpy.percentile(milliseconds, 99) ),
+				"max_ms": float( milliseconds.max() ),
+				"server": stats
+			}
+
+
+def main():
+	'''
+	Command line entry point: load-tests a running chunk server (see server.py).
+	'''
+
+	parser = argparse.ArgumentParser(description="Load-test the chunk server.")
+	parser.add_argument("--host", default="127.0.0.1", help="address of the server")
+	parser.add_argument("--port", type=int, default=8765, help="port of the server")
+	parser.add_argument("--unix", default=None, help="Unix socket of the server instead of the port")
+	parser.add_argument("--clients", type=int, default=16, help="number of concurrent connections")
+	parser.add_argument("--requests", type=int, default=5000, help="total number of requests")
+	parser.add_argument("--radius", type=int, default=20, help="largest requested chunk coordinate")
+	parser.add_argument("--seed", type=int, default=0, help="seed of the requested coordinates")
+	parser.add_argument("--output", default=None, help="JSON file for the results")
+	args = parser.parse_args()
+
+	result = asyncio.run( loadTest(args.host, args.port, args.unix, args.clients, args.requests, args.radius, args.seed) )
+	print(f"{result['requests']} requests ({result['errors']} errors) in {result['seconds']:.2f} s   {result['requests_per_second']:.0f} requests/s   p50 {result['p50_ms']:.2f} ms   p99 {result['p99_ms']:.2f} ms   max {result['max_ms']:.2f} ms")
+	print("server:", ", ".join(f"{name} {value}" for name, value in result["server"].items()))
+
+	if args.output != None:
+		with open(args.output, "w") as file:
+			json.dump(result, file, indent=1)
+
+
+if __name__ == "__main__":
+	main()
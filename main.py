@@ -1,3 +1,25 @@
-import GUI
+import argparse
 
-gui = GUI.WindowHandler()
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Hex map generator.")
+	parser.add_argument("seed", type=int, nargs="?", default=None, help="seed of the generated map (random if omitted)")
+	parser.add_argument("--renderer", choices=["polygon", "raster"], default="polygon", help="plot the map as one canvas item per hexagon, or as pre-rendered images")
+	parser.add_argument("--map", default=None, help="map file to open (if it exists) and to save the map into on exit")
+	parser.add_argument("--profile", action="store_true", help="measure the stages of map generation and panning and show the frame times on the canvas (F3 toggles it)")
+	parser.add_argument("--profile-output", default=None, help="JSON file for the stage latency histograms and event counts, written on exit (implies --profile)")
+	parser.add_argument("--trace-output", default=None, help="Chrome trace file of all measured stage runs, written on exit (implies --profile)")
+	args = parser.parse_args()
+
+	from profilePkg import profiler
+	if args.profile or args.profile_output != None or args.trace_output != None:
+		profiler.enable(tracing=args.trace_output != None)
+
+	#tkinter is loaded only here, the map generation itself does not need it (see headless.py)
+	import GUI
+
+	gui = GUI.WindowHandler(args.seed, args.renderer, args.map)
+
+	if args.profile_output != None:
+		profiler.dumpJSON(args.profile_output)
+	if args.trace_output != None:
+		profiler.dumpTrace(args.trace_output)
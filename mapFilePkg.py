@@ -0,0 +1,157 @@
+from chunkPkg import Chunk, ChunkStore
+import sandpilePkg
+import numpy
+import struct
+import json
+import os
+
+
+#first bytes of every map file, the last two of them are the version of the format
+magic = b"HEXMAP\x00\x02"
+
+#magic, length of the metadata, offset of the chunk index, offset of the first chunk record and number of chunks, followed by the metadata in JSON
+prelude = struct.Struct("<8sQQQQ")
+
+#fields saved for every chunk; the plot state is not saved, it is created again when the map is plotted
+saved_fields = ["exists", "altitude", "is_lake", "biome", "river_in", "river_out", "river_source", "river_flow", "river_order"]
+
+#chunk index entry: key (sandpilePkg.hexKeys of the chunk coordinates, the index is sorted by it), chunk coordinates and offset of the chunk's record
+index_dtype = numpy.dtype( [("key", "<i8"), ("cq", "<i4"), ("cr", "<i4"), ("offset", "<i8")] )
+
+#records are aligned to this number of bytes
+alignment = 64
+
+
+def recordDtype(chunk_size :int) -> numpy.dtype:
+	'''
+	Returns data type of the record holding the _saved_fields_ of one chunk of @chunk_size (int) tiles on its side.
+	'''
+
+	return numpy.dtype( [(name, numpy.dtype(Chunk.fields[name]).newbyteorder("<"), (chunk_size, chunk_size)) for name in saved_fields] )
+
+
+def align(offset :int) -> int:
+	'''
+	Returns the first multiple of _alignment_ which is not smaller than @offset (int).
+	'''
+
+	return -(-offset // alignment) * alignment
+
+
+def writeMapFile(path :str, metadata :dict, store :ChunkStore):
+	'''
+	Writes all chunks of @store (ChunkStore) and @metadata (dict, JSON-serialisable description of the map) to map file on @path (str).
+	The file is written under temporary name first, so that a map loaded from the same path can be saved back.
+	'''
+
+	chunk_size = store.chunk_size
+	keys = sorted( store.keys(), key=lambda key: int(sandpilePkg.hexKeys(*key)) )
+	dtype = recordDtype(chunk_size)
+
+	metadata = dict(metadata, chunk_size=chunk_size, fields=saved_fields)
+	encoded = json.dumps(metadata).encode()
+	index_offset = align(prelude.size + len(encoded))
+	data_offset = align(index_offset + len(keys) * index_dtype.itemsize)
+
+	index = numpy.zeros(len(keys), index_dtype)
+	index["cq"] = [cq for cq, _ in keys]
+	index["cr"] = [cr for _, cr in keys]
+	index["key"] = sandpilePkg.hexKeys(index["cq"], index["cr"])
+	index["offset"] = data_offset + numpy.arange(len(keys)) * dtype.itemsize
+
+	temporary_path = path + ".tmp"
+	with open(temporary_path, "wb") as file:
+		file.write( prelude.pack(magic, len(encoded), index_offset, data_offset, len(keys)) )
+		file.write(encoded)
+		file.seek(index_offset)
+		file.write( index.tobytes() )
+		file.seek(data_offset)
+
+		record = numpy.zeros(1, dtype)
+		for key in keys:
+			arrays = store.peek(key)
+			for name in saved_fields:
+				record[0][name] = arrays[name]
+			file.write( record.tobytes() )
+
+	os.replace(temporary_path, path)
+
+
+class MapFile:
+	'''
+	Class reading map file written by _writeMapFile_. The chunk index and the chunks are memory-mapped, so only the accessed chunks are read from the disk.
+	'''
+
+	def __init__(self, path :str):
+		'''
+		Constructor of MapFile class.
+		@path (str) ... Path of the map file.
+		'''
+
+		with open(path, "rb") as file:
+			header = file.read(prelude.size)
+			if len(header) < prelude.size or header[:6] != magic[:6]:
+				raise ValueError(f"{path} is not a map file")
+			if header[:len(magic)] != magic:
+				raise ValueError(f"{path} was saved by another version of the map file format")
+
+			_, length, index_offset, data_offset, count = prelude.unpack(header)
+			self.metadata = json.loads( file.read(length) )
+
+		self.path = path
+		self.chunk_size = self.metadata["chunk_size"]
+		self.dtype = recordDtype(self.chunk_size)
+		self.data_offset = data_offset
+
+		#numpy.memmap can not map empty arrays
+		if count == 0:
+			self.index = numpy.zeros(0, index_dtype)
+			self.records = numpy.zeros(0, self.dtype)
+		else:
+			self.index = numpy.memmap(path, dtype=index_dtype, mode="r", offset=index_offset, shape=(count,))
+			self.records = numpy.memmap(path, dtype=self.dtype, mode="r", offset=data_offset, shape=(count,))
+
+
+	def position(self, key :tuple) -> int:
+		'''
+		Returns the position of the chunk on @key (tuple) chunk coordinates in the index, or -1 if the file does not contain it.
+		'''
+
+		hex_key = sandpilePkg.hexKeys(*key)
+		keys = self.index["key"]
+		position = int( numpy.searchsorted(keys, hex_key) )
+		return position if position < len(keys) and keys[position] == hex_key else -1
+
+
+	def __contains__(self, key :tuple) -> bool:
+		return self.position(key) != -1
+
+
+	def keys(self) -> list[tuple]:
+		'''
+		Returns (cq, cr) coordinates of all the chunks in the file.
+		'''
+
+		return list( zip(self.index["cq"].tolist(), self.index["cr"].tolist()) )
+
+
+	def read(self, key :tuple) -> dict:
+		'''
+		Returns copies of the saved arrays of the chunk on @key (tuple) chunk coordinates. Raises KeyError if the file does not contain the chunk.
+		'''
+
+		position = self.position(key)
+		if position == -1:
+			raise KeyError(key)
+
+		record = self.records[ (int(self.index[position]["offset"]) - self.data_offset) // self.dtype.itemsize ]
+		return {name: numpy.array(record[name], Chunk.fields[name]) for name in saved_fields}
+
+
+	def close(self):
+		'''
+		Releases the memory maps.
+		'''
+
+		self.index = numpy.zeros(0, index_dtype)
+		self.records = numpy.zeros(0, self.dtype)
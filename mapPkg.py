@@ -1,18 +1,79 @@
 from riverPkg import RiverSegment, RiverVertex
-from linkedListPkg import LinkedList
+from chunkPkg import Chunk, ChunkStore
+from mapFilePkg import MapFile, writeMapFile
+from pyramidPkg import TerrainPyramid
+from tileSetPkg import TileSet
+from terrainPkg import Terrain
+from parallelPkg import generateChunks, countWorkers
+from viewportPkg import Viewport
+from profilePkg import profiler
+from concurrent.futures import Future
+import geometryPkg
+import math
 import numpy
 
 
+def tileField(name :str, doc :str) -> property:
+	'''
+	Creates property of Tile class, which reads and writes @name (str) field of the tile's chunk.
+	@doc (str) ... Docstring of the property.
+	'''
+
+	def getter(tile):
+		if not tile.chunk.resident:	tile.relocate()
+		return tile.chunk.arrays[name].item(tile.i, tile.j)
+
+	def setter(tile, value):
+		if not tile.chunk.resident:	tile.relocate()
+		tile.chunk.arrays[name][tile.i, tile.j] = value
+
+	return property(getter, setter, doc=doc)
+
+
+#fields returned by Map.queryRegion by default
+query_fields = ["altitude", "is_lake", "biome", "river_out"]
+
+#biomes of the tiles (the tiles store their indices as uint8 codes) and their fill colours, which all the renderers look up by the codes;
+#the land biomes follow in the order of altitude
+biomes = ["ocean", "lake", "lowland", "plains", "upland", "hills", "mountains"]
+biome_colours = ["#0022BB", "#0022BB", "#007000", "#005000", "#003000", "#444444", "#AAAAAA"]
+
+#altitudes at which the land biomes change (the ocean is below zero and the lakes are given by the rivers), there is one less threshold than land biomes
+biome_thresholds = [0.1, 0.2, 0.3, 0.45]
+
+
+def classifyBiomes(altitude :numpy.ndarray, is_lake :numpy.ndarray) -> numpy.ndarray:
+	'''
+	Returns biome codes (numpy.ndarray of uint8, indices into _biomes_) of the tiles with @altitude and @is_lake (numpy.ndarray).
+	'''
+
+	codes = ( biomes.index("lowland") + numpy.digitize(altitude, biome_thresholds) ).astype(numpy.uint8)
+	codes[is_lake] = biomes.index("lake")
+	codes[altitude < 0] = biomes.index("ocean")
+	return codes
+
+
+def riverWidth(order):
+	'''
+	Returns plot width in pixels of rivers of Strahler @order (int or numpy.ndarray), the first order rivers are 3 pixels wide.
+	'''
+
+	return 2 + order
+
+
 class Tile:
 	'''
-	Class representing map tiles.
+	Class representing map tiles. Tile is only a view over the tile's entry in ChunkStore.
 	'''
+
+	#a view is created for every visited tile, the fixed attributes keep it small
+	__slots__ = ("store", "q", "r", "chunk", "i", "j")
 	
 	#length of tile side for plotting
 	side_length = 25
 
-	#coefficients used for calculating tile's coordinates based on neighbouring tile's coordinates
-	#if @tile_1 coordinates (x_1, y_1) are known and @tile_2 is located on @side of @tile_1, then
+	#differences of coordinates of neighbouring tiles
+	#if @tile_2 is located on @side of @tile_1, then
 	# x_2 = x_1 + tile_delta_xs[side] * side_length
 	# y_2 = y_1 + tile_delta_ys[side] * side_length 
 	delta_xs = {	"w": -2*0.866, 
@@ -28,6 +89,21 @@ class Tile:
 					"e": 0, 
 					"se": 1.5, 
 					"sw": 1.5}
+
+	#axial coordinates of the tile on @side of tile (q, r) are (q + delta_qs[side], r + delta_rs[side])
+	delta_qs = {	"w": -1,
+					"nw": 0,
+					"ne": 1,
+					"e": 1,
+					"se": 0,
+					"sw": -1}
+
+	delta_rs = {	"w": 0,
+					"nw": -1,
+					"ne": -1,
+					"e": 0,
+					"se": 1,
+					"sw": 1}
 	
 	opposing_sides = {	"w": "e",
 						"nw": "se",
@@ -36,91 +112,181 @@ class Tile:
 						"se": "nw",
 						"sw": "ne"}
 
+	#order of sides in the river flags (side i corresponds to bit 1 << i)
+	sides = ["w", "nw", "ne", "e", "se", "sw"]
+
+	#whether the tile is part of the map (chunks may contain tiles which were not generated yet)
+	exists = tileField("exists", "Whether the tile was generated.")
 
-	def __init__(self, iterator_state :bool = False):
+	#tile biome parameters
+	altitude = tileField("altitude", "Altitude of the tile, bounded in [-1, 1].")
+	is_lake = tileField("is_lake", "Whether the tile is a lake.")
+	biome = tileField("biome", "Biome code of the tile, index into mapPkg.biomes.")
+
+	#river flags (bit mask of sides from which rivers flow in, index of the side to which a river flows out or -1, whether a river has a source here)
+	river_in = tileField("river_in", "Bit mask of the sides from which rivers flow into the tile.")
+	river_out = tileField("river_out", "Index of the side to which a river flows out of the tile, or -1.")
+	river_source = tileField("river_source", "Whether a river has a source in the tile.")
+
+	#river size (number of tiles from which the water flows through the tile, Strahler order of the river in the tile or 0)
+	river_flow = tileField("river_flow", "Number of tiles from which the water flows through the tile, including the tile itself.")
+	river_order = tileField("river_order", "Strahler order of the river flowing through the tile, 0 if there is no river.")
+
+	#tkinter-canvas hexagon object
+	gui_id = tileField("gui_id", "Canvas id of the tile's hexagon.")
+
+	#is plotted on canvas
+	gui_active = tileField("gui_active", "Whether the tile is plotted on canvas (set by Map.activate and Map.deactivate).")
+
+	#was ever plotted
+	was_plotted = tileField("was_plotted", "Whether the tile was ever plotted.")
+
+
+
+	def __init__(self, store :ChunkStore, q :int, r :int):
 		'''
 		Constructor of Tile class.
-		@iterator_state (bool) ... Internal variable used for consistency when looping over map.
+		@store (ChunkStore) ... The store containing this tile's data.
+		@q (int) ... Axial q coordinate of this tile.
+		@r (int) ... Axial r coordinate of this tile.
+		'''
+
+		self.store = store
+		self.q = q
+		self.r = r
+
+		#the chunk containing this tile's data and the tile's indices in the chunk's arrays
+		self.chunk, self.i, self.j = store.locate(q, r)
+
+
+	def relocate(self):
+		'''
+		Finds this tile's chunk again after the original chunk was evicted from memory.
 		'''
 
-		#neighbour compass directions
-		self.neighbours = {	"w": None,
-							"nw": None,
-							"ne": None,
-							"e": None,
-							"se": None,
-							"sw": None}
+		self.chunk, self.i, self.j = self.store.locate(self.q, self.r)
+
+
+	@property
+	def x(self) -> float:
+		'''
+		World x coordinate of the tile's centre (the tile on axial coordinates (0, 0) is in the world origin). Canvas coordinates are shifted by the map's origin.
+		'''
 
-		#tile biome parameters
-		self.altitude = None
-		self.is_lake = False
-		self.rivers = []
+		return geometryPkg.tileCentres(self.q, self.r, Tile.side_length)[0]
 
-		self.setAltitude()
 
-		#centre coordinates
-		self.x = None
-		self.y = None
+	@property
+	def y(self) -> float:
+		'''
+		World y coordinate of the tile's centre.
+		'''
 
-		#tkinter-canvas hexagon object
-		self.gui_id = None
+		return geometryPkg.tileCentres(self.q, self.r, Tile.side_length)[1]
 
-		#noting which tiles were already visited by iterator
-		self.iterator_state = iterator_state
 
-		#is plotted on canvas
-		self.gui_active = False
+	def __eq__(self, other):
+		if not isinstance(other, Tile):	return NotImplemented
+		return self.q == other.q and self.r == other.r and self.store is other.store
 
-		#was ever plotted
-		self.was_plotted = False
 
-		#plot fill colour
-		self.colour = None
+	def __hash__(self):
+		return hash( (self.q, self.r) )
 
 
-	def getExistingNeighbours(self) -> dict:
+	@property
+	def colour(self) -> str:
 		'''
-		Returns dictionary of neighbouring tiles which are not None.
+		Plot fill colour of the tile, given by its biome.
 		'''
 
-		return {key: value for key, value in self.neighbours.items() if value != None}
+		return biome_colours[self.biome]
 
 
-	def setAltitude(self):
+	@property
+	def neighbours(self) -> tuple:
 		'''
-		Sets first random altitude of this tile, which is later updated by Map._updateSandpiles_.
+		Tuple of the six neighbouring tiles in the order of Tile.sides (None for tiles which do not exist).
 		'''
 
-		self.altitude = numpy.random.choice([-1, 1])
+		return tuple( self.getNeighbour(side) for side in Tile.sides )
 
 
-	def isRiverStart(self):
+	def getNeighbour(self, side :str):
 		'''
-		Determines, whether a river should have a source in this tile.
+		Returns the tile on this tile's @side (str), or None if it does not exist.
 		'''
 
-		k = 0.1
-		if numpy.random.random() < k*self.altitude:	return True
-		return False
+		tile = Tile(self.store, self.q + Tile.delta_qs[side], self.r + Tile.delta_rs[side])
+		return tile if tile.chunk != None and tile.exists else None
 
 
-	def setRelativeCoordinates(self, tile, side :str):
+	def hasNeighbour(self, side :str) -> bool:
 		'''
-		Sets this tile's coordinates based on the @tile (Tile) coordinates, which has this tile on it's @side (str) side.
+		Returns True if the tile on this tile's @side (str) exists.
 		'''
 
-		self.x = tile.x + Tile.delta_xs[side] * Tile.side_length
-		self.y = tile.y + Tile.delta_ys[side] * Tile.side_length
+		return self.store.contains(self.q + Tile.delta_qs[side], self.r + Tile.delta_rs[side])
 
 
-	def bindTile(self, tile, side :str):
+	def getExistingNeighbours(self) -> dict:
 		'''
-		Connects @tile (Tile) to this tile's @side (str) (and vice versa). 
+		Returns dictionary of neighbouring tiles which are not None.
 		'''
-		
-		self.neighbours[side] = tile
-		opposing_side = Tile.opposing_sides[side]
-		tile.neighbours[opposing_side] = self
+
+		return {side: tile for side, tile in zip(Tile.sides, self.neighbours) if tile != None}
+
+
+	def hasRivers(self) -> bool:
+		'''
+		Returns True if any river flows through this tile.
+		'''
+
+		return self.river_in != 0 or self.river_out != -1 or self.river_source
+
+
+	@property
+	def rivers(self) -> tuple:
+		'''
+		Tuple of river parts (RiverVertex || RiverSegment) in this tile, created from its river flags. Tiles without rivers share one empty tuple, and only the other tiles cache their rivers.
+		'''
+
+		if not self.chunk.resident:	self.relocate()
+		key = (self.i, self.j)
+		if key in self.chunk.rivers:
+			return self.chunk.rivers[key]
+
+		if not self.hasRivers():
+			return ()
+
+		rivers = []
+		out_side = Tile.sides[self.river_out] if self.river_out != -1 else None
+		in_sides = [side for i, side in enumerate(Tile.sides) if self.river_in & (1 << i)]
+
+		#the river flowing out of this tile either starts here, or continues from one of the incoming rivers
+		if self.river_source:
+			river = RiverVertex(is_start=True)
+			river.end_side = out_side
+			rivers.append(river)
+		elif out_side != None:
+			river = RiverSegment()
+			river.start_side = in_sides.pop(0)
+			river.end_side = out_side
+			rivers.append(river)
+
+		#the other incoming rivers end here
+		for side in in_sides:
+			river = RiverVertex(is_start=False)
+			river.end_side = side
+			rivers.append(river)
+
+		#larger rivers are wider (the first order rivers have the default width)
+		for river in rivers:
+			river.width = riverWidth(self.river_order)
+
+		rivers = tuple(rivers)
+		self.chunk.rivers[key] = rivers
+		return rivers
 
 
 class Map:
@@ -128,400 +294,474 @@ class Map:
 	Class representing the main map.
 	'''
 
-	def __init__(self, centre_x :float, centre_y :float):
+	def __init__(self, centre_x :float, centre_y :float, seed :int = None, chunk_budget :int = None, spill_path :str = None, archive :MapFile = None):
 		'''
 		Constructor of Map class.
 		@centre_x (float) ... x coordinate of the GUI canvas' centre.
 		@centre_y (float) ... y coordinate of the GUI canvas' centre.
+		@seed (int) ... Seed of the map's random generators; maps with the same seed are identical. Random seed is chosen if None.
+		@chunk_budget (int) ... Number of chunks kept in memory, the least recently used chunks without plotted tiles are moved to the spill file (unlimited if None).
+		@spill_path (str) ... Path of the file for the evicted chunks (anonymous temporary file if None).
+		@archive (MapFile) ... Saved map whose chunks are loaded on demand (see _load_), None for a new map.
 		'''
 
-		#the nearest tile to the canvas' centre
-		self.centre_tile = Tile()
-		self.centre_tile.x = centre_x
-		self.centre_tile.y = centre_y
+		self.seed = seed if seed != None else numpy.random.SeedSequence().entropy
 
-		#the tiles on the map edges
-		self.boundary_tiles = {	"left": LinkedList( [self.centre_tile] ), 
-								"up": LinkedList( [self.centre_tile] ), 
-								"right": LinkedList( [self.centre_tile] ), 
-								"down": LinkedList( [self.centre_tile]) 
-							}
+		#arrays of all the map's tiles; saved maps keep the chunk size they were generated with, because the terrain of the chunks depends on it
+		chunk_size = archive.chunk_size if archive != None else 32
+		self.store = ChunkStore(chunk_size, generate=self.generateChunk, budget=chunk_budget, spill_path=spill_path, archive=archive)
 
+		#generator of the chunks' terrain
+		self.terrain = Terrain(self.seed, self.store.chunk_size)
 
-	def tileIterator(self, active_only :bool = False):
+		#coarser copies of the terrain for plotting the map zoomed out
+		self.pyramid = TerrainPyramid(self.store)
+
+		#chunks whose terrain is being generated in advance (e.g. in background processes), futures of their arrays indexed by chunk coordinates
+		self.prefetched = {}
+
+		#canvas coordinates of the world origin (the centre of the tile on axial coordinates (0, 0)), moving it pans the whole map
+		self.origin_x = centre_x
+		self.origin_y = centre_y
+
+		#the nearest tile to the canvas' centre (saved maps always contain it)
+		if archive == None:
+			self.store.allocate(numpy.array([0]), numpy.array([0]))
+		self.centre_tile = Tile(self.store, 0, 0)
+
+		#the plotted tiles, counted by chunks
+		self.active = TileSet(self.store.chunk_size)
+
+		#the map consists of the tiles with rows r_min <= r <= r_max and columns column_min <= 2q + r <= column_max, so its edges are given by these bounds (see _boundary_)
+		self.r_min = self.r_max = 0
+		self.column_min = self.column_max = 0
+
+
+	def save(self, path :str):
 		'''
-		Iterator of the map tiles, which iterates over the whole map, or over the currently plotted tiles only, depending on the value of @active_only (bool).
+		Saves the map's terrain into map file on @path (str), see mapFilePkg. The plot state of the tiles is not saved.
+		'''
+
+		metadata = {	"seed": int(self.seed),
+						"centre": [self.centre_tile.q, self.centre_tile.r],
+						"extent": [self.r_min, self.r_max, self.column_min, self.column_max]
+					}
+		writeMapFile(path, metadata, self.store)
+
+
+	@classmethod
+	def load(cls, path :str, centre_x :float, centre_y :float, chunk_budget :int = None, spill_path :str = None) -> "Map":
 		'''
+		Opens map saved by _save_ on @path (str). The file is memory-mapped and its chunks are loaded only when they are accessed, so opening does not depend on the map's size.
+		The saved centre tile is placed on the canvas' centre (@centre_x, @centre_y (float)).
+		@chunk_budget (int) ... Number of chunks kept in memory (unlimited if None).
+		@spill_path (str) ... Path of the file for the evicted chunks (anonymous temporary file if None).
+		'''
+
+		archive = MapFile(path)
+		metadata = archive.metadata
+		mapObj = cls(centre_x, centre_y, metadata["seed"], chunk_budget, spill_path, archive)
+		mapObj.r_min, mapObj.r_max, mapObj.column_min, mapObj.column_max = metadata["extent"]
 
-		#iterator_state which marks the unvisited tiles
-		old_state = self.centre_tile.iterator_state
+		#pan the map so that the saved centre tile is in the canvas' centre
+		centre = Tile(mapObj.store, *metadata["centre"])
+		mapObj.moveOrigin(-centre.x, -centre.y)
+		mapObj.centre_tile = centre
+		return mapObj
 
-		#iterator state which marks the visited tiles
-		new_state = not old_state
 
-		#initialise DFS
-		stack = []
-		stack.append(self.centre_tile)
-		self.centre_tile.iterator_state = new_state
+	def generateChunk(self, chunk :Chunk):
+		'''
+		Fills in the terrain of the whole newly created @chunk (Chunk): its altitudes, rivers, lakes and biomes.
+		'''
 
-		#DFS
-		while stack != []:
-			tile = stack.pop()
+		#the chunk is already being generated in advance, so only wait for it to finish
+		future = self.prefetched.pop( (chunk.cq, chunk.cr), None )
+		with profiler.span("generateChunk"):
+			arrays = future.result() if future != None else self.terrain.generateChunk(chunk.cq, chunk.cr)
+		profiler.count("chunks prefetched" if future != None else "chunks generated")
 
-			#look at the current tile's neighbours and add to stack those that exist, were not visited yet and (optionally) are currently plotted
-			for key in ["w", "nw", "ne", "e", "se", "sw"]:
-				neighbour = tile.neighbours[key]
-				if neighbour != None and neighbour.iterator_state == old_state and (neighbour.gui_active or not active_only):	
-					neighbour.iterator_state = new_state
-					stack.append(neighbour)
+		for name, values in arrays.items():
+			chunk.arrays[name][:] = values
 
-			yield tile
+		#the biomes are classified once for the whole chunk, the renderers only look up their colours
+		chunk.arrays["biome"][:] = classifyBiomes(chunk.arrays["altitude"], chunk.arrays["is_lake"])
 
 
-	def updateCentreTile(self, centre_x :float, centre_y :float):
+	def tilePosition(self, q, r) -> tuple:
 		'''
-		Checks, whether there is a tile that is closer to the canvas centre than the current centre_tile. If there is that tile, it becomes map's new centre_tile.
-		@centre_x (float) ... Canvas' centre x position.
-		@centre_y (float) ... Canvas' centre y position.
+		Returns canvas (x, y) coordinates of the centre of the tile on (@q, @r) axial coordinates (int or numpy.ndarray), i.e. the tile's world coordinates shifted by the origin.
+		'''
+
+		xs, ys = geometryPkg.tileCentres(q, r, Tile.side_length)
+		return self.origin_x + xs, self.origin_y + ys
+
+
+	def moveOrigin(self, dx :float, dy :float):
+		'''
+		Pans the whole map on canvas by (@dx, @dy) (float). The tiles' world coordinates do not change.
+		'''
+
+		self.origin_x += dx
+		self.origin_y += dy
+
+
+	def visibleTiles(self, viewport :Viewport) -> dict:
+		'''
+		Returns the existing tiles inside the @viewport (Viewport) as dictionary, which maps row r to the (first q, last q) range of the row's visible tiles.
 		'''
 
-		#squared standard euclidean distance from the canvas' centre
-		def squareDistCentre(tile):	return (tile.x - centre_x)**2 + (tile.y - centre_y)**2
+		rows = {}
+		for r, (first, last) in viewport.visibleRows(self.origin_x, self.origin_y, Tile.side_length).items():
+			if self.r_min <= r <= self.r_max:
 
-		curr_dist = squareDistCentre(self.centre_tile)
-		
-		#go through the current centre_tile's neighbours; if a neighbour is closer to the canvas' centre, make it the new centre_tile
-		for key in self.centre_tile.getExistingNeighbours():
-			neighbour = self.centre_tile.neighbours[key]
-			if squareDistCentre(neighbour) < curr_dist:
-				self.centre_tile = neighbour
-				curr_dist = squareDistCentre(neighbour)
+				#clip the row to the map columns
+				first = max( first, -((r - self.column_min) // 2) )
+				last = min( last, (self.column_max - r) // 2 )
+				if first <= last:
+					rows[r] = (first, last)
+		return rows
 
 
-	def updateSandpiles(self, tiles :list[Tile]):
+	def missingSides(self, rows :dict) -> dict[str, bool]:
 		'''
-		Make the altitudes of @tiles (list[Tile]) more smooth by averaging tile altitude with its neighbours' altitudes. 
+		Returns which sides of the map need new layers, because some of the tiles given by @rows (dict, as returned by _visibleTiles_)
+		lacks its neighbour in the direction of that side ("w" for left, "nw" for up, "e" for right and "sw" for down).
 		'''
 
-		alpha = 20	#larger alpha means that the new altitude less depends on the current altitude and more on the neighbours' altitude
-		beta=0.01	#larger beta means stronger effect of random change of altitude
-		n = 5	#number of iterations of this method's averaging algorithm
+		directions = {"left": "w", "up": "nw", "right": "e", "down": "sw"}
+		need_new_layer = {key: False for key in directions}
 
-		for _ in range(n):
-			for tile in tiles:
-				neighbours = tile.getExistingNeighbours()
-				average_neighbouring_altitude = sum(neighbours[key].altitude for key in neighbours) / len(neighbours)
-				tile.altitude = (tile.altitude + alpha*average_neighbouring_altitude) / (1+alpha)
-				rand_shift = tile.altitude + beta*numpy.random.uniform(-1,1)
+		for r, (first, last) in rows.items():
+			for key, side in directions.items():
+				dq, dr = Tile.delta_qs[side], Tile.delta_rs[side]
 
-				#apply the random update only if the altitude is still bounded in [-1, 1]
-				if -1 <= rand_shift <= 1:	tile.altitude = rand_shift
+				#the row's tiles have neighbours in the row r + dr and the columns from 2*first + r + 2*dq + dr to 2*last + r + 2*dq + dr
+				if not (self.r_min <= r + dr <= self.r_max) or 2*(first + dq) + r + dr < self.column_min or 2*(last + dq) + r + dr > self.column_max:
+					need_new_layer[key] = True
 
+		return need_new_layer
 
-	def makeRivers(self, river_stack :list):
+
+	def tileCoordinates(self) -> tuple:
 		'''
-		Creates whole rivers from the @river_stack (list[ (Tile, RiverVertex || RiverSegment) ]) incomplete rivers and the tiles in which the rivers are contained. 
+		Returns axial coordinates (qs, rs) (numpy.ndarray) of all the map's tiles, ordered by chunks. The evicted and saved chunks are not loaded into memory.
 		'''
-		
-		while river_stack != []:
-			river_tile, river = river_stack.pop()
 
-			#find the current river_tile's sides in which the altitude decreases (rivers usually flow downstream) 
-			#and which were not plotted yet (for consistency, if the tile was already plotted without a river)
-			possible_directions = [key for key in river_tile.neighbours	if river_tile.neighbours[key] != None
-														and not river_tile.neighbours[key].was_plotted
-														and river_tile.altitude >= river_tile.neighbours[key].altitude]
-			
-			#the current river is located in local minimum of the map altitude function, so do not add it to river_tile.rivers and set the river_tile as lake instead 
-			if possible_directions == []:
-				river_tile.is_lake = True
+		qs, rs = [numpy.zeros(0, numpy.int64)], [numpy.zeros(0, numpy.int64)]
+		for cq, cr in sorted( self.store.keys(), key=lambda key: (key[1], key[0]) ):
+			rows, columns = numpy.nonzero( self.store.peek((cq, cr))["exists"] )
+			qs.append(columns + cq*self.store.chunk_size)
+			rs.append(rows + cr*self.store.chunk_size)
+		return numpy.concatenate(qs), numpy.concatenate(rs)
 
-			else:
-				#add the current river to river_tile's river list (mainly for future plotting)
-				river_tile.rivers.append(river)
-
-				#choose randomly the direction in which the current river should flow
-				direction = numpy.random.choice(possible_directions)
-				
-				#set the direction to the current river
-				river.end_side = direction
-				river.setCoords(river_tile)
-
-				#if there is no ocean in the direction, create new river part
-				new_river_tile = river_tile.neighbours[direction]
-				if new_river_tile.altitude >= 0:
-
-					#there is already a river in the new_river_tile, so end the current river's creation there with RiverVertex 
-					if new_river_tile.rivers != []:
-						new_river = RiverVertex(False)
-						new_river_tile.rivers.append(new_river)
-						new_river.end_side = Tile.opposing_sides[direction]
-						new_river.setCoords(new_river_tile)
-					#there is no river in the new_river_tile, so continue with the current river's creation by adding new RiverSegment to the river_stack
-					else:
-						new_river = RiverSegment()
-						new_river.start_side = Tile.opposing_sides[direction]
-						river_stack.append( (new_river_tile, new_river) )
-
-
-	def generateGraph(self, gui):
-		'''
-		Extends the map so that it can be plotted for the first time.
-		@gui (WindowHandler) ... The GUI object.
-		'''
-		
-		tiles_rivers = []
-
-		generate_functions = {	"left": self.generateLeftSide,
-								"up": self.generateUpSide,
-								"right": self.generateRightSide,
-								"down": self.generateDownSide
-							}
-		
-		#extend each of the map edges until it is not necessary anymore
-		for key in ["left", "up", "right", "down"]:
 
-			#the tile in the middle of the edge is most representative in evaluating whether the map needs to be extended on that side
-			tile = self.boundary_tiles[key].middle.value
-			while gui.isTileOnScreen(tile):
-				generate_functions[key]()
-				tile = self.boundary_tiles[key].middle.value
-		
-		#make the height map of the whole new map smoother
-		self.updateSandpiles( list(self.tileIterator()) )
-		
-		#find tiles which are chosen to have river sources
-		for tile in self.tileIterator():
-			if tile.isRiverStart():
-				river = RiverVertex(True)
-				tiles_rivers.append( (tile, river) )
-		
-		#generate the rest of rivers from the new sources
-		self.makeRivers(tiles_rivers)
+	def tileIterator(self, active_only :bool = False):
+		'''
+		Iterator of the map tiles, which iterates over the whole map, or over the currently plotted tiles only, depending on the value of @active_only (bool).
+		The tiles are taken chunk by chunk from the chunks' arrays or from the set of the plotted tiles, so the map is not searched and the iteration does not change the tiles.
+		Reading the tiles of evicted chunks loads the chunks into memory again, they are evicted again when the iteration moves to the next chunk, so the memory budget holds.
+		'''
 
+		store = self.store
+		size = store.chunk_size
+		qs, rs = self.active.coordinates() if active_only else self.tileCoordinates()
 
-	def generateNewLayers(self, which_sides: dict[str, bool], chunk_size :int):
+		#the measured time includes the time the caller spends with the yielded tiles
+		with profiler.span("tileIterator"):
+			current = None
+			for q, r in zip(qs.tolist(), rs.tolist()):
+				if (q // size, r // size) != current:
+					current = (q // size, r // size)
+					self.evictChunks( {current} )
+				yield Tile(store, q, r)
+			self.evictChunks()
+
+		profiler.count("tiles iterated", len(qs))
+
+
+	def activate(self, qs :numpy.ndarray, rs :numpy.ndarray):
 		'''
-		Generates new tile layers specified by @which_sides (dict[str, bool]).
-		@chunk_size (int) ... Number of layers generated on one side.
+		Marks the tiles on @qs and @rs (numpy.ndarray) axial coordinates as plotted.
 		'''
 
-		river_tiles = []
-		new_tiles = []
-		generating_functions = {	"up": self.generateUpSide,
-									"left": self.generateLeftSide,
-									"right": self.generateRightSide,
-									"down": self.generateDownSide
-		}
+		self.store.scatter( "gui_active", qs, rs, numpy.ones(len(qs), bool) )
+		self.active.add(qs, rs)
 
-		#generate necessary layers
-		for key in ["left", "up", "right", "down"]:
-			if which_sides[key]:
-				for _ in range(chunk_size):
-					generating_functions[key]()
-					new_tiles += [ tile for tile in self.boundary_tiles[key].iterator() ]
-		
-		#make the terrain smoother
-		self.updateSandpiles(new_tiles)
 
-		#plot rivers
-		for tile in new_tiles:
-			if tile.isRiverStart():
-				river = RiverVertex(is_start=True)
-				river_tiles.append( (tile, river) )
-		self.makeRivers(river_tiles)
+	def deactivate(self, qs :numpy.ndarray, rs :numpy.ndarray):
+		'''
+		Marks the tiles on @qs and @rs (numpy.ndarray) axial coordinates as not plotted.
+		'''
+
+		self.store.scatter( "gui_active", qs, rs, numpy.zeros(len(qs), bool) )
+		self.active.remove(qs, rs)
 
 
-	def generateLeftSide(self):
+	def bounds(self) -> tuple:
 		'''
-		Generates one new tile layer on the map's left edge.
+		Returns the smallest region (q0, r0, q1, r1) containing the whole map, as used by _queryRegion_.
 		'''
 
-		new_boundary_tiles = LinkedList([])
+		#the leftmost tile is in the last row, the rightmost one in the first row
+		return -( (self.r_max - self.column_min) // 2 ), self.r_min, (self.column_max - self.r_min) // 2 + 1, self.r_max + 1
 
-		#generating goes from top to bottom, the tiles are stored in self.boundary_tiles["left"] in this precise order
-		uppermost_boundary_tile = self.boundary_tiles["left"].popleft()
-		iterator_state = uppermost_boundary_tile.iterator_state
-		
-		#create the first tile of the new layer
-		new_uppermost_tile = Tile(iterator_state)
-		new_uppermost_tile.setRelativeCoordinates(uppermost_boundary_tile, "w")
 
-		#the first tile of the new left layer has certainly east neighbour and potentially also south-east neighbour
-		uppermost_boundary_tile.bindTile(new_uppermost_tile, "w")
+	def containsRegion(self, q0 :int, r0 :int, q1 :int, r1 :int) -> bool:
+		'''
+		Returns True if all the tiles with @q0 <= q < @q1 and @r0 <= r < @r1 (int) exist.
+		'''
 
-		if uppermost_boundary_tile.neighbours["sw"] != None:
-			uppermost_boundary_tile.neighbours["sw"].bindTile(new_uppermost_tile, "nw")
+		#the first and the last tile of the region have the smallest and the largest column 2q + r
+		return q0 >= q1 or r0 >= r1 or (self.r_min <= r0 and r1 - 1 <= self.r_max and self.column_min <= 2*q0 + r0 and 2*(q1 - 1) + r1 - 1 <= self.column_max)
 
-		new_boundary_tiles.append(new_uppermost_tile)
 
-		#create rest of the layer
-		for tile in self.boundary_tiles["left"].iterator():
-			new_tile = Tile(iterator_state)
-			new_tile.setRelativeCoordinates(tile, "w")
+	def coverRegion(self, q0 :int, r0 :int, q1 :int, r1 :int):
+		'''
+		Extends the map so that it contains all the tiles with @q0 <= q < @q1 and @r0 <= r < @r1 (int). The map's edges are rows and columns, so more tiles may be added.
+		'''
 
-			#these tiles have certainly east and north-east neighbours
-			#and potentially also north-west and south-east neighbours (in the time of their creation)
-			tile.bindTile(new_tile, "w")
-			tile.neighbours["nw"].bindTile(new_tile, "sw")
-			
-			if tile.neighbours["nw"].neighbours["w"] != None:
-				tile.neighbours["nw"].neighbours["w"].bindTile(new_tile, "se")
+		if self.containsRegion(q0, r0, q1, r1):
+			return
 
-			if tile.neighbours["sw"] != None:
-				tile.neighbours["sw"].bindTile(new_tile, "nw")
-			
-			new_boundary_tiles.append(new_tile)
-		
-		#update map's boundary_tiles ("up" and "down" got new leftmost tile)
-		self.boundary_tiles["left"] = new_boundary_tiles
-		self.boundary_tiles["up"].prepend( new_boundary_tiles.start.value )
-		self.boundary_tiles["down"].prepend( new_boundary_tiles.end.value )
+		if r0 < self.r_min:				self.extendSide("up", self.r_min - r0)
+		if r1 - 1 > self.r_max:			self.extendSide("down", r1 - 1 - self.r_max)
+		if 2*q0 + r0 < self.column_min:	self.extendSide("left", math.ceil( (self.column_min - 2*q0 - r0) / 2 ))
+		if 2*(q1 - 1) + r1 - 1 > self.column_max:	self.extendSide("right", math.ceil( (2*(q1 - 1) + r1 - 1 - self.column_max) / 2 ))
 
 
-	def generateRightSide(self):
+	def queryRegion(self, q0 :int, r0 :int, q1 :int, r1 :int, fields :list[str] = query_fields, generate = None) -> dict:
 		'''
-		Generates one new tile layer on the map's right edge.
+		Returns dictionary of (@r1 - @r0, @q1 - @q0) arrays of @fields (list[str], names of Chunk.fields) of the tiles with @q0 <= q < @q1 and @r0 <= r < @r1 (int),
+		indexed by [r - r0, q - q0] as the chunks' arrays, together with the array "exists", which marks the tiles of the map (the other tiles have no meaningful values).
+		The arrays are copied from the chunks, without loading the evicted or saved chunks into memory. If the region lies inside one chunk in memory, the arrays are read-only views
+		of the chunk's arrays instead, which change together with the map.
+		@generate (function) ... Function called with (@q0, @r0, @q1, @r1) if some of the region's tiles do not exist, e.g. _coverRegion_ generates them (the missing tiles are left out if None).
 		'''
-		new_boundary_tiles = LinkedList([])
 
-		#generating goes from top to bottom, the tiles are stored in self.boundary_tiles["right"] in this precise order
-		uppermost_boundary_tile = self.boundary_tiles["right"].popleft()
-		iterator_state = uppermost_boundary_tile.iterator_state
-		
-		#create the first tile of the new layer
-		new_uppermost_tile = Tile(iterator_state)
-		new_uppermost_tile.setRelativeCoordinates(uppermost_boundary_tile, "e")
+		for field in fields:
+			if field not in Chunk.fields:
+				raise ValueError(f"{field} is not a tile field")
+
+		if generate != None and not self.containsRegion(q0, r0, q1, r1):
+			generate(q0, r0, q1, r1)
 
-		#the first tile of the new left layer has certainly west neighbour and potentially also south-west neighbour
-		uppermost_boundary_tile.bindTile(new_uppermost_tile, "e")
+		names = list( dict.fromkeys(["exists"] + list(fields)) )
 
-		if uppermost_boundary_tile.neighbours["se"] != None:
-			uppermost_boundary_tile.neighbours["se"].bindTile(new_uppermost_tile, "ne")
+		with profiler.span("queryRegion"):
+			store = self.store
+			size = store.chunk_size
+			height, width = max(r1 - r0, 0), max(q1 - q0, 0)
+			key = (q0 // size, r0 // size)
 
-		new_boundary_tiles.append(new_uppermost_tile)
+			if height > 0 and width > 0 and key == ((q1 - 1) // size, (r1 - 1) // size) and key in store.chunks:
+				#the region lies inside one chunk in memory, so its arrays are only sliced
+				chunk = store.chunks[key]
+				window = ( slice(r0 - chunk.r0, r1 - chunk.r0), slice(q0 - chunk.q0, q1 - chunk.q0) )
+				region = {field: chunk.arrays[field][window] for field in names}
+				for values in region.values():
+					values.flags.writeable = False
+			else:
+				region = {field: numpy.zeros( (height, width), Chunk.fields[field] ) for field in names}
+				if "river_out" in region:
+					region["river_out"][:] = -1
 
-		#create rest of the layer
-		for tile in self.boundary_tiles["right"].iterator():
-			new_tile = Tile(iterator_state)
-			new_tile.setRelativeCoordinates(tile, "e")
+				#copy the overlapping part of every chunk at once
+				for cr in range(r0 // size, (r1 - 1) // size + 1):
+					for cq in range(q0 // size, (q1 - 1) // size + 1):
+						if not store.hasChunk(cq, cr):
+							continue
 
-			#these tiles have certainly east and north-east neighbours
-			#and potentially also north-west and south-east neighbours (in the time of their creation)
-			tile.bindTile(new_tile, "e")
-			tile.neighbours["ne"].bindTile(new_tile, "se")
+						arrays = store.peek( (cq, cr) )
+						top, bottom = max(r0, cr*size), min(r1, (cr + 1)*size)
+						left, right = max(q0, cq*size), min(q1, (cq + 1)*size)
+						for field in names:
+							region[field][top - r0 : bottom - r0, left - q0 : right - q0] = arrays[field][top - cr*size : bottom - cr*size, left - cq*size : right - cq*size]
 
-			if tile.neighbours["ne"].neighbours["e"] != None:
-				tile.neighbours["ne"].neighbours["e"].bindTile(new_tile, "sw")
+		profiler.count("tiles queried", height * width)
+		return region
 
-			if tile.neighbours["se"] != None:
-				tile.neighbours["se"].bindTile(new_tile, "ne")
 
-			new_boundary_tiles.append(new_tile)
-		
-		#update map's boundary_tiles ("up" and "down" got new rightmost tile)
-		self.boundary_tiles["right"] = new_boundary_tiles
-		self.boundary_tiles["up"].append( new_boundary_tiles.start.value )
-		self.boundary_tiles["down"].append( new_boundary_tiles.end.value )
+	def updateCentreTile(self, centre_x :float, centre_y :float):
+		'''
+		Makes the existing tile nearest to the canvas centre the map's centre_tile. The tile is found from the origin, so it does not matter how far the map moved.
+		@centre_x (float) ... Canvas' centre x position.
+		@centre_y (float) ... Canvas' centre y position.
+		'''
 
+		#world coordinates of the canvas' centre
+		x = centre_x - self.origin_x
+		y = centre_y - self.origin_y
 
-	def generateUpSide(self):
+		#the hexagons reach 2/3 of the row spacing up and down, so the nearest tile centre is in one of the two rows around the point
+		with profiler.span("updateCentreTile"):
+			row = y / (1.5*Tile.side_length)
+			column = x / (0.866*Tile.side_length)
+			best_dist = None
+			for r in [math.floor(row), math.floor(row) + 1]:
+				q = round( (column - r) / 2 )
+				tile = Tile(self.store, q, r)
+				if tile.chunk == None or not tile.exists:
+					continue
+
+				#squared standard euclidean distance from the canvas' centre
+				dist = (tile.x - x)**2 + (tile.y - y)**2
+				if best_dist == None or dist < best_dist:
+					self.centre_tile = tile
+					best_dist = dist
+
+
+	def generateGraph(self, viewport :Viewport, workers :int = None):
 		'''
-		Generates one new tile layer on the map's top edge.
+		Extends the map so that it covers the whole @viewport (Viewport).
+		@workers (int) ... Maximal number of processes generating the terrain of large maps (number of CPUs if None), see _pregenerate_.
+		'''
+
+		self.pregenerate(viewport, workers)
+
+		#extend each of the map edges until it is not necessary anymore
+		for key in ["left", "up", "right", "down"]:
+
+			#the tile in the middle of the edge is most representative in evaluating whether the map needs to be extended on that side
+			qs, rs = self.boundary(key)
+			while viewport.isOnScreen( *self.tilePosition(qs[len(qs) // 2], rs[len(rs) // 2]) ):
+				self.extendSide(key, 1)
+				qs, rs = self.boundary(key)
+
+		#extending the map loads and creates chunks, which are moved to the spill file again when there are too many of them
+		self.evictChunks()
+
+
+	def pregenerate(self, viewport :Viewport, workers :int = None):
+		'''
+		Generates at once the terrain of the missing chunks with tiles inside the @viewport (Viewport), in up to @workers (int) processes (number of CPUs if None).
+		The terrain is handed over to the chunks when they are created, as if it was prefetched. Nothing is done if there are too few chunks to generate them in parallel
+		(see parallelPkg.countWorkers), the chunks are then generated one by one when they are created.
 		'''
 
-		new_boundary_tiles = LinkedList([])
+		size = self.store.chunk_size
+		keys = set()
+		for r, (first, last) in viewport.visibleRows(self.origin_x, self.origin_y, Tile.side_length).items():
+			keys.update( (cq, r // size) for cq in range(first // size, last // size + 1) )
+		keys = [key for key in keys if not self.store.hasChunk(*key) and key not in self.prefetched]
 
-		#generating goes from left to right, the tiles are stored in self.boundary_tiles["up"] in this precise order
-		leftmost_boundary_tile = self.boundary_tiles["up"].popleft()
-		iterator_state = leftmost_boundary_tile.iterator_state
-		
-		#create the first tile of the new layer in the north-west direction, if the current leftmost tile is not already exceeding
-		if leftmost_boundary_tile.neighbours["sw"] != None:	
-			new_leftmost_tile = Tile(iterator_state)
-			new_leftmost_tile.setRelativeCoordinates(leftmost_boundary_tile, "nw")
-			leftmost_boundary_tile.bindTile(new_leftmost_tile, "nw")
+		if countWorkers(len(keys), workers) == 1:
+			return
 
-			new_boundary_tiles.append(new_leftmost_tile)
+		with profiler.span("pregenerate"):
+			for key, arrays in generateChunks(self.terrain, keys, workers).items():
+				self.prefetched[key] = Future()
+				self.prefetched[key].set_result(arrays)
 
-		#create rest of the layer
-		for tile in self.boundary_tiles["up"].iterator():
-			new_tile = Tile(iterator_state)
-			new_tile.setRelativeCoordinates(tile, "nw")
 
-			#these tiles have certainly south-west and south-east neighbours
-			#and usually also west neighbour (in the time of their creation)
-			tile.bindTile(new_tile, "nw")
-			tile.neighbours["w"].bindTile(new_tile, "ne")
+	def generateNewLayers(self, which_sides: dict[str, bool], chunk_size :int):
+		'''
+		Generates new tile layers specified by @which_sides (dict[str, bool]).
+		@chunk_size (int) ... Number of layers generated on one side.
+		'''
 
-			if tile.neighbours["w"].neighbours["nw"] != None:
-				tile.neighbours["w"].neighbours["nw"].bindTile(new_tile, "e")
+		#generate necessary layers (the terrain of their chunks is generated together with the chunks)
+		for key in ["left", "up", "right", "down"]:
+			if which_sides[key]:
+				with profiler.span("generateNewLayers/" + key):
+					self.extendSide(key, chunk_size)
 
-			new_boundary_tiles.append(new_tile)
-		
-		#create the last tile which might have been omitted
-		rightmost_boundary_tile = self.boundary_tiles["up"].end.value
-		if rightmost_boundary_tile.neighbours["se"] != None:
-			new_rightmost_tile = Tile(iterator_state)
-			new_rightmost_tile.setRelativeCoordinates(rightmost_boundary_tile, "ne")
+		with profiler.span("generateNewLayers/evict"):
+			self.evictChunks()
 
-			rightmost_boundary_tile.bindTile(new_rightmost_tile, "ne")
-			rightmost_boundary_tile.neighbours["nw"].bindTile(new_rightmost_tile, "e")
 
-			new_boundary_tiles.append(new_rightmost_tile)
+	def evictChunks(self, keep :set = ()):
+		'''
+		Drops the chunks over the memory budget of the store, except those with plotted tiles, the one with the centre tile and those in @keep (set of chunk coordinates).
+		'''
 
-		#update map's boundary_tiles ("left" and "right" got new uppermost tile)
-		self.boundary_tiles["up"] = new_boundary_tiles
-		self.boundary_tiles["left"].prepend( new_boundary_tiles.start.value )
-		self.boundary_tiles["right"].prepend( new_boundary_tiles.end.value )
+		centre = self.centre_tile
+		self.store.evict( keep=self.active.chunks() | {(centre.q // self.store.chunk_size, centre.r // self.store.chunk_size)} | set(keep) )
 
 
-	def generateDownSide(self):
+	def band(self, r_first :int, r_last :int, column_first :int, column_last :int) -> tuple:
 		'''
-		Generates one new tile layer on the map's bottom edge.
+		Returns axial coordinates (qs, rs) (numpy.ndarray) of the tiles in rows @r_first to @r_last (int) and columns 2q + r from @column_first to @column_last (int),
+		ordered from top to bottom and from left to right.
 		'''
 
-		new_boundary_tiles = LinkedList([])
+		rs = numpy.arange(r_first, r_last + 1)
+
+		#column 2q + r of a tile has the same parity as its row, so the rows may start and end one column further in
+		firsts = -( (rs - column_first) // 2 )
+		counts = numpy.maximum( (column_last - rs) // 2 - firsts + 1, 0 )
+
+		starts = numpy.cumsum(counts) - counts
+		rs = numpy.repeat(rs, counts)
+		qs = numpy.repeat(firsts - starts, counts) + numpy.arange(len(rs))
+		return qs, rs
+
 
-		#generating goes from left to right, the tiles are stored in self.boundary_tiles["down"] in this precise order
-		leftmost_boundary_tile = self.boundary_tiles["down"].popleft()
-		iterator_state = leftmost_boundary_tile.iterator_state
-		
-		#create the first tile of the new layer in the south-west direction, if the current leftmost tile is not already exceeding
-		if leftmost_boundary_tile.neighbours["nw"] != None:	
-			new_leftmost_tile = Tile(iterator_state)
-			new_leftmost_tile.setRelativeCoordinates(leftmost_boundary_tile, "sw")
-			leftmost_boundary_tile.bindTile(new_leftmost_tile, "sw")
+	def boundary(self, key :str) -> tuple:
+		'''
+		Returns axial coordinates (qs, rs) (numpy.ndarray) of the tiles on the map's @key (str) edge, ordered from top to bottom or from left to right.
+		'''
 
-			new_boundary_tiles.append(new_leftmost_tile)
+		if key == "left":	return self.band(self.r_min, self.r_max, self.column_min, self.column_min + 1)
+		if key == "right":	return self.band(self.r_min, self.r_max, self.column_max - 1, self.column_max)
+		if key == "up":		return self.band(self.r_min, self.r_min, self.column_min, self.column_max)
+		return self.band(self.r_max, self.r_max, self.column_min, self.column_max)
 
-		#create rest of the layer
-		for tile in self.boundary_tiles["down"].iterator():
-			new_tile = Tile(iterator_state)
-			new_tile.setRelativeCoordinates(tile, "sw")
-			
-			#these tiles have certainly north-west and north-east neighbours
-			#and usually also west neighbour (in the time of their creation)
-			tile.bindTile(new_tile, "sw")
-			tile.neighbours["w"].bindTile(new_tile, "se")
 
-			if tile.neighbours["w"].neighbours["sw"] != None:
-				tile.neighbours["w"].neighbours["sw"].bindTile(new_tile, "e")
+	def extendSide(self, key :str, layers :int) -> tuple:
+		'''
+		Adds @layers (int) new tile layers on the map's @key (str) edge at once: every row gets @layers new tiles on the left or right edge, or @layers new rows are added
+		on the top or bottom edge. The neighbours of the tiles are given by their coordinates, so the whole band is allocated by one call of the store.
+		Returns axial coordinates (qs, rs) (numpy.ndarray) of the new tiles, as ordered by _band_.
+		'''
 
-			new_boundary_tiles.append(new_tile)
+		if key == "left":
+			qs, rs = self.band(self.r_min, self.r_max, self.column_min - 2*layers, self.column_min - 1)
+			self.column_min -= 2*layers
+		elif key == "right":
+			qs, rs = self.band(self.r_min, self.r_max, self.column_max + 1, self.column_max + 2*layers)
+			self.column_max += 2*layers
+		elif key == "up":
+			qs, rs = self.band(self.r_min - layers, self.r_min - 1, self.column_min, self.column_max)
+			self.r_min -= layers
+		else:
+			qs, rs = self.band(self.r_max + 1, self.r_max + layers, self.column_min, self.column_max)
+			self.r_max += layers
 
-		#create the last tile which might have been omitted
-		rightmost_boundary_tile = self.boundary_tiles["down"].end.value
-		if rightmost_boundary_tile.neighbours["ne"] != None:
-			new_rightmost_tile = Tile(iterator_state)
-			new_rightmost_tile.setRelativeCoordinates(rightmost_boundary_tile, "se")
+		with profiler.span("extendSide"):
+			self.store.allocate(qs, rs)
+			self.pyramid.invalidate(qs, rs)
+		profiler.count("tiles generated", len(qs))
+		return qs, rs
 
-			rightmost_boundary_tile.bindTile(new_rightmost_tile, "se")
-			rightmost_boundary_tile.neighbours["sw"].bindTile(new_rightmost_tile, "e")
 
-			new_boundary_tiles.append(new_rightmost_tile)
+	def generateLeftSide(self):
+		'''
+		Generates one new tile layer on the map's left edge.
+		'''
+
+		self.extendSide("left", 1)
+
+
+	def generateRightSide(self):
+		'''
+		Generates one new tile layer on the map's right edge.
+		'''
+
+		self.extendSide("right", 1)
+
+
+	def generateUpSide(self):
+		'''
+		Generates one new tile layer on the map's top edge.
+		'''
+
+		self.extendSide("up", 1)
+
+
+	def generateDownSide(self):
+		'''
+		Generates one new tile layer on the map's bottom edge.
+		'''
 
-		#update map's boundary_tiles ("left" and "right" got new bottommost tile)
-		self.boundary_tiles["down"] = new_boundary_tiles
-		self.boundary_tiles["left"].append(new_boundary_tiles.start.value)
-		self.boundary_tiles["right"].append(new_boundary_tiles.end.value)
+		self.extendSide("down", 1)
@@ -0,0 +1,75 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from terrainPkg import Terrain
+from chunkPkg import Chunk
+import multiprocessing
+import numpy
+import os
+
+
+#arrays of the chunks' terrain as returned by Terrain.generateChunk
+terrain_fields = ["altitude", "is_lake", "river_in", "river_out", "river_source", "river_flow", "river_order"]
+
+#the chunks are generated in parallel only if every worker gets at least this many of them, smaller batches are faster in one process than starting the workers
+min_chunks_per_worker = 16
+
+
+def countWorkers(chunks :int, workers :int = None) -> int:
+	'''
+	Returns number of processes which generate @chunks (int) chunks: @workers (int, number of CPUs if None) at most, and 1 (serial generation) if the batch is too small.
+	'''
+
+	workers = workers if workers != None else os.cpu_count() or 1
+	return max( 1, min(workers, chunks // min_chunks_per_worker) )
+
+
+def generateDomain(terrain :Terrain, keys :list[tuple], first :int, names :dict):
+	'''
+	Worker of _generateChunks_: generates the terrain of the chunks on @keys (list[tuple]) chunk coordinates of @terrain (Terrain)
+	and writes it into the shared arrays of all the batch's chunks from the index @first (int). @names (dict) maps the fields to the names of their shared memory blocks.
+	'''
+
+	size = terrain.chunk_size
+	blocks = {field: shared_memory.SharedMemory(name) for field, name in names.items()}
+	try:
+		arrays = {field: numpy.ndarray( (first + len(keys), size, size), Chunk.fields[field], blocks[field].buf ) for field in names}
+		for index, (cq, cr) in enumerate(keys, first):
+			for field, values in terrain.generateChunk(cq, cr).items():
+				arrays[field][index] = values
+		del arrays
+	finally:
+		for block in blocks.values():
+			block.close()
+
+
+def generateChunks(terrain :Terrain, keys :list[tuple], workers :int = None) -> dict:
+	'''
+	Generates the terrain of the chunks on @keys (list[tuple]) chunk coordinates of @terrain (Terrain), in @workers (int) processes (see _countWorkers_).
+	Returns dictionary of the chunks' arrays (as returned by Terrain.generateChunk) indexed by their chunk coordinates.
+	The chunks are split into bands of whole rows (domains), so that each process reuses the random numbers of the neighbouring chunks; only the chunks next to the bands' edges are drawn twice.
+	The processes write the terrain directly into shared memory, which is copied into the chunks' arrays once all of them finished.
+	'''
+
+	keys = sorted( keys, key=lambda key: (key[1], key[0]) )
+	workers = countWorkers(len(keys), workers)
+	if workers == 1:
+		return {key: terrain.generateChunk(*key) for key in keys}
+
+	size = terrain.chunk_size
+	blocks = {field: shared_memory.SharedMemory( create=True, size=max(1, len(keys) * size*size * numpy.dtype(Chunk.fields[field]).itemsize) ) for field in terrain_fields}
+	try:
+		names = {field: block.name for field, block in blocks.items()}
+		bounds = numpy.linspace(0, len(keys), workers + 1).astype(int).tolist()
+
+		#the workers are started fresh, as for prefetching, so that they do not inherit the state of the caller
+		with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+			futures = [executor.submit(generateDomain, terrain, keys[start:end], start, names) for start, end in zip(bounds, bounds[1:])]
+			for future in futures:
+				future.result()
+
+		arrays = {field: numpy.ndarray( (len(keys), size, size), Chunk.fields[field], blocks[field].buf ).copy() for field in terrain_fields}
+		return {key: {field: arrays[field][index] for field in terrain_fields} for index, key in enumerate(keys)}
+	finally:
+		for block in blocks.values():
+			block.close()
+			block.unlink()
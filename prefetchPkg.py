@@ -0,0 +1,145 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from mapPkg import Map, Tile
+from terrainPkg import Terrain
+from viewportPkg import Viewport
+import geometryPkg
+import multiprocessing
+import numpy
+
+#terrain generator of the worker processes, set once by _startWorker_, so that its cached random numbers and altitudes are reused by the neighbouring chunks
+worker_terrain = None
+
+
+def startWorker(terrain :Terrain):
+	'''
+	Initialiser of the worker processes, which generate the chunks of @terrain (Terrain).
+	'''
+
+	global worker_terrain
+	worker_terrain = terrain
+
+
+def generateChunk(cq :int, cr :int) -> dict:
+	'''
+	Generates the terrain of the chunk on (@cq, @cr) chunk coordinates in a worker process (see Terrain.generateChunk).
+	'''
+
+	return worker_terrain.generateChunk(cq, cr)
+
+
+class ChunkPrefetcher:
+	'''
+	Class generating map chunks in background processes ahead of the panning camera.
+	'''
+
+	def __init__(self, mapObj :Map, root, viewport :Viewport, workers :int = None, lookahead :float = 1.0, history :int = 8, poll_interval :int = 20):
+		'''
+		Constructor of ChunkPrefetcher class.
+		@mapObj (Map) ... Map whose chunks are prefetched.
+		@root (tkinter.Tk) ... The GUI root window, on whose thread the prefetched chunks are added to the map.
+		@viewport (Viewport) ... The visible part of the map.
+		@workers (int) ... Number of background processes (number of CPUs if None).
+		@lookahead (float) ... How far ahead of the screen the chunks are prefetched, in screen sizes.
+		@history (int) ... Number of recent moves from which the panning direction is predicted.
+		@poll_interval (int) ... Number of milliseconds between checks for finished chunks.
+		'''
+
+		self.map = mapObj
+		self.root = root
+		self.viewport = viewport
+		self.lookahead = lookahead
+		self.poll_interval = poll_interval
+
+		#the workers are started fresh, so that they do not inherit the tkinter state, each one with its own copy of the terrain generator
+		self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"), initializer=startWorker, initargs=(mapObj.terrain,))
+
+		#recent (dx, dy) moves of the map
+		self.moves = deque(maxlen=history)
+
+		self.root.after(self.poll_interval, self.spliceChunks)
+
+
+	def recordMove(self, dx :float, dy :float):
+		'''
+		Notes that the map moved by (@dx, @dy) (float).
+		'''
+
+		self.moves.append( (dx, dy) )
+
+
+	def predictDirection(self) -> tuple:
+		'''
+		Returns unit vector of the predicted camera movement, or None if the camera does not move.
+		'''
+
+		#the camera moves in the opposite direction than the map
+		dx = -sum(move[0] for move in self.moves)
+		dy = -sum(move[1] for move in self.moves)
+		length = numpy.hypot(dx, dy)
+
+		if length == 0:	return None
+		return dx / length, dy / length
+
+
+	def chunksAhead(self) -> set:
+		'''
+		Returns set of (cq, cr) coordinates of the chunks covering the screen and the area in the predicted direction of the camera movement.
+		'''
+
+		direction = self.predictDirection()
+		if direction == None:
+			return set()
+
+		viewport = self.viewport
+		shift_x = direction[0] * self.lookahead * viewport.width
+		shift_y = direction[1] * self.lookahead * viewport.height
+
+		#sample the area densely enough not to skip any chunk
+		step = self.map.store.chunk_size * Tile.side_length / 2
+		xs = viewport.offset_x + numpy.arange(min(0, shift_x), max(viewport.width, viewport.width + shift_x) + step, step)
+		ys = viewport.offset_y + numpy.arange(min(0, shift_y), max(viewport.height, viewport.height + shift_y) + step, step)
+		xs, ys = numpy.meshgrid(xs, ys)
+
+		#the tiles containing the sampled points, whose world coordinates are relative to the origin
+		qs, rs = geometryPkg.nearestTiles(xs - self.map.origin_x, ys - self.map.origin_y, Tile.side_length)
+
+		chunk_size = self.map.store.chunk_size
+		keys = numpy.stack( (qs.ravel() // chunk_size, rs.ravel() // chunk_size), axis=1 )
+		return set( map(tuple, keys.tolist()) )
+
+
+	def schedule(self):
+		'''
+		Starts background generation of the chunks ahead of the camera, and cancels the generation of chunks which are not ahead anymore.
+		'''
+
+		ahead = self.chunksAhead()
+
+		for key, future in list(self.map.prefetched.items()):
+			if key not in ahead and future.cancel():
+				del self.map.prefetched[key]
+
+		for key in ahead:
+			if not self.map.store.hasChunk(*key) and key not in self.map.prefetched:
+				self.map.prefetched[key] = self.executor.submit(generateChunk, *key)
+
+
+	def spliceChunks(self):
+		'''
+		Adds the chunks that were generated in background to the map. Runs periodically on the GUI thread.
+		'''
+
+		for key, future in list(self.map.prefetched.items()):
+			if future.done():
+				self.map.store.getChunk(*key, create=True)
+
+		self.root.after(self.poll_interval, self.spliceChunks)
+
+
+	def close(self):
+		'''
+		Stops the background processes.
+		'''
+
+		self.executor.shutdown(wait=False, cancel_futures=True)
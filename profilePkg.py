@@ -0,0 +1,308 @@
+import threading
+import json
+import math
+import time
+import os
+
+
+class Histogram:
+	'''
+	Class counting latencies in logarithmic buckets: bucket b contains the latencies up to 2**(b / buckets_per_octave) microseconds.
+	'''
+
+	#number of buckets per doubling of the latency
+	buckets_per_octave = 4
+
+
+	def __init__(self):
+		'''
+		Constructor of Histogram class.
+		'''
+
+		#number of latencies in each bucket, indexed by the bucket
+		self.buckets = {}
+
+		self.count = 0
+		self.total = 0.0
+		self.min = math.inf
+		self.max = 0.0
+
+
+	def add(self, seconds :float):
+		'''
+		Adds latency of @seconds (float).
+		'''
+
+		microseconds = seconds * 1e6
+		bucket = max( 0, math.ceil(math.log2(microseconds) * Histogram.buckets_per_octave) ) if microseconds > 1 else 0
+		self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+		self.count += 1
+		self.total += seconds
+		self.min = min(self.min, seconds)
+		self.max = max(self.max, seconds)
+
+
+	def bucketBound(self, bucket :int) -> float:
+		'''
+		Returns the upper bound of @bucket (int) in seconds.
+		'''
+
+		return 2**(bucket / Histogram.buckets_per_octave) / 1e6
+
+
+	def percentile(self, percent :float) -> float:
+		'''
+		Returns estimate of @percent (float) percentile of the latencies in seconds (the upper bound of the bucket containing it, at most the maximal latency).
+		'''
+
+		if self.count == 0:
+			return 0.0
+
+		rank = percent / 100 * self.count
+		seen = 0
+		for bucket in sorted(self.buckets):
+			seen += self.buckets[bucket]
+			if seen >= rank:
+				return min( self.bucketBound(bucket), self.max )
+		return self.max
+
+
+	def summary(self) -> dict:
+		'''
+		Returns dictionary of the count and the latency statistics in milliseconds, including the non-empty buckets indexed by their upper bounds.
+		'''
+
+		return {	"count": self.count,
+					"total_ms": 1000 * self.total,
+					"mean_ms": 1000 * self.total / self.count if self.count > 0 else 0.0,
+					"min_ms": 1000 * self.min if self.count > 0 else 0.0,
+					"p50_ms": 1000 * self.percentile(50),
+					"p90_ms": 1000 * self.percentile(90),
+					"p99_ms": 1000 * self.percentile(99),
+					"max_ms": 1000 * self.max,
+					"buckets": { f"{1000 * self.bucketBound(bucket):.4g}": self.buckets[bucket] for bucket in sorted(self.buckets) }
+				}
+
+
+class Span:
+	'''
+	Context manager measuring one run of a stage of the Profiler.
+	'''
+
+	def __init__(self, profiler, name :str):
+		'''
+		Constructor of Span class.
+		@profiler (Profiler) ... The profiler which records the latency.
+		@name (str) ... Name of the measured stage.
+		'''
+
+		self.profiler = profiler
+		self.name = name
+
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+
+	def __exit__(self, *exception):
+		self.profiler.record(self.name, self.start, time.perf_counter() - self.start)
+
+
+class NullSpan:
+	'''
+	Context manager returned by disabled Profiler, which does nothing.
+	'''
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, *exception):
+		pass
+
+
+#the only instance of NullSpan, so that disabled profiler does not create any objects
+null_span = NullSpan()
+
+
+class Profiler:
+	'''
+	Class recording the latencies of the program stages into histograms and counting events. It can also keep the individual stage runs, which can be saved as Chrome trace
+	(viewable in chrome://tracing or Perfetto). Disabled profiler only checks its flag, so the instrumented code runs at almost full speed.
+	'''
+
+	def __init__(self):
+		'''
+		Constructor of Profiler class.
+		'''
+
+		self.enabled = False
+		self.tracing = False
+
+		#maximal number of kept trace events, the later ones are dropped
+		self.trace_limit = 1000000
+
+		self.reset()
+
+
+	def reset(self):
+		'''
+		Forgets all the recorded latencies, counts and trace events.
+		'''
+
+		#latency histograms and the last latencies of the stages, indexed by the stage names
+		self.histograms = {}
+		self.last = {}
+
+		#event counts indexed by the event names
+		self.counters = {}
+
+		#trace events in Chrome trace format, with times relative to _start_
+		self.events = []
+		self.start = time.perf_counter()
+
+
+	def enable(self, tracing :bool = False):
+		'''
+		Starts recording. If @tracing (bool) is True, the individual stage runs are kept for _dumpTrace_.
+		'''
+
+		self.enabled = True
+		self.tracing = tracing
+
+
+	def disable(self):
+		'''
+		Stops recording, the recorded data are kept.
+		'''
+
+		self.enabled = False
+		self.tracing = False
+
+
+	def span(self, name :str):
+		'''
+		Returns context manager measuring stage @name (str), e.g.
+			with profiler.span("moveMap/plotTiles"):
+				...
+		'''
+
+		return Span(self, name) if self.enabled else null_span
+
+
+	def record(self, name :str, start :float, seconds :float):
+		'''
+		Records run of stage @name (str) which started at @start (float, time.perf_counter) and took @seconds (float).
+		'''
+
+		if name not in self.histograms:
+			self.histograms[name] = Histogram()
+		self.histograms[name].add(seconds)
+		self.last[name] = seconds
+
+		if self.tracing and len(self.events) < self.trace_limit:
+			self.events.append( {	"name": name,
+									"ph": "X",
+									"ts": 1e6 * (start - self.start),
+									"dur": 1e6 * seconds,
+									"pid": os.getpid(),
+									"tid": threading.get_ident()
+								} )
+
+
+	def count(self, name :str, number :int = 1):
+		'''
+		Adds @number (int) to the count of event @name (str).
+		'''
+
+		if self.enabled:
+			self.counters[name] = self.counters.get(name, 0) + number
+
+
+	def summary(self) -> dict:
+		'''
+		Returns dictionary of the stage statistics ("stages", see Histogram.summary) and of the event counts ("counters").
+		'''
+
+		return {	"stages": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+					"counters": dict( sorted(self.counters.items()) )
+				}
+
+
+	def dumpJSON(self, path :str):
+		'''
+		Saves _summary_ into JSON file on @path (str).
+		'''
+
+		with open(path, "w") as file:
+			json.dump(self.summary(), file, indent="\t")
+
+
+	def dumpTrace(self, path :str):
+		'''
+		Saves the recorded stage runs into Chrome trace file on @path (str). The counters are saved as the trace's metadata.
+		'''
+
+		with open(path, "w") as file:
+			json.dump( {"traceEvents": self.events, "displayTimeUnit": "ms", "otherData": {"counters": self.counters}}, file )
+
+
+class PerformanceOverlay:
+	'''
+	Class showing the frame time, the number of generated tiles and the number of canvas items in the corner of the canvas.
+	'''
+
+	def __init__(self, canvas, profiler :Profiler, frame_stage :str = "moveMap"):
+		'''
+		Constructor of PerformanceOverlay class.
+		@canvas (tkinter.Canvas) ... The canvas on which the overlay is shown.
+		@profiler (Profiler) ... The profiler whose data are shown.
+		@frame_stage (str) ... Name of the stage measuring one frame.
+		'''
+
+		self.canvas = canvas
+		self.profiler = profiler
+		self.frame_stage = frame_stage
+		self.visible = True
+
+		#the overlay does not have the "map" tag, so it does not move with the map
+		self.item = canvas.create_text(10, 10, anchor="nw", font=("TkFixedFont", 10), fill="#000000", tags="overlay")
+
+		#number of tiles generated before the last update
+		self.tiles = 0
+
+
+	def toggle(self):
+		'''
+		Shows the hidden overlay or hides the shown one.
+		'''
+
+		self.visible = not self.visible
+		self.canvas.itemconfigure(self.item, state="normal" if self.visible else "hidden")
+		self.update()
+
+
+	def update(self):
+		'''
+		Shows the current data.
+		'''
+
+		if not self.visible:
+			return
+
+		frame = self.profiler.histograms.get(self.frame_stage)
+		tiles = self.profiler.counters.get("tiles generated", 0)
+		lines = [	f"frame {1000 * self.profiler.last.get(self.frame_stage, 0.0):6.1f} ms",
+					f"  p50 {1000 * frame.percentile(50) if frame != None else 0.0:6.1f} ms, p99 {1000 * frame.percentile(99) if frame != None else 0.0:6.1f} ms",
+					f"tiles generated {tiles} (+{tiles - self.tiles})",
+					f"live canvas items {len(self.canvas.find_withtag('map'))}"
+				]
+		self.tiles = tiles
+
+		self.canvas.itemconfigure(self.item, text="\n".join(lines))
+		self.canvas.tag_raise(self.item)
+
+
+#profiler shared by the whole program, disabled until enabled (e.g. by main.py --profile)
+profiler = Profiler()
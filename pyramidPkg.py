@@ -0,0 +1,121 @@
+import numpy
+
+
+class TerrainPyramid:
+	'''
+	Class keeping multi-resolution copies of the map's terrain for plotting the map zoomed out. Level k consists of cells which aggregate squares of 2^k x 2^k tiles in axial coordinates:
+	cell (Q, R) contains the tiles with Q*2^k <= q < (Q + 1)*2^k and R*2^k <= r < (R + 1)*2^k. The cells are stored by chunks of the map's ChunkStore, so that a changed chunk
+	is aggregated again without touching the rest of the pyramid. The cells are aggregated only when they are needed, from the chunk arrays in memory, in the spill file or in the archive.
+	'''
+
+	#per-cell arrays of every level and their data types: number of existing tiles, their mean altitude, their majority biome code (see mapPkg.biomes),
+	#and the largest river in the cell (its flow, the side through which it flows out or -1, and its Strahler order)
+	fields = {	"count": numpy.int32,
+				"altitude": numpy.float32,
+				"biome": numpy.uint8,
+				"river_flow": numpy.uint16,
+				"river_out": numpy.int8,
+				"river_order": numpy.uint8
+			}
+
+
+	def __init__(self, store):
+		'''
+		Constructor of TerrainPyramid class.
+		@store (ChunkStore) ... The store of the aggregated map.
+		'''
+
+		self.store = store
+
+		#the cells have to be whole parts of the chunks, so the coarsest level is given by the largest power of two dividing the chunk size
+		self.levels = 0
+		while store.chunk_size % 2**(self.levels + 1) == 0:
+			self.levels += 1
+
+		#aggregated arrays of the chunks indexed by (cq, cr) chunk coordinates, each one is a list of dictionaries of the levels 1 to _levels_ (level 0 are the tiles themselves)
+		self.chunks = {}
+
+
+	def invalidate(self, qs :numpy.ndarray, rs :numpy.ndarray):
+		'''
+		Notes that the tiles on @qs and @rs (numpy.ndarray) axial coordinates changed (e.g. they were added to the map), so their chunks are aggregated again when they are needed.
+		'''
+
+		size = self.store.chunk_size
+		keys = numpy.unique( numpy.stack((numpy.floor_divide(qs, size), numpy.floor_divide(rs, size)), axis=1), axis=0 )
+		for cq, cr in keys.tolist():
+			self.chunks.pop( (cq, cr), None )
+
+
+	def aggregate(self, arrays :dict) -> list:
+		'''
+		Returns the levels 1 to _levels_ of the chunk with @arrays (dict), as stored in _chunks_.
+		'''
+
+		size = self.store.chunk_size
+		exists = arrays["exists"]
+		biomes = numpy.arange( int(arrays["biome"].max()) + 1 )
+
+		#only the rivers are aggregated, the flow of the other tiles is just the size of their drainage area
+		flow = numpy.where( exists & (arrays["river_order"] > 0), arrays["river_flow"], 0 )
+
+		levels = []
+		for level in range(1, self.levels + 1):
+			factor = 2**level
+			cells = size // factor
+
+			#the tiles of each cell are put along the last axis
+			def blocks(values):	return values.reshape( (cells, factor, cells, factor) ).swapaxes(1, 2).reshape( (cells, cells, factor*factor) )
+
+			cell_exists = blocks(exists)
+			count = cell_exists.sum(axis=2)
+			altitude = numpy.where(cell_exists, blocks(arrays["altitude"]), 0).sum(axis=2) / numpy.maximum(count, 1)
+			histogram = (blocks(arrays["biome"])[..., None] == biomes) & cell_exists[..., None]
+
+			#the largest river leaves the cell from the tile where its flow is the largest
+			largest = numpy.argmax(blocks(flow), axis=2)[..., None]
+			river_flow = numpy.take_along_axis(blocks(flow), largest, axis=2)[..., 0]
+
+			levels.append( {	"count": count.astype(numpy.int32),
+								"altitude": altitude.astype(numpy.float32),
+								"biome": histogram.sum(axis=2).argmax(axis=2).astype(numpy.uint8),
+								"river_flow": river_flow.astype(numpy.uint16),
+								"river_out": numpy.where( river_flow > 0, numpy.take_along_axis(blocks(arrays["river_out"]), largest, axis=2)[..., 0], -1 ).astype(numpy.int8),
+								"river_order": numpy.where( river_flow > 0, numpy.take_along_axis(blocks(arrays["river_order"]), largest, axis=2)[..., 0], 0 ).astype(numpy.uint8)
+							} )
+		return levels
+
+
+	def chunkLevels(self, key :tuple) -> list:
+		'''
+		Returns the aggregated levels of the chunk on @key (tuple) chunk coordinates (aggregating it if it changed), or None if the chunk does not exist.
+		'''
+
+		if key not in self.chunks:
+			if not self.store.hasChunk(*key):
+				return None
+
+			#peeking does not load the chunk into memory, so zooming out over a large saved map does not evict the plotted chunks
+			self.chunks[key] = self.aggregate( self.store.peek(key) )
+		return self.chunks[key]
+
+
+	def gather(self, level :int, field :str, qs :numpy.ndarray, rs :numpy.ndarray) -> numpy.ndarray:
+		'''
+		Returns array of @field (str) values of the cells of @level (int) on @qs and @rs (numpy.ndarray) cell coordinates. Cells in missing chunks get zero (-1 for "river_out").
+		'''
+
+		cells = self.store.chunk_size // 2**level
+		values = numpy.full( len(qs), -1 if field == "river_out" else 0, TerrainPyramid.fields[field] )
+
+		cqs = numpy.floor_divide(qs, cells)
+		crs = numpy.floor_divide(rs, cells)
+		keys, inverse = numpy.unique(numpy.stack((cqs, crs), axis=1), axis=0, return_inverse=True)
+		inverse = inverse.ravel()
+
+		for index, (cq, cr) in enumerate( keys.tolist() ):
+			levels = self.chunkLevels( (cq, cr) )
+			if levels != None:
+				selection = inverse == index
+				values[selection] = levels[level - 1][field][rs[selection] - cr*cells, qs[selection] - cq*cells]
+		return values
@@ -0,0 +1,213 @@
+from collections import OrderedDict
+from mapPkg import Map, Tile, riverWidth, biome_colours
+from viewportPkg import Viewport
+import geometryPkg
+import numpy
+
+
+def hexColour(colour :str) -> tuple:
+	'''
+	Returns (red, green, blue) components of @colour (str) given as "#RRGGBB".
+	'''
+
+	return tuple( int(colour[i:i+2], 16) for i in [1, 3, 5] )
+
+
+class RasterRenderer:
+	'''
+	Class plotting the map as images instead of one canvas item per hexagon and river. The world is split into square blocks of pixels,
+	each block is rasterised with NumPy (tile fills, outlines and rivers) and shown as one image. The images are cached, so revisited blocks are not rasterised again.
+	'''
+
+	#colour of the places without tiles (default colour of tkinter canvas)
+	background = "#D9D9D9"
+
+	#colours of the tile outlines and of the rivers, as in the polygon plots
+	outline = "#000000"
+	river = "#0022BB"
+
+	#RGB colours of the biomes, looked up by the tiles' biome codes
+	palette = numpy.array( [hexColour(colour) for colour in biome_colours], numpy.uint8 )
+
+	#widths of the lines in pixels, as in the polygon plots (rivers get wider with their order, see mapPkg.riverWidth)
+	outline_width = 2
+	source_radius = 2
+
+
+	def __init__(self, canvas, mapObj :Map, viewport :Viewport, block_size :int = 256, cache_size :int = 128):
+		'''
+		Constructor of RasterRenderer class.
+		@canvas (tkinter.Canvas) ... The canvas on which the map is plotted.
+		@mapObj (Map) ... The plotted map.
+		@viewport (Viewport) ... The visible part of the canvas.
+		@block_size (int) ... Number of pixels on the side of one image.
+		@cache_size (int) ... Maximal number of cached images (the visible ones are always kept).
+		'''
+
+		self.canvas = canvas
+		self.map = mapObj
+		self.viewport = viewport
+		self.block_size = block_size
+		self.cache_size = cache_size
+
+		#cached images indexed by block coordinates, from the least to the most recently used; each is saved with the map extent
+		#if the block contains places without tiles, so that it is rasterised again when the map grows there
+		self.images = OrderedDict()
+
+		#canvas items of the visible blocks indexed by block coordinates
+		self.items = {}
+
+
+	def mapExtent(self) -> tuple:
+		'''
+		Returns the rows and columns occupied by the map's tiles.
+		'''
+
+		return self.map.r_min, self.map.r_max, self.map.column_min, self.map.column_max
+
+
+	def rasteriseBlock(self, bx :int, by :int) -> tuple:
+		'''
+		Rasterises the block on (@bx, @by) block coordinates. Returns its (height, width, 3) RGB array and whether all its pixels belong to existing tiles.
+		'''
+
+		size = self.block_size
+		return rasterise(self.map, bx*size, by*size, size, size)
+
+
+	def makeImage(self, rgb :numpy.ndarray):
+		'''
+		Returns tkinter image of the @rgb (numpy.ndarray) pixels.
+		'''
+
+		#tkinter is loaded only here, so that the maps can be rasterised without it (see export.py)
+		import tkinter
+
+		height, width, _ = rgb.shape
+		ppm = f"P6 {width} {height} 255 ".encode() + rgb.tobytes()
+		return tkinter.PhotoImage(master=self.canvas, data=ppm, format="PPM")
+
+
+	def blockImage(self, key :tuple):
+		'''
+		Returns image of the block on @key (tuple) block coordinates, rasterising it if it is not cached or if the map grew since an incomplete block was rasterised.
+		'''
+
+		if key in self.images:
+			image, extent = self.images[key]
+			if extent == None or extent == self.mapExtent():
+				self.images.move_to_end(key)
+				return image
+
+		rgb, complete = self.rasteriseBlock(*key)
+		image = self.makeImage(rgb)
+		self.images[key] = (image, None if complete else self.mapExtent())
+		return image
+
+
+	def visibleBlocks(self) -> set:
+		'''
+		Returns set of (bx, by) block coordinates of the blocks which are at least partly in the viewport.
+		'''
+
+		size = self.block_size
+		viewport = self.viewport
+
+		#canvas coordinates are the world coordinates shifted by the map's origin
+		left = int( numpy.floor((viewport.offset_x - self.map.origin_x) / size) )
+		right = int( numpy.floor((viewport.offset_x + viewport.width - self.map.origin_x) / size) )
+		top = int( numpy.floor((viewport.offset_y - self.map.origin_y) / size) )
+		bottom = int( numpy.floor((viewport.offset_y + viewport.height - self.map.origin_y) / size) )
+		return { (bx, by) for bx in range(left, right + 1) for by in range(top, bottom + 1) }
+
+
+	def clear(self):
+		'''
+		Removes all the images from the canvas, they stay cached.
+		'''
+
+		for item in self.items.values():
+			self.canvas.delete(item)
+		self.items = {}
+
+
+	def update(self):
+		'''
+		Shows the images of the blocks that became visible, removes those that became hidden, and replaces the images of visible incomplete blocks after the map grew.
+		'''
+
+		visible = self.visibleBlocks()
+
+		for key in list(self.items):
+			outdated = key in self.images and self.images[key][1] not in [None, self.mapExtent()]
+			if key not in visible or outdated:
+				self.canvas.delete( self.items.pop(key) )
+
+		for key in visible - self.items.keys():
+			image = self.blockImage(key)
+			x = key[0]*self.block_size + self.map.origin_x
+			y = key[1]*self.block_size + self.map.origin_y
+
+			#the images are moved together with the rest of the map
+			self.items[key] = self.canvas.create_image(x, y, image=image, anchor="nw", tags="map")
+
+		#forget the least recently used images which are not visible
+		for key in list(self.images):
+			if len(self.images) <= self.cache_size:
+				break
+			if key not in self.items:
+				del self.images[key]
+
+
+def rasterise(mapObj :Map, left :int, top :int, width :int, height :int, side_length :float = Tile.side_length) -> tuple:
+	'''
+	Rasterises the rectangle of @width times @height (int) pixels of @mapObj (Map) whose top left corner is on (@left, @top) (int) world coordinates,
+	with the tiles of @side_length (float) pixels (tile fills, outlines and rivers, whose widths are scaled with the tiles). The evicted and saved chunks are not loaded into memory.
+	Returns its (height, width, 3) RGB array and whether all its pixels belong to existing tiles.
+	'''
+
+	scale = side_length / Tile.side_length
+
+	#world coordinates of the pixel centres and the tiles containing them
+	ys, xs = numpy.mgrid[top:top + height, left:left + width] + 0.5
+	qs, rs = geometryPkg.nearestTiles(xs, ys, side_length)
+	centre_xs, centre_ys = geometryPkg.tileCentres(qs, rs, side_length)
+	dxs = xs - centre_xs
+	dys = ys - centre_ys
+
+	#the fields of each tile in the rectangle are queried only once, for the grid of the axial coordinates the rectangle spans
+	q_min, r_min = int(qs.min()), int(rs.min())
+	region = mapObj.queryRegion( q_min, r_min, int(qs.max()) + 1, int(rs.max()) + 1, ["biome", "river_in", "river_out", "river_source", "river_order"] )
+	pixels = (rs - r_min, qs - q_min)
+	pixel_exists = region["exists"][pixels]
+
+	rgb = RasterRenderer.palette[ region["biome"][pixels] ]
+	rgb[~pixel_exists] = hexColour(RasterRenderer.background)
+
+	#the outlines are drawn along the hexagon edges, which are at 0.866 side lengths from the centre in three directions
+	edge_distance = 0.866*side_length - numpy.maximum.reduce( [numpy.abs(dxs), numpy.abs(0.5*dxs + 0.866*dys), numpy.abs(-0.5*dxs + 0.866*dys)] )
+	rgb[pixel_exists & (edge_distance < scale*RasterRenderer.outline_width / 2)] = hexColour(RasterRenderer.outline)
+
+	#rivers go from the tile centre to the middles of the sides through which they flow in or out
+	river_out = region["river_out"].astype(numpy.int64)
+	river_sides = region["river_in"].astype(numpy.int64) | numpy.where(river_out >= 0, 1 << numpy.maximum(river_out, 0), 0)
+	pixel_sides = numpy.where(pixel_exists, river_sides[pixels], 0)
+	pixel_widths = scale * riverWidth( region["river_order"].astype(numpy.int64) )[pixels]
+	river = numpy.zeros(qs.shape, bool)
+
+	for index, side in enumerate(Tile.sides):
+		if not (pixel_sides & (1 << index)).any():
+			continue
+
+		#distance of the pixels from the segment between the centre and the side's middle
+		mid_x, mid_y = geometryPkg.side_offsets[index] * side_length
+		t = numpy.clip( (dxs*mid_x + dys*mid_y) / (mid_x**2 + mid_y**2), 0, 1 )
+		distance = numpy.hypot(dxs - t*mid_x, dys - t*mid_y)
+		river |= (pixel_sides & (1 << index)).astype(bool) & (distance < pixel_widths / 2)
+
+	#small circles indicating river sources
+	sources = region["river_source"][pixels] & pixel_exists
+	river |= sources & (dxs**2 + dys**2 <= (scale*RasterRenderer.source_radius + 0.5)**2)
+	rgb[river] = hexColour(RasterRenderer.river)
+
+	return rgb, bool(pixel_exists.all())
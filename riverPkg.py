@@ -1,8 +1,12 @@
 class RiverVertex:
 	'''
-	Class representing river starts and ends.
+	Class representing river starts and ends. It goes from the tile's centre to the middle of its side @end_side; the coordinates are computed for whole batches of rivers when they are plotted (see geometryPkg).
 	'''
 
+	#river parts are cached for every tile with rivers, the slots make them smaller
+	__slots__ = ("is_start", "end_side", "width", "gui_ids")
+
+
 	def __init__(self, is_start :bool = False):
 		'''
 		Constructor of RiverVertex class.
@@ -11,39 +15,18 @@ class RiverVertex:
 
 		self.is_start = is_start
 		self.end_side = None
-		self.gui_ids = None
-		self.start_point = None
-		self.end_point = None
-
-
-	def setCoords(self, tile):
-		'''
-		Sets coordinates of this river part boundary points for line plotting. Should be called after this object's @end_side is set.
-		@tile (Tile) ... The tile in which this river is located.
-		'''
-
-		side_xs = {	"w": tile.x - 0.866*tile.side_length,
-					"nw": tile.x - 0.5*0.866*tile.side_length,
-					"ne": tile.x + 0.5*0.866*tile.side_length,
-					"e": tile.x + 0.866*tile.side_length,
-					"se": tile.x + 0.5*0.866*tile.side_length,
-					"sw": tile.x - 0.5*0.866*tile.side_length}
-		side_ys = {	"w": tile.y,
-					"nw": tile.y - 0.75*tile.side_length,
-					"ne": tile.y - 0.75*tile.side_length,
-					"e": tile.y,
-					"se": tile.y + 0.75*tile.side_length,
-					"sw": tile.y + 0.75*tile.side_length}
-
-		self.start_point = (tile.x, tile.y)
-		self.end_point = (side_xs[self.end_side], side_ys[self.end_side])
+		self.width = 3
+		self.gui_ids = ()
 
 
 class RiverSegment:
 	'''
-	Class representing those river parts which are not its endings.
+	Class representing those river parts which are not its endings. It goes from the middle of the tile's side @start_side through the tile's centre to the middle of its side @end_side.
 	'''
 
+	__slots__ = ("start_side", "end_side", "width", "gui_ids")
+
+
 	def __init__(self):
 		'''
 		Constructor of RiverSegment class.
@@ -51,30 +34,5 @@ class RiverSegment:
 
 		self.start_side = None
 		self.end_side = None
-		self.gui_ids = None
-		self.start_point = None
-		self.end_point = None
-
-
-	def setCoords(self, tile):
-		'''
-		Sets coordinates of this river part boundary points for line plotting. Should be called after this object's @start_side and @end_side is set.
-		@tile (Tile) ... The tile in which this river is located.
-		'''
-
-		side_xs = {	"w": tile.x - 0.866*tile.side_length,
-					"nw": tile.x - 0.5*0.866*tile.side_length,
-					"ne": tile.x + 0.5*0.866*tile.side_length,
-					"e": tile.x + 0.866*tile.side_length,
-					"se": tile.x + 0.5*0.866*tile.side_length,
-					"sw": tile.x - 0.5*0.866*tile.side_length}
-		side_ys = {	"w": tile.y,
-					"nw": tile.y - 0.75*tile.side_length,
-					"ne": tile.y - 0.75*tile.side_length,
-					"e": tile.y,
-					"se": tile.y + 0.75*tile.side_length,
-					"sw": tile.y + 0.75*tile.side_length}
-
-		self.start_point = (side_xs[self.start_side], side_ys[self.start_side])
-		self.mid_point = (tile.x, tile.y)
-		self.end_point = (side_xs[self.end_side], side_ys[self.end_side])
+		self.width = 3
+		self.gui_ids = ()
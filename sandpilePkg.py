@@ -0,0 +1,68 @@
+import numpy
+
+
+#axial coordinate shifts of the six hexagonal neighbours (in the order w, nw, ne, e, se, sw)
+delta_qs = numpy.array([-1, 0, 1, 1, 0, -1])
+delta_rs = numpy.array([0, -1, -1, 0, 1, 1])
+
+
+def hexKeys(qs :numpy.ndarray, rs :numpy.ndarray) -> numpy.ndarray:
+	'''
+	Returns unique int64 keys of tiles on @qs and @rs (numpy.ndarray) axial coordinates.
+	'''
+
+	return numpy.asarray(qs, numpy.int64) * 2**32 + numpy.asarray(rs, numpy.int64)
+
+
+def neighbourTable(qs :numpy.ndarray, rs :numpy.ndarray) -> tuple:
+	'''
+	Builds the hexagonal neighbour index table of tiles on @qs and @rs (numpy.ndarray) axial coordinates.
+	Returns (table, mask), where table[k, side] is the index of the k-th tile's neighbour on side and mask[k, side] is False if that neighbour is not among the given tiles.
+	'''
+
+	keys = hexKeys(qs, rs)
+	order = numpy.argsort(keys)
+	sorted_keys = keys[order]
+
+	neighbour_keys = hexKeys(qs[:, None] + delta_qs, rs[:, None] + delta_rs)
+	positions = numpy.minimum(numpy.searchsorted(sorted_keys, neighbour_keys), len(keys) - 1)
+
+	mask = sorted_keys[positions] == neighbour_keys
+	table = numpy.where(mask, order[positions], 0)
+	return table, mask
+
+
+def colourClasses(qs :numpy.ndarray, rs :numpy.ndarray) -> numpy.ndarray:
+	'''
+	Returns colours 0, ..., 6 of tiles on @qs and @rs (numpy.ndarray) axial coordinates, such that every tile and its six neighbours have different colours.
+	'''
+
+	return numpy.mod(qs + 3*rs, 7)
+
+
+def smooth(altitudes :numpy.ndarray, table :numpy.ndarray, mask :numpy.ndarray, update :numpy.ndarray, colours :numpy.ndarray, jitter :numpy.ndarray, alpha :float, beta :float) -> numpy.ndarray:
+	'''
+	Makes @altitudes (numpy.ndarray) more smooth by averaging each altitude with its neighbours' altitudes, and returns the result. One iteration is done for each row of @jitter.
+	Like the tile-by-tile loop, every update already sees the updated altitudes of some neighbours: tiles of one colour class are updated at once, one class after another.
+	@table, @mask (numpy.ndarray) ... Neighbour index table and its mask given by _neighbourTable_.
+	@update (numpy.ndarray) ... Boolean mask of altitudes that are being smoothed, the rest only takes part in the averaging.
+	@colours (numpy.ndarray) ... Colour classes of the tiles given by _colourClasses_.
+	@jitter (numpy.ndarray) ... Random numbers from [-1, 1] of shape (iterations, len(altitudes)).
+	@alpha (float) ... Larger alpha means that the new altitude less depends on the current altitude and more on the neighbours' altitude.
+	@beta (float) ... Larger beta means stronger effect of random change of altitude.
+	'''
+
+	altitudes = numpy.array(altitudes, numpy.float64)
+	counts = numpy.maximum(mask.sum(axis=1), 1)
+	classes = [numpy.flatnonzero(update & (colours == colour)) for colour in range(7)]
+
+	for shifts in jitter:
+		for indices in classes:
+			average_neighbouring_altitudes = numpy.where(mask[indices], altitudes[table[indices]], 0).sum(axis=1) / counts[indices]
+			smoothed = (altitudes[indices] + alpha*average_neighbouring_altitudes) / (1+alpha)
+			rand_shifted = smoothed + beta*shifts[indices]
+
+			#apply the random update only if the altitude is still bounded in [-1, 1]
+			altitudes[indices] = numpy.where((-1 <= rand_shifted) & (rand_shifted <= 1), rand_shifted, smoothed)
+
+	return altitudes
@@ -0,0 +1,261 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from mapPkg import Map, classifyBiomes
+from terrainPkg import Terrain
+import multiprocessing
+import argparse
+import asyncio
+import json
+import numpy
+import os
+
+#per-tile arrays of the served chunks and their data types; a chunk is sent as these arrays, each one of chunk_size x chunk_size values ordered by rows [r - r0, q - q0],
+#one after another in this order (the altitudes are sent in single precision to make the chunks smaller)
+served_fields = {	"altitude": "<f4",
+					"biome": "|u1",
+					"is_lake": "|b1",
+					"river_in": "|u1",
+					"river_out": "|i1",
+					"river_source": "|b1",
+					"river_flow": "<u2",
+					"river_order": "|u1"
+				}
+
+#terrain generator of the worker processes, set once by _startWorker_, so that its cached random numbers are reused by the neighbouring chunks
+worker_terrain = None
+
+
+def encodeChunk(arrays :dict) -> bytes:
+	'''
+	Returns the served binary form of the chunk with @arrays (dict, containing at least the _served_fields_).
+	'''
+
+	return b"".join( numpy.ascontiguousarray(arrays[field], dtype).tobytes() for field, dtype in served_fields.items() )
+
+
+def startWorker(terrain :Terrain):
+	'''
+	Initialiser of the worker processes, which generate the chunks of @terrain (Terrain).
+	'''
+
+	global worker_terrain
+	worker_terrain = terrain
+
+
+def generateChunkData(cq :int, cr :int) -> bytes:
+	'''
+	Generates the terrain of the chunk on (@cq, @cr) chunk coordinates in a worker process and returns its served binary form.
+	'''
+
+	arrays = worker_terrain.generateChunk(cq, cr)
+	arrays["biome"] = classifyBiomes(arrays["altitude"], arrays["is_lake"])
+	return encodeChunk(arrays)
+
+
+class ChunkServer:
+	'''
+	Class serving the chunks of one map to local clients over HTTP (or HTTP over Unix socket). The saved chunks of the map are read from its file,
+	the missing chunks are generated in worker processes from the map's seed, so every chunk of the infinite world can be requested; the map itself is not changed.
+	Concurrent requests of the same chunk wait for one generation, and the most recently served chunks are kept in a cache of bounded size.
+
+	Requests:
+	GET /info ... JSON with the map's seed, chunk size and _served_fields_.
+	GET /chunk/cq/cr ... The chunk on (cq, cr) chunk coordinates (see _served_fields_).
+	GET /stats ... JSON with the numbers of served, cached, generated and deduplicated chunks.
+	'''
+
+	def __init__(self, mapObj :Map, cache_size :int = 1024, workers :int = None):
+		'''
+		Constructor of ChunkServer class.
+		@mapObj (Map) ... The served map.
+		@cache_size (int) ... Maximal number of chunks kept in the cache.
+		@workers (int) ... Number of processes generating the missing chunks (number of CPUs if None).
+		'''
+
+		self.map = mapObj
+		self.cache_size = cache_size
+
+		#the workers are started fresh, as for prefetching, each one with its own copy of the terrain generator
+		self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"), initializer=startWorker, initargs=(mapObj.terrain,))
+
+		#binary chunks indexed by chunk coordinates, from the least to the most recently used
+		self.cache = OrderedDict()
+
+		#tasks of the chunks which are being read or generated, indexed by chunk coordinates
+		self.pending = {}
+
+		self.stats = {"requests": 0, "cache hits": 0, "deduplicated": 0, "read": 0, "generated": 0, "errors": 0}
+
+
+	async def chunkData(self, key :tuple) -> bytes:
+		'''
+		Returns the served binary form of the chunk on @key (tuple) chunk coordinates, from the cache, from the map, or generated.
+		'''
+
+		if key in self.cache:
+			self.stats["cache hits"] += 1
+			self.cache.move_to_end(key)
+			return self.cache[key]
+
+		if key in self.pending:
+			self.stats["deduplicated"] += 1
+		else:
+			self.pending[key] = asyncio.ensure_future( self.loadChunk(key) )
+
+		#a client which disconnects does not cancel the chunk for the other clients
+		return await asyncio.shield(self.pending[key])
+
+
+	async def loadChunk(self, key :tuple) -> bytes:
+		'''
+		Reads or generates the chunk on @key (tuple) chunk coordinates and puts it into the cache. Returns its served binary form.
+		'''
+
+		try:
+			if self.map.store.hasChunk(*key):
+				#the saved chunks are memory-mapped, so they are read without the workers
+				data = encodeChunk( self.map.store.peek(key) )
+				self.stats["read"] += 1
+			else:
+				data = await asyncio.get_running_loop().run_in_executor(self.executor, generateChunkData, *key)
+				self.stats["generated"] += 1
+		finally:
+			del self.pending[key]
+
+		self.cache[key] = data
+		if len(self.cache) > self.cache_size:
+			self.cache.popitem(last=False)
+		return data
+
+
+	def info(self) -> dict:
+		'''
+		Returns description of the served map and of the chunks' binary form.
+		'''
+
+		return {	"seed": int(self.map.seed),
+					"chunk_size": self.map.store.chunk_size,
+					"fields": [[field, dtype] for field, dtype in served_fields.items()]
+				}
+
+
+	async def respond(self, path :str) -> tuple:
+		'''
+		Returns (status, content type, body) of the response to GET request of @path (str).
+		'''
+
+		parts = path.strip("/").split("/")
+		if parts == ["info"]:
+			return "200 OK", "application/json", json.dumps( self.info() ).encode()
+		if parts == ["stats"]:
+			return "200 OK", "application/json", json.dumps( dict(self.stats, cached=len(self.cache), pending=len(self.pending)) ).encode()
+
+		if len(parts) == 3 and parts[0] == "chunk":
+			try:
+				key = ( int(parts[1]), int(parts[2]) )
+			except ValueError:
+				return "400 Bad Request", "text/plain", b"chunk coordinates must be integers"
+			return "200 OK", "application/octet-stream", await self.chunkData(key)
+
+		return "404 Not Found", "text/plain", b"unknown path"
+
+
+	async def handleClient(self, reader :asyncio.StreamReader, writer :asyncio.StreamWriter):
+		'''
+		Serves the requests of one client connection, which is kept open until the client closes it or asks for "Connection: close".
+		'''
+
+		try:
+			while True:
+				request = await reader.readline()
+				if request == b"":
+					break
+
+				#only the request line and the Connection header are needed
+				keep_alive = request.rstrip().endswith(b"HTTP/1.1")
+				while True:
+					header = await reader.readline()
+					if header in [b"\r\n", b"\n", b""]:
+						break
+					name, _, value = header.decode("latin-1").partition(":")
+					if name.strip().lower() == "connection":
+						keep_alive = value.strip().lower() == "keep-alive"
+
+				self.stats["requests"] += 1
+				method, path = (request.decode("latin-1").split() + ["", ""])[:2]
+				try:
+					if method != "GET":
+						status, content_type, body = "405 Method Not Allowed", "text/plain", b"only GET is supported"
+					else:
+						status, content_type, body = await self.respond(path)
+				except Exception as error:
+					self.stats["errors"] += 1
+					status, content_type, body = "500 Internal Server Error", "text/plain", str(error).encode()
+
+				head = f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+				writer.write(head.encode() + body)
+				await writer.drain()
+				if not keep_alive:
+					break
+		except ConnectionError:
+			pass
+		finally:
+			writer.close()
+
+
+	async def serve(self, host :str = "127.0.0.1", port :int = 8765, unix_path :str = None):
+		'''
+		Serves the clients on @host (str) and @port (int), or on Unix socket @unix_path (str) if it is given, until cancelled.
+		'''
+
+		if unix_path != None:
+			server = await asyncio.start_unix_server(self.handleClient, unix_path)
+		else:
+			server = await asyncio.start_server(self.handleClient, host, port)
+
+		try:
+			async with server:
+				await server.serve_forever()
+		finally:
+			if unix_path != None and os.path.exists(unix_path):
+				os.remove(unix_path)
+
+
+	def close(self):
+		'''
+		Stops the worker processes and closes the map's files.
+		'''
+
+		self.executor.shutdown(cancel_futures=True)
+		self.map.store.close()
+
+
+def main():
+	'''
+	Command line entry point: serves a saved map, or a new map of the given seed, until interrupted.
+	'''
+
+	parser = argparse.ArgumentParser(description="Serve the chunks of hex map to local clients.")
+	parser.add_argument("--map", default=None, help="saved map file to serve (a new map is generated on demand if omitted)")
+	parser.add_argument("--seed", type=int, default=None, help="seed of the new map (random if omitted)")
+	parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+	parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+	parser.add_argument("--unix", default=None, help="Unix socket to listen on instead of the port")
+	parser.add_argument("--cache", type=int, default=1024, help="maximal number of cached chunks")
+	parser.add_argument("--workers", type=int, default=None, help="number of processes generating the chunks (number of CPUs if omitted)")
+	args = parser.parse_args()
+
+	mapObj = Map.load(args.map, 0, 0) if args.map != None else Map(0, 0, args.seed)
+	server = ChunkServer(mapObj, args.cache, args.workers)
+	print(f"serving map of seed {mapObj.seed} on {args.unix if args.unix != None else f'http://{args.host}:{args.port}'}", flush=True)
+
+	try:
+		asyncio.run( server.serve(args.host, args.port, args.unix) )
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.close()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,307 @@
+import sandpilePkg
+from profilePkg import profiler
+from collections import OrderedDict
+import functools
+import numpy
+
+
+@functools.lru_cache()
+def sandpileArea(size :int) -> tuple:
+	'''
+	Returns axial coordinates (qs, rs) of the square area of @size (int) tiles on its side smoothed by Terrain._updateSandpiles_, and their neighbour (table, mask).
+	The area is the same for every chunk, so it is built only once in each process.
+	'''
+
+	rs, qs = numpy.divmod(numpy.arange(size*size), size)
+	table, mask = sandpilePkg.neighbourTable(qs, rs)
+	return qs, rs, table, mask
+
+
+class Terrain:
+	'''
+	Class generating terrain of map chunks. Each chunk is generated only from the random numbers derived from the seed and the coordinates of the chunk
+	and its neighbours, so the terrain does not depend on the order in which the chunks are generated, nor on the process which generates them.
+	'''
+
+	#larger alpha means that the new altitude less depends on the current altitude and more on the neighbours' altitude
+	sandpile_alpha = 20
+
+	#larger beta means stronger effect of random change of altitude
+	sandpile_beta = 0.01
+
+	#number of iterations of the _updateSandpiles_ averaging algorithm
+	sandpile_iterations = 5
+
+	#number of tiles around a chunk that are smoothed together with it, so that the terrain continues smoothly between chunks
+	sandpile_halo = 8
+
+	#probability of river source in a tile is this coefficient times the tile's altitude
+	river_source_rate = 0.1
+
+	#number of chunks around a chunk whose rivers are traced together with it, so that the rivers flow across the chunks' edges
+	river_reach = 1
+
+
+	def __init__(self, seed :int, chunk_size :int, noise_cache :int = 256):
+		'''
+		Constructor of Terrain class.
+		@seed (int) ... Seed of the random generators; terrains with the same seed are identical.
+		@chunk_size (int) ... Number of tiles on a chunk's side.
+		@noise_cache (int) ... Number of chunks whose random numbers and altitudes are kept for generating their neighbours (0 computes them again every time).
+		'''
+
+		self.seed = seed
+		self.chunk_size = chunk_size
+		self.noise_cache = noise_cache
+
+		#random numbers of the recently used chunks indexed by chunk coordinates, the least recently used are dropped first
+		self.noises = OrderedDict()
+
+		#smoothed altitudes of the recently used chunks indexed by chunk coordinates, the least recently used are dropped first
+		self.altitudes = OrderedDict()
+
+
+	def __getstate__(self) -> dict:
+		'''
+		Returns the state of the terrain for pickling (e.g. for generating chunks in other processes), without the cached random numbers and altitudes.
+		'''
+
+		state = self.__dict__.copy()
+		state["noises"] = OrderedDict()
+		state["altitudes"] = OrderedDict()
+		return state
+
+
+	def chunkRng(self, cq :int, cr :int) -> numpy.random.Generator:
+		'''
+		Returns new random generator of the chunk on (@cq, @cr) chunk coordinates. Its stream depends only on the seed and the chunk coordinates.
+		'''
+
+		#spawn keys have to be non-negative, so interleave the negative and positive coordinates
+		spawn_key = tuple(2*c if c >= 0 else -2*c - 1 for c in (cq, cr))
+		return numpy.random.default_rng( numpy.random.SeedSequence(self.seed, spawn_key=spawn_key) )
+
+
+	def chunkNoise(self, cq :int, cr :int) -> dict:
+		'''
+		Returns the random numbers used for generating the chunk on (@cq, @cr) chunk coordinates:
+		"altitudes" (first random altitudes, -1 or 1), "jitter" (random altitude shifts of each _updateSandpiles_ iteration)
+		and "river_trials" (compared to altitudes to choose river sources).
+		The numbers of every chunk are drawn as whole arrays from the chunk's generator, and they are cached, because the chunk's neighbours are smoothed with them as well.
+		The returned arrays are read-only.
+		'''
+
+		key = (cq, cr)
+		if key in self.noises:
+			self.noises.move_to_end(key)
+			return self.noises[key]
+
+		size = self.chunk_size
+		rng = self.chunkRng(cq, cr)
+
+		noise = {	"altitudes": rng.choice([-1.0, 1.0], size=(size, size)),
+					"jitter": rng.uniform(-1, 1, (Terrain.sandpile_iterations, size, size)),
+					"river_trials": rng.random( (size, size) )
+				}
+		for array in noise.values():
+			array.flags.writeable = False
+
+		if self.noise_cache > 0:
+			self.noises[key] = noise
+			if len(self.noises) > self.noise_cache:
+				self.noises.popitem(last=False)
+		return noise
+
+
+	def generateChunk(self, cq :int, cr :int) -> dict:
+		'''
+		Generates the terrain of the whole chunk on (@cq, @cr) chunk coordinates.
+		Returns its arrays "altitude", "is_lake", "river_in", "river_out", "river_source", "river_flow" and "river_order".
+		The rivers are traced over the window of the chunks up to _river_reach_ chunks around it, so they continue across the chunk's edges;
+		the flows and orders count the water coming from this window only.
+		'''
+
+		size = self.chunk_size
+		reach = Terrain.river_reach
+		width = (2*reach + 1) * size
+		window = [(cq + dq, cr + dr) for dr in range(-reach, reach + 1) for dq in range(-reach, reach + 1)]
+
+		arrays = {	"altitude": self.windowArray( [self.chunkAltitudes(*key) for key in window] ),
+					"is_lake": numpy.zeros( (width, width), bool ),
+					"river_in": numpy.zeros( (width, width), numpy.uint8 ),
+					"river_out": numpy.full( (width, width), -1, numpy.int8 ),
+					"river_source": numpy.zeros( (width, width), bool ),
+					"river_flow": numpy.zeros( (width, width), numpy.uint16 ),
+					"river_order": numpy.zeros( (width, width), numpy.uint8 )
+				}
+
+		#find tiles which are chosen to have river sources
+		with profiler.span("terrain/riverSources"):
+			trials = self.windowArray( [self.chunkNoise(*key)["river_trials"] for key in window] )
+			sources = trials < Terrain.river_source_rate * arrays["altitude"]
+
+		#generate the rivers from the sources
+		with profiler.span("terrain/makeRivers"):
+			self.makeRivers(arrays, sources)
+
+		centre = slice(reach*size, (reach + 1)*size)
+		return {field: values[centre, centre].copy() for field, values in arrays.items()}
+
+
+	def windowArray(self, parts :list[numpy.ndarray]) -> numpy.ndarray:
+		'''
+		Returns one array of the chunks' @parts (list[numpy.ndarray]), which are ordered by rows of the square window of chunks, as in _generateChunk_.
+		'''
+
+		side = round( len(parts)**0.5 )
+		return numpy.block( [parts[row*side : (row + 1)*side] for row in range(side)] )
+
+
+	def chunkAltitudes(self, cq :int, cr :int) -> numpy.ndarray:
+		'''
+		Returns the smoothed altitudes of the chunk on (@cq, @cr) chunk coordinates (see _updateSandpiles_). They are cached, because the rivers of the chunk's neighbours flow over them as well.
+		The returned array is read-only.
+		'''
+
+		key = (cq, cr)
+		if key in self.altitudes:
+			self.altitudes.move_to_end(key)
+			return self.altitudes[key]
+
+		with profiler.span("terrain/updateSandpiles"):
+			altitude = self.updateSandpiles(cq, cr).copy()
+		altitude.flags.writeable = False
+
+		if self.noise_cache > 0:
+			self.altitudes[key] = altitude
+			if len(self.altitudes) > self.noise_cache:
+				self.altitudes.popitem(last=False)
+		return altitude
+
+
+	def updateSandpiles(self, cq :int, cr :int) -> numpy.ndarray:
+		'''
+		Returns the altitudes of the chunk on (@cq, @cr) chunk coordinates, which are the first random altitudes made more smooth by averaging tile altitude with its neighbours' altitudes.
+		The chunk is smoothed together with the halo of the neighbouring chunks' first random altitudes.
+		'''
+
+		size = self.chunk_size
+		halo = Terrain.sandpile_halo
+		qs, rs, table, mask = sandpileArea(size + 2*halo)
+
+		#random numbers of this chunk and of the halo parts of the eight chunks around it, copied into one area
+		width = size + 2*halo
+		altitudes = numpy.empty( (width, width) )
+		jitter = numpy.empty( (Terrain.sandpile_iterations, width, width) )
+		parts = [(slice(size - halo, size), slice(0, halo)), (slice(0, size), slice(halo, halo + size)), (slice(0, halo), slice(halo + size, width))]
+		for dr, (source_rows, rows) in zip([-1, 0, 1], parts):
+			for dq, (source_columns, columns) in zip([-1, 0, 1], parts):
+				noise = self.chunkNoise(cq + dq, cr + dr)
+				altitudes[rows, columns] = noise["altitudes"][source_rows, source_columns]
+				jitter[:, rows, columns] = noise["jitter"][:, source_rows, source_columns]
+
+		update = numpy.ones(len(qs), bool)
+		colours = sandpilePkg.colourClasses(qs + cq*size - halo, rs + cr*size - halo)
+		jitter = jitter.reshape( (Terrain.sandpile_iterations, -1) )
+
+		altitudes = sandpilePkg.smooth(altitudes.ravel(), table, mask, update, colours, jitter, Terrain.sandpile_alpha, Terrain.sandpile_beta)
+		return altitudes.reshape( (size + 2*halo, size + 2*halo) )[halo:-halo, halo:-halo]
+
+
+	def downhillDirections(self, altitude :numpy.ndarray) -> numpy.ndarray:
+		'''
+		Returns the direction of the steepest descent from each tile of the square area with @altitude (numpy.ndarray): index into sandpilePkg.delta_qs of the side
+		with the lowest neighbour, or -1 if the tile is in the ocean or in a local minimum. The directions do not leave the area.
+		'''
+
+		size = len(altitude)
+
+		#equal altitudes are ordered by the tile index, so that the rivers can not flow in cycles
+		index = numpy.arange(size*size).reshape( (size, size) )
+		padded_altitude = numpy.pad(altitude, 1, constant_values=numpy.inf)
+		padded_index = numpy.pad(index, 1, constant_values=size*size)
+
+		lowest = numpy.full( (size, size), numpy.inf )
+		directions = numpy.full( (size, size), -1, numpy.int8 )
+		for side, (dq, dr) in enumerate( zip(sandpilePkg.delta_qs, sandpilePkg.delta_rs) ):
+			neighbour_altitude = padded_altitude[1 + dr : 1 + dr + size, 1 + dq : 1 + dq + size]
+			neighbour_index = padded_index[1 + dr : 1 + dr + size, 1 + dq : 1 + dq + size]
+
+			downhill = (neighbour_altitude < altitude) | ((neighbour_altitude == altitude) & (neighbour_index < index))
+			steeper = downhill & (neighbour_altitude < lowest)
+			lowest[steeper] = neighbour_altitude[steeper]
+			directions[steeper] = side
+
+		#the rivers end in the ocean
+		directions[altitude < 0] = -1
+		return directions
+
+
+	def makeRivers(self, arrays :dict, sources :numpy.ndarray):
+		'''
+		Creates the rivers inside the square area given by its @arrays (dict) from the river @sources (numpy.ndarray of bool). The rivers flow in the directions of the steepest descent,
+		they end in the ocean, or as lakes in the local minima. Sets the river flags of the tiles, and the arrays "river_flow" (number of tiles from which the water flows through the tile)
+		and "river_order" (Strahler order of the river in the tile, 0 for tiles without rivers).
+		'''
+
+		altitude = arrays["altitude"]
+		size = len(altitude)
+		directions = self.downhillDirections(altitude)
+
+		#a source in a local minimum does not start a river, the tile becomes a lake instead
+		pits = sources & (directions == -1)
+		sources = sources & ~pits
+
+		#flat index of the tile into which each tile drains, -1 if the water does not flow into another land tile
+		rows, columns = numpy.divmod( numpy.arange(size*size), size )
+		flat_directions = directions.ravel().astype(numpy.int64)
+		targets = (rows + sandpilePkg.delta_rs[flat_directions]) * size + columns + sandpilePkg.delta_qs[flat_directions]
+		drains = flat_directions >= 0
+		drains[drains] = altitude.ravel()[targets[drains]] >= 0
+		targets[~drains] = -1
+
+		flow = numpy.ones(size*size, numpy.int64)
+		river = sources.ravel().copy()
+		order = numpy.zeros(size*size, numpy.int64)
+
+		#the highest Strahler order of the rivers flowing into each tile and the number of such rivers
+		inflow_order = numpy.zeros(size*size, numpy.int64)
+		inflow_count = numpy.zeros(size*size, numpy.int64)
+
+		#go through the tiles from the springs downstream; a tile is finished when all the tiles draining into it are finished
+		remaining = numpy.bincount(targets[drains], minlength=size*size)
+		finished = numpy.flatnonzero(remaining == 0)
+		while finished.size != 0:
+			order[finished] = numpy.where( river[finished], numpy.maximum(inflow_order[finished] + (inflow_count[finished] >= 2), 1), 0 )
+
+			finished = finished[ drains[finished] ]
+			downstream = targets[finished]
+			numpy.add.at(flow, downstream, flow[finished])
+			numpy.logical_or.at(river, downstream, river[finished])
+
+			#the downstream order rises when two rivers of the same highest order meet
+			upstream_rivers = finished[ river[finished] ]
+			river_downstream = targets[upstream_rivers]
+			new_inflow_order = inflow_order.copy()
+			numpy.maximum.at(new_inflow_order, river_downstream, order[upstream_rivers])
+			inflow_count[new_inflow_order != inflow_order] = 0
+			inflow_order = new_inflow_order
+			numpy.add.at(inflow_count, river_downstream, order[upstream_rivers] == inflow_order[river_downstream])
+
+			numpy.subtract.at(remaining, downstream, 1)
+			downstream = numpy.unique(downstream)
+			finished = downstream[ remaining[downstream] == 0 ]
+
+		#river flags of the tiles through which the rivers flow
+		river = river.reshape( (size, size) )
+		arrays["river_source"][:] = sources
+		arrays["river_out"][:] = numpy.where(river, directions, -1)
+		arrays["is_lake"][:] = (river & (directions == -1)) | pits
+
+		river_in = arrays["river_in"].ravel()
+		flowing = numpy.flatnonzero(river.ravel() & drains)
+		numpy.bitwise_or.at( river_in, targets[flowing], (1 << (flat_directions[flowing] + 3) % 6).astype(numpy.uint8) )
+		arrays["river_in"][:] = river_in.reshape( (size, size) )
+
+		arrays["river_flow"][:] = flow.reshape( (size, size) )
+		arrays["river_order"][:] = order.reshape( (size, size) )
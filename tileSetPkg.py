@@ -0,0 +1,104 @@
+import numpy
+
+
+class TileSet:
+	'''
+	Class representing a set of map tiles given by their axial coordinates. The coordinates are kept in dense arrays (a removed tile is replaced by the last one),
+	so adding and removing a tile takes O(1) time and the whole set can be iterated over without searching the map. The number of the tiles in each chunk is counted as well.
+	'''
+
+	def __init__(self, chunk_size :int):
+		'''
+		Constructor of TileSet class.
+		@chunk_size (int) ... Number of tiles on a side of the map's chunks.
+		'''
+
+		self.chunk_size = chunk_size
+
+		#axial coordinates of the tiles, only the first _count_ entries are used
+		self.qs = numpy.empty(64, numpy.int64)
+		self.rs = numpy.empty(64, numpy.int64)
+		self.count = 0
+
+		#index of every tile into the arrays indexed by its (q, r) coordinates, and number of tiles in every chunk indexed by its (cq, cr) coordinates
+		self.positions = {}
+		self.chunk_counts = {}
+
+
+	def __len__(self) -> int:
+		return self.count
+
+
+	def __contains__(self, tile :tuple) -> bool:
+		return tile in self.positions
+
+
+	def add(self, qs :numpy.ndarray, rs :numpy.ndarray):
+		'''
+		Adds the tiles on @qs and @rs (numpy.ndarray) axial coordinates, the tiles which are already in the set or repeated in the arrays are added only once.
+		'''
+
+		tiles = dict.fromkeys( zip(numpy.asarray(qs).tolist(), numpy.asarray(rs).tolist()) )
+		new = [tile for tile in tiles if tile not in self.positions]
+		if new == []:
+			return
+
+		#the arrays grow by doubling, so adding is amortised O(1)
+		if self.count + len(new) > len(self.qs):
+			capacity = max(2*len(self.qs), self.count + len(new))
+			self.qs = numpy.resize(self.qs, capacity)
+			self.rs = numpy.resize(self.rs, capacity)
+
+		size = self.chunk_size
+		for q, r in new:
+			self.positions[(q, r)] = self.count
+			self.count += 1
+			key = (q // size, r // size)
+			self.chunk_counts[key] = self.chunk_counts.get(key, 0) + 1
+
+		new = numpy.array(new, numpy.int64).reshape( (-1, 2) )
+		self.qs[self.count - len(new) : self.count] = new[:, 0]
+		self.rs[self.count - len(new) : self.count] = new[:, 1]
+
+
+	def remove(self, qs :numpy.ndarray, rs :numpy.ndarray):
+		'''
+		Removes the tiles on @qs and @rs (numpy.ndarray) axial coordinates, the tiles which are not in the set are skipped.
+		'''
+
+		size = self.chunk_size
+		for q, r in zip(numpy.asarray(qs).tolist(), numpy.asarray(rs).tolist()):
+			index = self.positions.pop( (q, r), None )
+			if index == None:
+				continue
+
+			#the last tile takes the removed tile's place
+			self.count -= 1
+			if index != self.count:
+				last_q, last_r = int(self.qs[self.count]), int(self.rs[self.count])
+				self.qs[index] = last_q
+				self.rs[index] = last_r
+				self.positions[(last_q, last_r)] = index
+
+			key = (q // size, r // size)
+			self.chunk_counts[key] -= 1
+			if self.chunk_counts[key] == 0:
+				del self.chunk_counts[key]
+
+
+	def coordinates(self) -> tuple:
+		'''
+		Returns copies of the axial coordinates (qs, rs) (numpy.ndarray) of all the tiles in the set, ordered by chunks.
+		'''
+
+		qs, rs = self.qs[:self.count], self.rs[:self.count]
+		order = numpy.lexsort( (qs, rs, qs // self.chunk_size, rs // self.chunk_size) )
+		return qs[order], rs[order]
+
+
+	def chunks(self) -> set:
+		'''
+		Returns set of (cq, cr) coordinates of the chunks containing some of the tiles.
+		'''
+
+		return set(self.chunk_counts)
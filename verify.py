@@ -0,0 +1,375 @@
+from mapPkg import Map, Tile
+from terrainPkg import Terrain
+from tileSetPkg import TileSet
+import sandpilePkg
+import numpy
+import hashlib
+import json
+import tempfile
+import sys
+import os
+
+
+def loopSandpiles(tiles :list[Tile]):
+	'''
+	Reference pure-Python implementation of Map._updateSandpiles_, which updates the @tiles (list[Tile]) one by one.
+	'''
+
+	alpha = Terrain.sandpile_alpha
+	beta = Terrain.sandpile_beta
+
+	for _ in range(Terrain.sandpile_iterations):
+		for tile in tiles:
+			neighbours = tile.getExistingNeighbours()
+			average_neighbouring_altitude = sum(neighbours[key].altitude for key in neighbours) / len(neighbours)
+			tile.altitude = (tile.altitude + alpha*average_neighbouring_altitude) / (1+alpha)
+			rand_shift = tile.altitude + beta*numpy.random.uniform(-1,1)
+
+			#apply the random update only if the altitude is still bounded in [-1, 1]
+			if -1 <= rand_shift <= 1:	tile.altitude = rand_shift
+
+
+def vectorisedSandpiles(tiles :list[Tile]):
+	'''
+	Smooths the altitudes of @tiles (list[Tile]) by the vectorised kernel of Map._updateSandpiles_, with the same random numbers as _loopSandpiles_ uses.
+	'''
+
+	qs = numpy.array([tile.q for tile in tiles])
+	rs = numpy.array([tile.r for tile in tiles])
+	table, mask = sandpilePkg.neighbourTable(qs, rs)
+	jitter = numpy.random.uniform(-1, 1, (Terrain.sandpile_iterations, len(tiles)))
+
+	altitudes = sandpilePkg.smooth([tile.altitude for tile in tiles], table, mask, numpy.ones(len(tiles), bool), sandpilePkg.colourClasses(qs, rs), jitter, Terrain.sandpile_alpha, Terrain.sandpile_beta)
+	for tile, altitude in zip(tiles, altitudes):
+		tile.altitude = altitude
+
+
+def buildMap(layers :int, seed :int = None) -> Map:
+	'''
+	Returns a map of seed @seed (int) extended by @layers (int) layers on each side.
+	'''
+
+	mapObj = Map(0, 0, seed)
+	for _ in range(layers):
+		mapObj.generateLeftSide()
+		mapObj.generateUpSide()
+		mapObj.generateRightSide()
+		mapObj.generateDownSide()
+	return mapObj
+
+
+def searchOrder(mapObj :Map) -> list[Tile]:
+	'''
+	Returns all tiles of @mapObj (Map) in the order of depth-first search from its centre tile over the sides in the order of Tile.sides.
+	The original map generation updated the tiles in this order, so _loopSandpiles_ runs in it.
+	'''
+
+	centre = mapObj.centre_tile
+	stack = [centre]
+	visited = {(centre.q, centre.r)}
+	tiles = []
+
+	while stack != []:
+		tile = stack.pop()
+		for side in Tile.sides:
+			q, r = tile.q + Tile.delta_qs[side], tile.r + Tile.delta_rs[side]
+			if (q, r) not in visited and mapObj.store.contains(q, r):
+				visited.add( (q, r) )
+				stack.append( Tile(mapObj.store, q, r) )
+		tiles.append(tile)
+	return tiles
+
+
+def sandpileStatistics(tiles :list[Tile]) -> numpy.ndarray:
+	'''
+	Returns the summary statistics of the @tiles (list[Tile]) altitudes: mean, standard deviation, share of ocean and mean absolute difference from the neighbours' average.
+	'''
+
+	altitudes = numpy.array([tile.altitude for tile in tiles])
+	roughness = [abs(tile.altitude - numpy.mean([neighbour.altitude for neighbour in tile.getExistingNeighbours().values()])) for tile in tiles]
+	return numpy.array([altitudes.mean(), altitudes.std(), numpy.mean(altitudes < 0), numpy.mean(roughness)])
+
+
+def checkSandpiles(trials :int = 40, layers :int = 16) -> bool:
+	'''
+	Statistical equivalence check of the Map._updateSandpiles_ kernel against the reference loop _loopSandpiles_. Both are run on the same random maps
+	of @layers (int) layers and their summary statistics are compared over @trials (int) maps. Returns True if the 95% confidence interval
+	of every statistic's difference lies within its equivalence margin.
+	'''
+
+	names = ["mean", "std", "ocean share", "roughness"]
+	loop_statistics = []
+	vectorised_statistics = []
+
+	for trial in range(trials):
+		numpy.random.seed(trial)
+		mapObj = buildMap(layers, trial)
+		tiles = searchOrder(mapObj)
+		initial_altitudes = numpy.random.choice([-1.0, 1.0], size=len(tiles))
+
+		for tile, altitude in zip(tiles, initial_altitudes):
+			tile.altitude = altitude
+
+		loopSandpiles(tiles)
+		loop_statistics.append( sandpileStatistics(tiles) )
+
+		for tile, altitude in zip(tiles, initial_altitudes):
+			tile.altitude = altitude
+
+		vectorisedSandpiles(tiles)
+		vectorised_statistics.append( sandpileStatistics(tiles) )
+
+	loop_statistics = numpy.array(loop_statistics)
+	vectorised_statistics = numpy.array(vectorised_statistics)
+	loop_means = loop_statistics.mean(axis=0)
+
+	#absolute margins for the mean and the ocean share (which flips easily around zero altitude), 10% of the loop's value for the spread statistics
+	margins = numpy.array([0.02, 0.1*loop_means[1], 0.05, 0.1*loop_means[3]])
+
+	#the maps are paired, so compare the per-map differences
+	differences = vectorised_statistics - loop_statistics
+	standard_errors = differences.std(axis=0, ddof=1) / numpy.sqrt(trials)
+	bounds = numpy.abs(differences.mean(axis=0)) + 2*standard_errors
+
+	passed = True
+	for name, loop_value, vectorised_value, bound, margin in zip(names, loop_means, vectorised_statistics.mean(axis=0), bounds, margins):
+		print(f"{name:12} loop {loop_value:+.4f}   vectorised {vectorised_value:+.4f}   |difference| < {bound:.4f} (margin {margin:.4f})")
+		passed = passed and bound <= margin
+
+	return passed
+
+
+def loopRivers(altitude :numpy.ndarray, sources :numpy.ndarray) -> dict:
+	'''
+	Reference pure-Python implementation of Terrain._makeRivers_, which traces the rivers from @sources (numpy.ndarray of bool) one tile at a time over a square area of @altitude (numpy.ndarray),
+	and computes the flow and the Strahler orders by walking the tiles up- and downstream. Returns the arrays set by Terrain._makeRivers_.
+	'''
+
+	size = len(altitude)
+	tiles = [(i, j) for i in range(size) for j in range(size)]
+
+	def neighbour(i, j, side):
+		i, j = i + sandpilePkg.delta_rs[side], j + sandpilePkg.delta_qs[side]
+		return (i, j) if 0 <= i < size and 0 <= j < size else None
+
+	#steepest descent, equal altitudes ordered by the tile index
+	def key(tile):	return (altitude[tile], tile[0]*size + tile[1])
+	downhill = {}
+	for tile in tiles:
+		candidates = [(key(neighbour(*tile, side)), side) for side in range(6) if neighbour(*tile, side) != None and key(neighbour(*tile, side)) < key(tile)]
+		downhill[tile] = min(candidates)[1] if candidates != [] and altitude[tile] >= 0 else -1
+
+	#the tile into which the water flows, if it is a land tile
+	def target(tile):
+		if downhill[tile] == -1:	return None
+		next_tile = neighbour(*tile, downhill[tile])
+		return next_tile if altitude[next_tile] >= 0 else None
+
+	arrays = {	"is_lake": numpy.zeros( (size, size), bool ),
+				"river_in": numpy.zeros( (size, size), numpy.uint8 ),
+				"river_out": numpy.full( (size, size), -1, numpy.int8 ),
+				"river_source": sources.copy(),
+				"river_flow": numpy.zeros( (size, size), numpy.uint16 ),
+				"river_order": numpy.zeros( (size, size), numpy.uint8 )
+			}
+
+	#trace the rivers, until they reach the ocean, a lake or another river
+	river = set()
+	for source in zip(*numpy.nonzero(sources)):
+
+		#a source in a local minimum is only a lake
+		if downhill[source] == -1:
+			arrays["is_lake"][source] = True
+			arrays["river_source"][source] = False
+			continue
+
+		tile = source
+		while tile not in river:
+			river.add(tile)
+			if altitude[tile] >= 0 and downhill[tile] == -1:
+				arrays["is_lake"][tile] = True
+				break
+			arrays["river_out"][tile] = downhill[tile]
+			next_tile = target(tile)
+			if next_tile == None:
+				break
+			arrays["river_in"][next_tile] |= 1 << (downhill[tile] + 3) % 6
+			tile = next_tile
+
+	#every tile adds its water to all the tiles downstream
+	for tile in tiles:
+		while tile != None:
+			arrays["river_flow"][tile] += 1
+			tile = target(tile)
+
+	upstream = {tile: [] for tile in tiles}
+	for tile in tiles:
+		if target(tile) != None:
+			upstream[target(tile)].append(tile)
+
+	def strahler(tile):
+		orders = sorted( [strahler(up) for up in upstream[tile] if up in river], reverse=True )
+		if orders == []:	return 1
+		return orders[0] + 1 if len(orders) >= 2 and orders[0] == orders[1] else orders[0]
+
+	for tile in river:
+		arrays["river_order"][tile] = strahler(tile)
+
+	return arrays
+
+
+def checkRivers(seeds :list[int] = [0, 1, 2, 3], radius :int = 1) -> bool:
+	'''
+	Checks that Terrain._makeRivers_ gives exactly the same rivers, flows and orders as the reference loop _loopRivers_ in the chunks of maps of @seeds (list[int])
+	in the square of chunk coordinates from -@radius to @radius (int). The reference traces the rivers over the same window of chunks as Terrain._generateChunk_.
+	'''
+
+	reach = Terrain.river_reach
+
+	passed = True
+	for seed in seeds:
+		terrain = Terrain(seed, Map(0, 0, seed).store.chunk_size)
+		different = set()
+		for cq in range(-radius, radius + 1):
+			for cr in range(-radius, radius + 1):
+				arrays = terrain.generateChunk(cq, cr)
+
+				window = [(cq + dq, cr + dr) for dr in range(-reach, reach + 1) for dq in range(-reach, reach + 1)]
+				altitude = terrain.windowArray( [terrain.chunkAltitudes(*key) for key in window] )
+				sources = terrain.windowArray( [terrain.chunkNoise(*key)["river_trials"] for key in window] ) < Terrain.river_source_rate * altitude
+				centre = slice(reach*terrain.chunk_size, (reach + 1)*terrain.chunk_size)
+				reference = {field: values[centre, centre] for field, values in loopRivers(altitude, sources).items()}
+				different |= {field for field in reference if not numpy.array_equal(reference[field], arrays[field])}
+
+		print(f"seed {seed:5}:", "OK" if different == set() else "differs in " + ", ".join(sorted(different)))
+		passed = passed and different == set()
+
+	return passed
+
+
+def checkTileSet(chunk_size :int = 4) -> bool:
+	'''
+	Checks that TileSet keeps its coordinates, positions and chunk counts consistent when the added tiles repeat, both within one call and across calls,
+	and when the removed tiles are missing; the set is compared with a Python set after every operation.
+	'''
+
+	tiles = TileSet(chunk_size)
+	reference = set()
+	operations = [	("add", [1, 1, 5], [2, 2, 5]),
+					("add", [1, 6, 6], [2, -1, -1]),
+					("remove", [1], [2]),
+					("remove", [1, 7], [2, 7]),
+					("add", [-3, -3, 5], [0, 0, 5]),
+					("remove", [5, 6, -3], [5, -1, 0])
+				]
+
+	passed = True
+	for operation, qs, rs in operations:
+		getattr(tiles, operation)( numpy.array(qs), numpy.array(rs) )
+		if operation == "add":
+			reference |= set( zip(qs, rs) )
+		else:
+			reference -= set( zip(qs, rs) )
+
+		coordinates = list( zip(*[values.tolist() for values in tiles.coordinates()]) )
+		consistent = len(tiles) == len(reference) and len(coordinates) == len(reference) and set(coordinates) == reference \
+			and all(tile in tiles for tile in reference) and tiles.chunks() == {(q // chunk_size, r // chunk_size) for q, r in reference}
+		print(f"{operation:6} {list( zip(qs, rs) )}:", "OK" if consistent else f"differs, set has {sorted(coordinates)}")
+		passed = passed and consistent
+
+	return passed
+
+
+#fields of the chunks covered by snapshots
+snapshot_fields = ["altitude", "is_lake", "biome", "river_in", "river_out", "river_source", "river_flow", "river_order"]
+
+#file with the recorded snapshots
+snapshot_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots.json")
+
+#seeds and chunk radii of the recorded snapshots
+snapshot_worlds = [(0, 2), (1, 2), (2024, 3)]
+
+
+def snapshotDigests(seed :int, radius :int, shuffle :bool = False, evict :bool = False, saved :bool = False) -> dict:
+	'''
+	Generates the chunks of map of seed @seed (int) in the square of chunk coordinates from -@radius to @radius (int), and returns SHA-256 digests of their terrain arrays (one digest per field).
+	@shuffle (bool) ... Generate the chunks in random order instead of row by row.
+	@evict (bool) ... Move every chunk to the spill file right after its generation, so that the digests are computed from the reloaded chunks.
+	@saved (bool) ... Save the map into a map file, so that the digests are computed from the map loaded from it.
+	'''
+
+	mapObj = Map(0, 0, seed, chunk_budget=0 if evict else None)
+	keys = [(cq, cr) for cr in range(-radius, radius+1) for cq in range(-radius, radius+1)]
+
+	order = list(keys)
+	if shuffle:
+		numpy.random.default_rng().shuffle(order)
+	for cq, cr in order:
+		mapObj.store.getChunk(cq, cr, create=True)
+		mapObj.store.evict()
+
+	if saved:
+		directory = tempfile.TemporaryDirectory()
+		path = os.path.join(directory.name, "snapshot.hexmap")
+		mapObj.save(path)
+		mapObj = Map.load(path, 0, 0)
+
+	digests = {}
+	for field in snapshot_fields:
+		digest = hashlib.sha256()
+		for cq, cr in keys:
+			digest.update( mapObj.store.getChunk(cq, cr).arrays[field].tobytes() )
+		digests[field] = digest.hexdigest()
+
+	#the map file can be removed only after it is closed
+	mapObj.store.close()
+	if saved:
+		directory.cleanup()
+	return digests
+
+
+def recordSnapshots():
+	'''
+	Records the digests of the snapshot worlds into the snapshot file.
+	'''
+
+	snapshots = {f"{seed}/{radius}": snapshotDigests(seed, radius) for seed, radius in snapshot_worlds}
+	with open(snapshot_path, "w") as file:
+		json.dump(snapshots, file, indent="\t")
+
+
+def checkSnapshots() -> bool:
+	'''
+	Checks that the snapshot worlds are generated bit for bit equal to the recorded snapshots, that the result does not depend on the order of chunk generation,
+	and that the chunks do not change when they are evicted to the spill file and reloaded, or saved into a map file and loaded.
+	'''
+
+	with open(snapshot_path) as file:
+		snapshots = json.load(file)
+
+	passed = True
+	for seed, radius in snapshot_worlds:
+		recorded = snapshots[f"{seed}/{radius}"]
+		for shuffle, evict, saved, name in [(False, False, False, "in order"), (True, False, False, "shuffled"), (True, True, False, "evicted"), (True, True, True, "saved")]:
+			digests = snapshotDigests(seed, radius, shuffle, evict, saved)
+			different = [field for field in snapshot_fields if digests[field] != recorded[field]]
+			print(f"seed {seed:5}, radius {radius}, {name}:", "OK" if different == [] else "differs in " + ", ".join(different))
+			passed = passed and different == []
+
+	return passed
+
+
+if __name__ == "__main__":
+	#python verify.py --record ... record new snapshots after intended changes of the generated terrain
+	if "--record" in sys.argv:
+		recordSnapshots()
+	else:
+		sandpiles = checkSandpiles()
+		print("sandpiles:", "OK" if sandpiles else "FAILED")
+		rivers = checkRivers()
+		print("rivers:", "OK" if rivers else "FAILED")
+		tile_set = checkTileSet()
+		print("tile set:", "OK" if tile_set else "FAILED")
+		snapshots = checkSnapshots()
+		print("snapshots:", "OK" if snapshots else "FAILED")
+		sys.exit(0 if sandpiles and rivers and tile_set and snapshots else 1)
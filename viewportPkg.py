@@ -0,0 +1,96 @@
+import geometryPkg
+import math
+
+
+def rowTiles(rows :dict):
+	'''
+	Yields axial (q, r) coordinates of the tiles given by @rows (dict), which maps row r to the (first q, last q) range of the row's tiles.
+	'''
+
+	for r, (first, last) in rows.items():
+		for q in range(first, last + 1):
+			yield q, r
+
+
+def rowDifference(rows :dict, other :dict) -> list[tuple]:
+	'''
+	Returns axial (q, r) coordinates of the tiles which are in @rows (dict), but not in @other (dict). Both are given as in _rowTiles_.
+	Only the ends of the rows are compared, so the cost is proportional to the number of different tiles.
+	'''
+
+	difference = []
+	for r, (first, last) in rows.items():
+		if r not in other:
+			difference += [(q, r) for q in range(first, last + 1)]
+			continue
+
+		other_first, other_last = other[r]
+		difference += [(q, r) for q in range(first, min(last, other_first - 1) + 1)]
+		difference += [(q, r) for q in range(max(first, other_last + 1), last + 1)]
+
+	return difference
+
+
+class Viewport:
+	'''
+	Class representing the visible rectangle of the map, in the coordinates of the tiles' centres.
+	'''
+
+	def __init__(self, width :float, height :float, offset_x :float = 0, offset_y :float = 0, margin :float = 25):
+		'''
+		Constructor of Viewport class.
+		@width, @height (float) ... Size of the visible rectangle.
+		@offset_x, @offset_y (float) ... Coordinates of the visible rectangle's top left corner.
+		@margin (float) ... How far outside the rectangle a tile centre can be for the tile to still be visible (usually the tile side length).
+		'''
+
+		self.width = width
+		self.height = height
+		self.offset_x = offset_x
+		self.offset_y = offset_y
+		self.margin = margin
+
+
+	def isOnScreen(self, x :float, y :float) -> bool:
+		'''
+		Returns True if the point on (@x, @y) (float) canvas coordinates is inside the visible area.
+		'''
+
+		return (self.offset_x - self.margin < x < self.offset_x + self.width + self.margin
+				and self.offset_y - self.margin < y < self.offset_y + self.height + self.margin)
+
+
+	def zoomed(self, factor :float) -> "Viewport":
+		'''
+		Returns the viewport showing @factor (float) times larger area around the same centre, i.e. the part of the map which is visible when the map is zoomed out @factor times.
+		'''
+
+		centre_x = self.offset_x + self.width / 2
+		centre_y = self.offset_y + self.height / 2
+		return Viewport(factor * self.width, factor * self.height, centre_x - factor * self.width / 2, centre_y - factor * self.height / 2, factor * self.margin)
+
+
+	def visibleRows(self, origin_x :float, origin_y :float, side_length :float) -> dict:
+		'''
+		Returns the tiles inside the visible area as dictionary, which maps row r to the (first q, last q) range of the row's visible tiles.
+		@origin_x, @origin_y (float) ... Coordinates of the centre of the tile on axial coordinates (0, 0).
+		@side_length (float) ... Length of the tiles' sides.
+		'''
+
+		#tile (q, r) has its centre on (origin_x + (2q + r) * half_width * side_length, origin_y + r * 1.5 * side_length), see geometryPkg.tileCentres
+		width = geometryPkg.half_width * side_length
+		height = 1.5 * side_length
+
+		#the visible area is open, so the bounds themselves are excluded
+		top = (self.offset_y - self.margin - origin_y) / height
+		bottom = (self.offset_y + self.height + self.margin - origin_y) / height
+		left = (self.offset_x - self.margin - origin_x) / width
+		right = (self.offset_x + self.width + self.margin - origin_x) / width
+
+		rows = {}
+		for r in range(math.floor(top) + 1, math.ceil(bottom)):
+			first = math.floor( (left - r) / 2 ) + 1
+			last = math.ceil( (right - r) / 2 ) - 1
+			if first <= last:
+				rows[r] = (first, last)
+		return rows
@@ -0,0 +1,189 @@
+from mapPkg import Map, Tile, riverWidth, biome_colours
+from viewportPkg import Viewport, rowDifference
+import geometryPkg
+import sandpilePkg
+import tkinter
+import numpy
+
+
+class ZoomRenderer:
+	'''
+	Class plotting the map zoomed out. At zoom level k the map is 2^k times smaller and every cell of the level k of the map's TerrainPyramid is plotted as one hexagon
+	of the tiles' size, with the rivers whose flow is over a threshold, so the number of canvas items stays about the same at every zoom level.
+	The map zooms around the viewport's centre; the tiles keep their coordinates, which are only shrunk on plotting.
+	'''
+
+	#colour of the rivers, as in the polygon plots
+	river = "#0022BB"
+
+	#the river in a cell is plotted if its flow is at least this many tiles per tile on the cell's side
+	river_threshold = 1
+
+
+	def __init__(self, canvas :tkinter.Canvas, mapObj :Map, viewport :Viewport):
+		'''
+		Constructor of ZoomRenderer class.
+		@canvas (tkinter.Canvas) ... The canvas on which the map is plotted.
+		@mapObj (Map) ... The plotted map.
+		@viewport (Viewport) ... The visible part of the canvas.
+		'''
+
+		self.canvas = canvas
+		self.map = mapObj
+		self.viewport = viewport
+
+		#current zoom level, nothing is plotted at level 0 (the tiles themselves are plotted there)
+		self.level = 0
+
+		#the plotted cells as returned by _visibleCells_, and canvas items of each plotted cell indexed by its (Q, R) coordinates
+		self.rows = {}
+		self.items = {}
+
+		#plotted cells which do not contain all their tiles yet, they are plotted again when the map grows
+		self.incomplete = set()
+		self.extent = None
+
+
+	def factor(self) -> int:
+		'''
+		Returns how many times smaller the map is at the current zoom level.
+		'''
+
+		return 2**self.level
+
+
+	def toScreen(self, xs, ys) -> tuple:
+		'''
+		Returns canvas coordinates of the points on @xs and @ys (float or numpy.ndarray) canvas coordinates of the unzoomed map.
+		'''
+
+		centre_x = self.viewport.offset_x + self.viewport.width / 2
+		centre_y = self.viewport.offset_y + self.viewport.height / 2
+		return centre_x + (xs - centre_x) / self.factor(), centre_y + (ys - centre_y) / self.factor()
+
+
+	def cellPositions(self, qs, rs) -> tuple:
+		'''
+		Returns canvas (x, y) coordinates of the centres of the cells on (@qs, @rs) cell coordinates (int or numpy.ndarray), i.e. of the centres of their tiles.
+		'''
+
+		factor = self.factor()
+		return self.toScreen( *self.map.tilePosition(qs*factor + (factor - 1) / 2, rs*factor + (factor - 1) / 2) )
+
+
+	def visibleCells(self) -> dict:
+		'''
+		Returns the cells inside the viewport as dictionary, which maps row R to the (first Q, last Q) range of the row's visible cells.
+		The cells form the same hexagonal grid as the unzoomed tiles, only shifted.
+		'''
+
+		return self.viewport.visibleRows( *self.cellPositions(0, 0), Tile.side_length )
+
+
+	def setLevel(self, level :int):
+		'''
+		Removes the current plot and sets the zoom @level (int); the cells of the new level are plotted by _update_.
+		'''
+
+		self.clear()
+		self.level = level
+
+
+	def clear(self):
+		'''
+		Removes all the plotted cells from the canvas.
+		'''
+
+		for ids in self.items.values():
+			for id in ids:
+				self.canvas.delete(id)
+
+		self.rows = {}
+		self.items = {}
+		self.incomplete = set()
+
+
+	def update(self):
+		'''
+		Plots the cells that became visible, removes those that became hidden, and plots again the visible incomplete cells after the map grew.
+		'''
+
+		if self.level == 0:
+			return
+
+		rows = self.visibleCells()
+		hidden = rowDifference(self.rows, rows)
+		shown = rowDifference(rows, self.rows)
+
+		#the cells on the map's edges got new tiles
+		extent = (self.map.r_min, self.map.r_max, self.map.column_min, self.map.column_max)
+		if extent != self.extent:
+			redrawn = list( self.incomplete.difference(hidden) )
+			hidden += redrawn
+			shown += redrawn
+			self.extent = extent
+
+		for key in hidden:
+			self.incomplete.discard(key)
+			for id in self.items.pop(key, ()):
+				self.canvas.delete(id)
+
+		self.rows = rows
+		self.plotCells(shown)
+
+
+	def plotCells(self, cells :list[tuple]):
+		'''
+		Plots the cells on @cells (list[tuple]) cell coordinates, the cells without tiles are skipped.
+		'''
+
+		if cells == []:
+			return
+
+		qs, rs = numpy.array(cells).T
+		pyramid = self.map.pyramid
+		count = pyramid.gather(self.level, "count", qs, rs)
+		self.incomplete.update( (q, r) for q, r, complete in zip(qs.tolist(), rs.tolist(), (count == self.factor()**2).tolist()) if not complete )
+
+		qs, rs = qs[count > 0], rs[count > 0]
+		xs, ys = self.cellPositions(qs, rs)
+		vertices = geometryPkg.hexagonVertices(xs, ys, Tile.side_length).tolist()
+		colours = [biome_colours[code] for code in pyramid.gather(self.level, "biome", qs, rs).tolist()]
+
+		#rivers go from the cells' centres to the middles of the sides through which they flow in or out
+		river_sides, widths = self.riverSides(qs, rs)
+		middles = [geometryPkg.sideMiddles(xs, ys, numpy.full(len(qs), side), Tile.side_length) for side in range(6)]
+		middles = [(middle_xs.tolist(), middle_ys.tolist()) for middle_xs, middle_ys in middles]
+
+		for index, (q, r, x, y, points, colour) in enumerate( zip(qs.tolist(), rs.tolist(), xs.tolist(), ys.tolist(), vertices, colours) ):
+			ids = (self.canvas.create_polygon(points, fill=colour, outline="", tags="map"),)
+			for side in numpy.flatnonzero(river_sides[index]).tolist():
+				end = (middles[side][0][index], middles[side][1][index])
+				ids += (self.canvas.create_line(x, y, *end, width=widths[index], fill=ZoomRenderer.river, tags="map"),)
+			self.items[(q, r)] = ids
+
+
+	def riverSides(self, qs :numpy.ndarray, rs :numpy.ndarray) -> tuple:
+		'''
+		Returns (n, 6) mask of the sides (in the order of Tile.sides) of the cells on @qs and @rs (numpy.ndarray) cell coordinates through which their largest rivers flow out,
+		or through which the rivers of the neighbouring cells flow in, and the widths of the cells' rivers.
+		'''
+
+		pyramid = self.map.pyramid
+		threshold = ZoomRenderer.river_threshold * self.factor()
+
+		#side through which the river over the threshold flows out of the cells, or -1
+		def outflows(qs, rs):
+			flow = pyramid.gather(self.level, "river_flow", qs, rs)
+			return numpy.where( flow >= threshold, pyramid.gather(self.level, "river_out", qs, rs), -1 )
+
+		out = outflows(qs, rs)
+		sides = numpy.zeros( (len(qs), 6), bool )
+		sides[numpy.flatnonzero(out >= 0), out[out >= 0]] = True
+
+		for side in range(6):
+			neighbour_out = outflows(qs + sandpilePkg.delta_qs[side], rs + sandpilePkg.delta_rs[side])
+			sides[:, side] |= neighbour_out == (side + 3) % 6
+
+		order = pyramid.gather(self.level, "river_order", qs, rs).astype(numpy.int64)
+		return sides, riverWidth( numpy.maximum(order, 1) ).tolist()